@@ -0,0 +1,356 @@
+"""
+.. module:: compiledmaps
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the :class:`CompiledConfigurationView` which is an optional compiled view
+               over a configuration :class:`MergeMap`.  The view keeps the deep merged result of the layers of
+               the map and an index of the dotted paths of the result, so lookups do not walk the layers.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Dict, Iterator, List, Mapping, Set, Tuple
+
+import threading
+import weakref
+
+from mojo.collections.mergemap import MergeMap
+
+from mojo.config.encryptedfields import EncryptedValue, LazyDecryptingDict
+from mojo.config.frozen import FrozenDict
+
+PATH_SEPARATOR = "."
+PATH_ESCAPE = "\\"
+
+PathKey = Tuple[Any, ...]
+
+MISSING = object()
+EMPTY_NODE = FrozenDict()
+
+
+class CompiledConfigurationView:
+    """
+        A compiled view over a configuration :class:`MergeMap`.  The view precomputes the deep merge of the layers
+        of the map and an index of every dotted path in the merged result, like "logging.levels.console", so
+        a lookup is a single dictionary access.  Keys that contain the path separator or the escape character
+        have them escaped with a backslash in their paths, so the key "example.com" is found at the path
+        "hosts.example\\.com".
+
+        The layers are merged the same way the map layers them, the first layer in 'maps' has the highest
+        priority.  When a higher priority layer and a lower priority layer both have a mapping for a key, the
+        mappings are merged, any other value in the higher priority layer replaces the value of the lower
+        priority layer.
+
+        The view checks the layers of the map each time it is read.  When a layer has been added, removed or
+        replaced, only the layers above the lowest changed layer are merged again, on top of the merged result
+        that is kept for the unchanged layers below them, and only the paths in the changed layers are updated
+        in the index.  Changes made inside a layer that is already in the map are not detected, call
+        :meth:`invalidate` after changing a layer in place.
+
+        The merged mappings are read-only.  Encrypted field values are kept encrypted in the merged result and
+        are only decrypted when they are read.
+    """
+
+    def __init__(self, config_map: MergeMap):
+        """
+            Creates a compiled view.
+
+            :param config_map: The configuration map to compile.
+        """
+        self._config_map = config_map
+        self._lock = threading.RLock()
+
+        # The layers in the order of the 'maps' of the configuration map, with the merged result of the
+        # layers from each layer down to the lowest priority layer, the last checkpoint is the empty result
+        self._layers: List[Mapping] = []
+        self._checkpoints: List[Mapping] = [EMPTY_NODE]
+
+        self._index: Dict[str, Any] = {}
+        self._layer_paths: Dict[int, Tuple[Mapping, Set[PathKey]]] = {}
+        return
+
+    @property
+    def config_map(self) -> MergeMap:
+        return self._config_map
+
+    @property
+    def merged(self) -> Mapping:
+        """
+            The deep merged result of the layers of the configuration map.
+        """
+        self._lock.acquire()
+        try:
+            self.refresh()
+            merged = self._checkpoints[0]
+        finally:
+            self._lock.release()
+
+        return merged
+
+    def __contains__(self, path: str) -> bool:
+        return self.get(path, MISSING) is not MISSING
+
+    def __getitem__(self, path: str) -> Any:
+        value = self.get(path, MISSING)
+        if value is MISSING:
+            raise KeyError(path)
+        return value
+
+    def __len__(self) -> int:
+        self._lock.acquire()
+        try:
+            self.refresh()
+            count = len(self._index)
+        finally:
+            self._lock.release()
+
+        return count
+
+    def get(self, path: str, default: Any = None) -> Any:
+        """
+            Looks up the value for a dotted path in the merged configuration.
+
+            :param path: The dotted path of the value, like "logging.levels.console".  Dots and backslashes in
+                         keys are escaped with a backslash, see :func:`format_path`.
+            :param default: The value to return if the path is not found.
+
+            :returns: The value for the path or the default value.
+        """
+
+        self._lock.acquire()
+        try:
+            self.refresh()
+            value = self._index.get(path, MISSING)
+        finally:
+            self._lock.release()
+
+        if value is MISSING:
+            value = default
+        elif isinstance(value, EncryptedValue):
+            value = value.decrypt()
+
+        return value
+
+    def paths(self) -> List[str]:
+        """
+            Gets the dotted paths of all the values in the merged configuration.
+        """
+        self._lock.acquire()
+        try:
+            self.refresh()
+            paths = list(self._index.keys())
+        finally:
+            self._lock.release()
+
+        return paths
+
+    def invalidate(self):
+        """
+            Discards the compiled result so the next read compiles all of the layers again.
+        """
+
+        self._lock.acquire()
+        try:
+            self._layers = []
+            self._checkpoints = [EMPTY_NODE]
+            self._index = {}
+            self._layer_paths = {}
+        finally:
+            self._lock.release()
+
+        return
+
+    def refresh(self):
+        """
+            Updates the compiled result if layers have been added to, removed from or replaced in the map.
+        """
+
+        self._lock.acquire()
+        try:
+            layers = list(self._config_map.maps)
+            prev_layers = self._layers
+
+            # Find the lowest priority layers that have not changed, they are the same layer objects
+            unchanged = 0
+            while unchanged < len(layers) and unchanged < len(prev_layers) and \
+                layers[-1 - unchanged] is prev_layers[-1 - unchanged]:
+                unchanged += 1
+
+            if unchanged < len(layers) or unchanged < len(prev_layers):
+                prev_changed = prev_layers[:len(prev_layers) - unchanged]
+                changed = layers[:len(layers) - unchanged]
+
+                checkpoints = [None] * len(changed) + self._checkpoints[len(prev_changed):]
+                for lidx in range(len(changed) - 1, -1, -1):
+                    checkpoints[lidx] = _merge_layer(checkpoints[lidx + 1], changed[lidx])
+
+                # Only the paths that are in the changed layers can have different values
+                candidates = set()
+                for layer in prev_changed + changed:
+                    candidates.update(self._get_layer_paths(layer))
+
+                prev_root = self._checkpoints[0]
+                self._layers = layers
+                self._checkpoints = checkpoints
+
+                self._update_index(prev_root, checkpoints[0], candidates)
+
+                self._layer_paths = {
+                    lid: entry for lid, entry in self._layer_paths.items() if any(entry[0] is layer for layer in layers)
+                }
+        finally:
+            self._lock.release()
+
+        return
+
+    def _get_layer_paths(self, layer: Mapping) -> Set[PathKey]:
+
+        entry = self._layer_paths.get(id(layer))
+        if entry is None or entry[0] is not layer:
+            entry = (layer, { pkey for pkey, _ in _iter_paths(layer, ()) })
+            self._layer_paths[id(layer)] = entry
+
+        return entry[1]
+
+    def _update_index(self, prev_root: Mapping, root: Mapping, candidates: Set[PathKey]):
+
+        index = self._index
+
+        for pkey in sorted(candidates, key=len):
+            prev_value = _lookup_path(prev_root, pkey)
+            value = _lookup_path(root, pkey)
+
+            if prev_value is value:
+                continue
+
+            if _is_node(prev_value) and not _is_node(value):
+                for sub_pkey, _ in _iter_paths(prev_value, pkey):
+                    index.pop(_format_path(sub_pkey), None)
+
+            if value is MISSING:
+                index.pop(_format_path(pkey), None)
+            else:
+                index[_format_path(pkey)] = value
+                if _is_node(value) and not _is_node(prev_value):
+                    for sub_pkey, sub_value in _iter_paths(value, pkey):
+                        index[_format_path(sub_pkey)] = sub_value
+
+        return
+
+
+# The views are only kept while they are in use, a view holds on to its map so the id of the map is not
+# reused while the view is in the table
+COMPILED_VIEWS_LOCK = threading.Lock()
+COMPILED_VIEWS: "weakref.WeakValueDictionary[int, CompiledConfigurationView]" = weakref.WeakValueDictionary()
+
+
+def compile_configuration_map(config_map: MergeMap) -> CompiledConfigurationView:
+    """
+        Gets the compiled view for a configuration map, creating it if there is no view for the map in use.  The
+        views are shared while they are in use, so the compiled result of a map is kept up to date for every caller.
+
+        :param config_map: A configuration map, like `CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP`.
+
+        :returns: The compiled view of the map.
+    """
+
+    view = COMPILED_VIEWS.get(id(config_map))
+    if view is None or view.config_map is not config_map:
+        COMPILED_VIEWS_LOCK.acquire()
+        try:
+            view = COMPILED_VIEWS.get(id(config_map))
+            if view is None or view.config_map is not config_map:
+                view = CompiledConfigurationView(config_map)
+                COMPILED_VIEWS[id(config_map)] = view
+        finally:
+            COMPILED_VIEWS_LOCK.release()
+
+    return view
+
+
+def format_path(*keys: Any) -> str:
+    """
+        Formats the keys of a nested value as a path for a :class:`CompiledConfigurationView`.  The path
+        separator and the escape character in the keys are escaped with a backslash.
+
+        :param keys: The keys from the outermost mapping to the value.
+
+        :returns: The path of the value.
+    """
+    path = _format_path(keys)
+    return path
+
+
+def _format_path(pkey: PathKey) -> str:
+    return PATH_SEPARATOR.join(
+        str(key).replace(PATH_ESCAPE, PATH_ESCAPE * 2).replace(PATH_SEPARATOR, PATH_ESCAPE + PATH_SEPARATOR) for key in pkey
+    )
+
+
+def _is_node(value: Any) -> bool:
+    return isinstance(value, Mapping)
+
+
+def _raw_items(mapping: Mapping) -> Iterator[Tuple[Any, Any]]:
+    # Read the items of dictionaries without decrypting the encrypted fields
+    if isinstance(mapping, dict):
+        return iter(dict.items(mapping))
+    return iter(mapping.items())
+
+
+def _iter_paths(node: Mapping, prefix: PathKey) -> Iterator[Tuple[PathKey, Any]]:
+
+    for key, value in _raw_items(node):
+        pkey = prefix + (key,)
+        yield pkey, value
+        if _is_node(value):
+            yield from _iter_paths(value, pkey)
+
+    return
+
+
+def _lookup_path(node: Any, pkey: PathKey) -> Any:
+
+    value = node
+    for key in pkey:
+        if not _is_node(value):
+            value = MISSING
+            break
+        value = dict.get(value, key, MISSING) if isinstance(value, dict) else value.get(key, MISSING)
+        if value is MISSING:
+            break
+
+    return value
+
+
+def _make_node(items: Dict[Any, Any]) -> Mapping:
+
+    if any(isinstance(value, EncryptedValue) for value in items.values()):
+        node = LazyDecryptingDict(items)
+    else:
+        node = FrozenDict(items)
+
+    return node
+
+
+def _merge_layer(below: Mapping, layer: Mapping) -> Mapping:
+    """
+        Merges a layer on top of the merged result of the layers below it.  New mappings are only created for
+        the keys in the layer, everything else is shared with the result below.
+    """
+
+    items = dict(_raw_items(below))
+
+    for key, value in _raw_items(layer):
+        if _is_node(value):
+            below_value = items.get(key)
+            items[key] = _merge_layer(below_value if _is_node(below_value) else EMPTY_NODE, value)
+        else:
+            items[key] = value
+
+    merged = _make_node(items)
+
+    return merged
@@ -3,25 +3,30 @@ __author__ = "Myron Walker"
 __copyright__ = "Copyright 2020, Myron W Walker"
 __credits__ = []
 
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 import os
-import json
-import yaml
-import base64
 
-from cryptography.fernet import Fernet
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
+from mojo.config.sources.changewatcher import ConfigurationChangeWatcher
 from mojo.config.sources.configurationsourcebase import ConfigurationSourceBase
-from mojo.config.sources.couchdbsource import CouchDBSource
-from mojo.config.sources.directorysource import DirectorySource
-from mojo.config.sources.mongodbsource import MongoDBSource
-from mojo.config.sources.httpsource import HttpSource
+from mojo.config.sources.sourceregistry import get_registered_source
+from mojo.config.sources.sourceschemes import find_source_scheme
 
 from mojo.errors.exceptions import ConfigurationError, SemanticError
 
 from mojo.config.configurationformat import ConfigurationFormat
-from mojo.config.cryptography import generate_fernet_key, decrypt_content
+from mojo.config.configurationparsers import load_configuration_content
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+from mojo.config.configurationvariables import MOJO_CONFIG_VARIABLES
+from mojo.config.deadline import Deadline
+from mojo.config.encryptedfields import wrap_encrypted_fields
+from mojo.config.normalize import normalize_source_uri, split_source_uri_options
+from mojo.config.parsedcache import get_cached_decryption, load_configuration_file, put_cached_decryption
+from mojo.config.resolutionmemo import ResolutionMemo
+from mojo.config.resultcache import CONFIGURATION_RESULT_CACHE
+from mojo.config.cryptography import ConfigurationKey, open_decrypted_content
 
 class ConfigurationLoader:
     """
@@ -29,12 +34,37 @@ class ConfigurationLoader:
         source classes.
     """
 
-    def __init__(self, source_uris: List[str], credentials: Optional[Dict[str, Tuple[str, str]]] = None, verify_certificate: bool = True):
+    def __init__(self, source_uris: List[str], credentials: Optional[Dict[str, Tuple[str, str]]] = None, verify_certificate: bool = True,
+                 concurrent: Optional[bool] = None, max_workers: Optional[int] = None, memo: Optional[ResolutionMemo] = None):
+        """
+            Creates a configuration loader.
+
+            :param source_uris: The list of source uris to search in priority order.
+            :param credentials: An optional table of credentials by host used by the database sources.
+            :param verify_certificate: Indicates if certificates should be verified when connecting to sources.
+            :param concurrent: Indicates that all the sources should be probed in parallel when loading a
+                               configuration by name.  The highest priority source with a hit still wins.
+                               Defaults to the 'MJR_CONFIG_CONCURRENT_SOURCES' setting.
+            :param max_workers: The maximum number of worker threads to use when probing concurrently.
+            :param memo: An optional memo shared by the loaders of a resolution, so each configuration is only
+                         loaded once during the resolution and the same result is shared by reference.
+        """
         self._source_uris = [uri.strip() for uri in source_uris]
         self._credentials = credentials
         self._verify_certificate = verify_certificate
 
+        if concurrent is None:
+            concurrent = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_CONCURRENT_SOURCES
+        self._concurrent = concurrent
+
+        if max_workers is None:
+            max_workers = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_MAX_SOURCE_WORKERS
+        self._max_workers = max_workers
+
+        self._memo = memo
+
         self._sources: List[ConfigurationSourceBase] = []
+        self._source_ttls: Dict[str, float] = {}
         self._initialize()
         return
 
@@ -49,6 +79,11 @@ class ConfigurationLoader:
         return self._sources
 
 
+    @property
+    def concurrent(self) -> bool:
+        return self._concurrent
+
+
     def load_configuration_from_file(self, config_file: str, key: Optional[str] = None, keyphrase: Optional[str] = None) -> dict:
         """
             Loads a configuration directly from a file.
@@ -64,48 +99,69 @@ class ConfigurationLoader:
             errmsg = "The 'load_configuration' method should be called with either 'key' or 'keyphrase' but not both."
             raise SemanticError(errmsg)
 
-        if keyphrase is not None:
-            key = generate_fernet_key(keyphrase)
+        key = ConfigurationKey(key=key, keyphrase=keyphrase)
+
+        if self._memo is not None:
+            config_info = self._memo.get_or_load(("file", os.path.abspath(config_file)),
+                                                 lambda: self._load_configuration_file(config_file, key))
+        else:
+            config_info = self._load_configuration_file(config_file, key)
+
+        return config_info
+
+
+    def _load_configuration_file(self, config_file: str, key: ConfigurationKey) -> dict:
+        """
+            Loads, decrypts and parses a configuration file.
+        """
 
         config_info = None
 
         _, fileext = os.path.splitext(config_file)
 
         if fileext in [".yaml", ".yml"]:
-            with open(config_file, 'r') as cf:
-                config_info = yaml.safe_load(cf)
+            config_info = load_configuration_file(config_file, ConfigurationFormat.YAML)
         elif fileext == ".json":
-            with open(config_file, 'r') as cf:
-                config_info = json.load(cf)
+            config_info = load_configuration_file(config_file, ConfigurationFormat.JSON)
 
         if "encrypted_content" in config_info:
+
+            # Documents with a 'kdf' field have a key derived with their own salt
+            decryption_key = key.get_key(config_info)
+
+            # The decrypted content is only ever cached if caching plaintext has been explicitly allowed
+            decrypted_info = get_cached_decryption(config_file, decryption_key)
+            if decrypted_info is not None:
+                return wrap_encrypted_fields(decrypted_info, key.get_key)
+
             if "format" in config_info:
                 config_format = config_info["format"]
 
-            decryptor = Fernet(key)
-            
-            encrypted_content = base64.b64decode(config_info["encrypted_content"])
-            
-            plain_content = decryptor.decrypt(encrypted_content).decode('utf-8')
-
-            if config_format == ConfigurationFormat.YAML:
-                config_info = yaml.safe_load(plain_content)
-            elif config_format == ConfigurationFormat.JSON:
-                config_info = json.loads(plain_content)
+            if config_format in [ConfigurationFormat.YAML, ConfigurationFormat.JSON]:
+                # The plain content is streamed into the parser, chunked documents are decrypted incrementally
+                with open_decrypted_content(decryption_key, config_info) as plain_stream:
+                    config_info = load_configuration_content(config_format, plain_stream)
             else:
                 errmsg = "UnExpected error parsing decrypted configuration content.  Un-supported format."
                 raise ConfigurationError(errmsg)
 
+            put_cached_decryption(config_file, decryption_key, config_info)
+
+        # Encrypted fields are only decrypted when they are read
+        config_info = wrap_encrypted_fields(config_info, key.get_key)
+
         return config_info
 
 
-    def load_configuration_by_name(self, config_name: str, key: Optional[str] = None, keyphrase: Optional[str] = None) -> Tuple[str, dict]:
+    def load_configuration_by_name(self, config_name: str, key: Optional[str] = None, keyphrase: Optional[str] = None,
+                                   deadline: Optional[Deadline] = None) -> Tuple[str, dict]:
         """
             Searches a list of sources to locate a configuration by name and then loads the configuration.
 
             :param config_name: The name of the configuration to load.
             :param key: An optional key to use for encrypted configurations.
             :param keyphrase: An optional phrase to use for generating the decryption key.
+            :param deadline: An optional deadline that limits the time spent searching the sources.
 
             :returns: A tuple with the uri used to locate the configuration and the configuration found
         """
@@ -114,88 +170,620 @@ class ConfigurationLoader:
             errmsg = "The 'load_configuration' method should be called with either 'key' or 'keyphrase' but not both."
             raise SemanticError(errmsg)
 
-        if keyphrase is not None:
-            key = generate_fernet_key(keyphrase)
+        key = ConfigurationKey(key=key, keyphrase=keyphrase)
+
+        config_uri, config_info = self._load_configuration_by_name(config_name, key, deadline)
+
+        return config_uri, config_info
+
+
+    def load_configurations_by_names(self, config_names: List[str], key: Optional[str] = None, keyphrase: Optional[str] = None,
+                                     deadline: Optional[Deadline] = None) -> List[Tuple[str, dict]]:
+        """
+            Searches the list of sources to locate and load each of the configurations names provided.  The
+            configurations are loaded concurrently and the decryption key is only derived once.
+
+            :param config_names: The names of the configurations to load.
+            :param key: An optional key to use for encrypted configurations.
+            :param keyphrase: An optional phrase to use for generating the decryption key.
+            :param deadline: An optional deadline that limits the time spent searching the sources.
+
+            :returns: A list of tuples with the uri and the configuration found for each name, in the same order
+                      as the names provided.  A name that is repeated, or names that resolve to the same uri, have
+                      an entry for each time they are listed, the same as loading the names one at a time.
+        """
+
+        if key is not None and keyphrase is not None:
+            errmsg = "The 'load_configurations' method should be called with either 'key' or 'keyphrase' but not both."
+            raise SemanticError(errmsg)
+
+        key = ConfigurationKey(key=key, keyphrase=keyphrase)
+
+        config_list = []
+
+        if len(config_names) > 1 and any([src.supports_batch_load for src in self._sources]):
+            # At least one of the sources can retrieve several documents in a single round trip, so
+            # walk the sources once with the full set of names instead of probing name by name.
+            config_list = self._load_configurations_batched(config_names, key, deadline)
+
+        elif len(config_names) > 1:
+            max_workers = max(1, min(self._max_workers, len(config_names)))
+
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mojo-config-load") as executor:
+                futures = [
+                    executor.submit(self._load_configuration_by_name, cname, key, deadline) for cname in config_names
+                ]
+
+                # Collect the results in the order of the names so the layering order is preserved
+                config_list = [fut.result() for fut in futures]
+
+        else:
+            for cname in config_names:
+                config_list.append(self._load_configuration_by_name(cname, key, deadline))
+
+        return config_list
+
+
+    def watch_configurations(self, config_uris: List[str], on_change: Callable[[str, dict], None], key: Optional[str] = None,
+                             keyphrase: Optional[str] = None) -> List[ConfigurationChangeWatcher]:
+        """
+            Subscribes to the change notifications of the sources that support change feeds for the configurations
+            provided.  When one of the configurations changes, the changed document is decrypted if needed and the
+            change callback is called with the uri of the configuration and the new configuration.
+
+            :param config_uris: The uris of the configurations to watch, as returned by :meth:`load_configurations_by_names`.
+            :param on_change: The callback to call with the uri and content of a configuration that changed.
+            :param key: An optional key to use for encrypted configurations.
+            :param keyphrase: An optional phrase to use for generating the decryption key.
+
+            :returns: The list of watchers that were started.
+        """
+
+        if key is not None and keyphrase is not None:
+            errmsg = "The 'watch_configurations' method should be called with either 'key' or 'keyphrase' but not both."
+            raise SemanticError(errmsg)
+
+        key = ConfigurationKey(key=key, keyphrase=keyphrase)
+
+        watchers = []
+
+        for src in self._sources:
+            if not src.supports_change_feed:
+                continue
+
+            src_prefix = f"{src.uri}/"
+            config_names = [uri[len(src_prefix):] for uri in config_uris if uri.startswith(src_prefix)]
+            if len(config_names) == 0:
+                continue
+
+            def on_source_change(config_name, config_format, config_info, src=src):
+                CONFIGURATION_RESULT_CACHE.invalidate(config_name=config_name, source_uri=src.uri)
+                config_info = self._decrypt_configuration(config_format, config_info, key)
+                on_change(f"{src.uri}/{config_name}", config_info)
+                return
+
+            watcher = src.create_change_watcher(config_names, on_source_change, credentials=self._credentials)
+            if watcher is not None:
+                watcher.start()
+                watchers.append(watcher)
+
+        return watchers
+
+
+    def _load_configuration_by_name(self, config_name: str, key: ConfigurationKey, deadline: Optional[Deadline] = None) -> Tuple[str, dict]:
+        """
+            Locates and loads a configuration by name using a key that has already been derived.
+        """
 
         config_info = None
         config_format = None
         config_uri = None
 
+        if self._concurrent and len(self._sources) > 1:
+            src, config_format, config_info = self._probe_sources_concurrently(config_name, deadline)
+        else:
+            src, config_format, config_info = self._probe_sources(config_name, deadline)
+
+        if config_info is not None:
+            config_uri = f"{src.uri}/{config_name}"
+        else:
+            errmsg = self._format_not_found_error(config_name, deadline)
+            raise ConfigurationError(errmsg)
+
+        config_info = self._decrypt_memoized(config_uri, config_format, config_info, key)
+
+        return config_uri, config_info
+
+
+    def _load_configurations_batched(self, config_names: List[str], key: ConfigurationKey, deadline: Optional[Deadline] = None) -> List[Tuple[str, dict]]:
+        """
+            Walks the sources in priority order asking each source for all of the names that have not been
+            found yet.  The highest priority source that has a configuration still wins for each name.
+        """
+
+        found = {}
+
+        pending = []
+        for cname in config_names:
+            if cname not in pending:
+                pending.append(cname)
+
         for src in self._sources:
-            config_format, config_info = src.try_load_configuration(config_name, self._credentials)
-            if config_info is not None:
-                config_uri = f"{src.uri}/{config_name}"
+            if len(pending) == 0 or (deadline is not None and deadline.expired):
                 break
 
-        if config_info is None:
-            errmsg_list = [
-                f"Unable to locate configuration name='{config_name}'",
-                "CHECKED SOURCES:"
-            ]
+            results = self._load_names_from_source(src, pending, deadline)
 
-            for uri in self.source_uris:
-                errmsg_list.append(f"    {uri}")
+            for cname in pending:
+                config_format, config_info = results.get(cname, (None, None))
+                if config_info is not None:
+                    found[cname] = (src, config_format, config_info)
+
+            pending = [cname for cname in pending if cname not in found]
 
-            errmsg = os.linesep.join(errmsg_list)
+        if len(pending) > 0:
+            errmsg = self._format_not_found_error(pending[0], deadline)
+            raise ConfigurationError(errmsg)
+
+        config_list = []
+
+        for cname in config_names:
+            src, config_format, config_info = found[cname]
+            config_uri = f"{src.uri}/{cname}"
+            config_list.append((config_uri, self._decrypt_memoized(config_uri, config_format, config_info, key)))
+
+        return config_list
+
+
+    def _load_names_from_source(self, src: ConfigurationSourceBase, config_names: List[str],
+                                deadline: Optional[Deadline] = None) -> Dict[str, Tuple[Optional[ConfigurationFormat], Optional[dict]]]:
+        """
+            Loads a set of names from a source.  The names that are in the result cache are served from the cache,
+            the rest are fetched with a single batch lookup if the source supports it, otherwise with lookups that
+            overlap on the worker pool.
+        """
+
+        results = {}
+
+        ttl = self._get_source_ttl(src)
+        if ttl > 0:
+            for cname in config_names:
+                config_format, config_info = CONFIGURATION_RESULT_CACHE.get(src.uri, cname)
+                if config_info is not None:
+                    results[cname] = (config_format, config_info)
+
+        fetch_names = [cname for cname in config_names if cname not in results]
+
+        # Names that another loader of the same resolution is already loading are waited for instead of fetched
+        claimed = {}
+        if self._memo is not None:
+            for cname in fetch_names:
+                claimed[cname] = self._memo.claim(("source", src.uri, cname))
+            fetch_names = [cname for cname in fetch_names if claimed[cname][1]]
+
+        try:
+            fetched = self._fetch_names_from_source(src, fetch_names, deadline)
+        except BaseException as xcpt:
+            for cname in fetch_names:
+                if cname in claimed:
+                    claimed[cname][0].set_exception(xcpt)
+            raise
+
+        # Publish the results of the names this loader owns before waiting on the names owned by other loaders
+        for cname, (future, owner) in claimed.items():
+            if owner:
+                future.set_result(fetched.get(cname, (None, None)))
+
+        for cname, (future, owner) in claimed.items():
+            if not owner:
+                fetched[cname] = future.result()
+
+        for cname, (config_format, config_info) in fetched.items():
+            if config_info is not None and ttl > 0:
+                config_info = CONFIGURATION_RESULT_CACHE.put(src.uri, cname, config_format, config_info, ttl)
+            results[cname] = (config_format, config_info)
+
+        return results
+
+
+    def _fetch_names_from_source(self, src: ConfigurationSourceBase, fetch_names: List[str],
+                                 deadline: Optional[Deadline] = None) -> Dict[str, Tuple[Optional[ConfigurationFormat], Optional[dict]]]:
+        """
+            Fetches a set of names from a source with a single batch lookup if the source supports it, otherwise
+            with lookups that overlap on the worker pool.
+        """
+
+        if len(fetch_names) == 0:
+            fetched = {}
+        elif src.supports_batch_load or len(fetch_names) == 1:
+            fetched = src.try_load_configurations(fetch_names, self._credentials, deadline=deadline)
+        else:
+            max_workers = max(1, min(self._max_workers, len(fetch_names)))
+
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mojo-config-load") as executor:
+                futures = [
+                    executor.submit(src.try_load_configuration, cname, self._credentials, deadline=deadline) for cname in fetch_names
+                ]
+                fetched = { cname: fut.result() for cname, fut in zip(fetch_names, futures) }
+
+        return fetched
+
+
+    def _try_load_from_source(self, src: ConfigurationSourceBase, config_name: str,
+                              deadline: Optional[Deadline] = None) -> Tuple[Optional[ConfigurationFormat], Optional[dict]]:
+        """
+            Loads a configuration from a source, using the result cache when the source has a time to live.
+        """
+
+        ttl = self._get_source_ttl(src)
+
+        if ttl > 0:
+            config_format, config_info = CONFIGURATION_RESULT_CACHE.get(src.uri, config_name)
+            if config_info is not None:
+                return config_format, config_info
+
+        if self._memo is not None:
+            config_format, config_info = self._memo.get_or_load(
+                ("source", src.uri, config_name), lambda: src.try_load_configuration(config_name, self._credentials, deadline=deadline))
+        else:
+            config_format, config_info = src.try_load_configuration(config_name, self._credentials, deadline=deadline)
+
+        if config_info is not None and ttl > 0:
+            config_info = CONFIGURATION_RESULT_CACHE.put(src.uri, config_name, config_format, config_info, ttl)
+
+        return config_format, config_info
+
+
+    async def _atry_load_from_source(self, src: ConfigurationSourceBase, config_name: str,
+                                     deadline: Optional[Deadline] = None) -> Tuple[Optional[ConfigurationFormat], Optional[dict]]:
+        """
+            Asynchronous version of :meth:`_try_load_from_source`.
+        """
+
+        ttl = self._get_source_ttl(src)
+
+        if ttl > 0:
+            config_format, config_info = CONFIGURATION_RESULT_CACHE.get(src.uri, config_name)
+            if config_info is not None:
+                return config_format, config_info
+
+        if self._memo is not None:
+            config_format, config_info = await self._memo.aget_or_load(
+                ("source", src.uri, config_name), lambda: src.atry_load_configuration(config_name, self._credentials, deadline=deadline))
+        else:
+            config_format, config_info = await src.atry_load_configuration(config_name, self._credentials, deadline=deadline)
+
+        if config_info is not None and ttl > 0:
+            config_info = CONFIGURATION_RESULT_CACHE.put(src.uri, config_name, config_format, config_info, ttl)
+
+        return config_format, config_info
+
+
+    def _get_source_ttl(self, src: ConfigurationSourceBase) -> float:
+        ttl = self._source_ttls.get(src.uri, MOJO_CONFIG_DEFAULTS.MJR_CONFIG_RESULT_CACHE_TTL)
+        return ttl
+
+
+    async def aload_configuration_by_name(self, config_name: str, key: Optional[str] = None, keyphrase: Optional[str] = None,
+                                          deadline: Optional[Deadline] = None) -> Tuple[str, dict]:
+        """
+            Asynchronous version of :meth:`load_configuration_by_name`.  All of the sources are probed
+            concurrently on the event loop and the highest priority hit wins.
+
+            :param config_name: The name of the configuration to load.
+            :param key: An optional key to use for encrypted configurations.
+            :param keyphrase: An optional phrase to use for generating the decryption key.
+
+            :returns: A tuple with the uri used to locate the configuration and the configuration found
+        """
+
+        if key is not None and keyphrase is not None:
+            errmsg = "The 'load_configuration' method should be called with either 'key' or 'keyphrase' but not both."
+            raise SemanticError(errmsg)
+
+        key = ConfigurationKey(key=key, keyphrase=keyphrase)
+
+        config_uri, config_info = await self._aload_configuration_by_name(config_name, key, deadline)
+
+        return config_uri, config_info
+
+
+    async def aload_configurations_by_names(self, config_names: List[str], key: Optional[str] = None, keyphrase: Optional[str] = None,
+                                            deadline: Optional[Deadline] = None) -> List[Tuple[str, dict]]:
+        """
+            Asynchronous version of :meth:`load_configurations_by_names`.
+
+            :param config_names: The names of the configurations to load.
+            :param key: An optional key to use for encrypted configurations.
+            :param keyphrase: An optional phrase to use for generating the decryption key.
+
+            :returns: A list of tuples with the uri and the configuration found for each name, in the same order
+                      as the names provided.
+        """
+
+        import asyncio
+
+        if key is not None and keyphrase is not None:
+            errmsg = "The 'load_configurations' method should be called with either 'key' or 'keyphrase' but not both."
+            raise SemanticError(errmsg)
+
+        key = ConfigurationKey(key=key, keyphrase=keyphrase)
+
+        results = await asyncio.gather(*[
+            self._aload_configuration_by_name(cname, key, deadline) for cname in config_names
+        ])
+
+        config_list = list(results)
+
+        return config_list
+
+
+    async def aload_configuration_from_file(self, config_file: str, key: Optional[str] = None, keyphrase: Optional[str] = None) -> dict:
+        """
+            Asynchronous version of :meth:`load_configuration_from_file`.  The file is read and parsed
+            in a worker thread so the event loop is not blocked.
+        """
+        import asyncio
+
+        config_info = await asyncio.to_thread(self.load_configuration_from_file, config_file, key=key, keyphrase=keyphrase)
+        return config_info
+
+
+    async def _aload_configuration_by_name(self, config_name: str, key: ConfigurationKey, deadline: Optional[Deadline] = None) -> Tuple[str, dict]:
+        """
+            Locates and loads a configuration by name using a key that has already been derived.
+        """
+
+        import asyncio
+
+        config_info = None
+        config_format = None
+        config_uri = None
+
+        src, config_format, config_info = await self._aprobe_sources(config_name, deadline)
+
+        if config_info is not None:
+            config_uri = f"{src.uri}/{config_name}"
+        else:
+            errmsg = self._format_not_found_error(config_name, deadline)
             raise ConfigurationError(errmsg)
 
         if "encrypted_content" in config_info:
+            # Deriving the key and decrypting the document would block the event loop
+            config_info = await asyncio.to_thread(self._decrypt_memoized, config_uri, config_format, config_info, key)
+        else:
+            config_info = self._decrypt_memoized(config_uri, config_format, config_info, key)
 
-            if "format" in config_info:
-                config_format = config_info["format"]
+        return config_uri, config_info
 
-            encrypted_content = config_info["encrypted_content"]
 
-            plain_content = decrypt_content(key, encrypted_content)
+    async def _aprobe_sources(self, config_name: str, deadline: Optional[Deadline] = None) -> Tuple[Optional[ConfigurationSourceBase], Optional[ConfigurationFormat], Optional[dict]]:
+        """
+            Probes all the sources concurrently on the event loop.  The results are consumed in priority
+            order and once a hit is found the probes of the lower priority sources are cancelled.
+        """
+
+        import asyncio
+
+        tasks = [
+            asyncio.ensure_future(self._atry_load_from_source(src, config_name, deadline=deadline)) for src in self._sources
+        ]
+
+        try:
+            for src, task in zip(self._sources, tasks):
+                if deadline is not None:
+                    try:
+                        config_format, config_info = await asyncio.wait_for(asyncio.shield(task), timeout=deadline.remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    config_format, config_info = await task
+
+                if config_info is not None:
+                    return src, config_format, config_info
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        return None, None, None
+
+
+    def _decrypt_configuration(self, config_format: Optional[ConfigurationFormat], config_info: dict, key: ConfigurationKey) -> dict:
+        """
+            Decrypts and parses the configuration content if the configuration is an encrypted document and
+            wraps any encrypted fields so they are decrypted when they are first read.
+        """
+
+        if "encrypted_content" in config_info:
 
-            if config_format == ConfigurationFormat.YAML:
-                config_info = yaml.safe_load(plain_content)
-            elif config_format == ConfigurationFormat.JSON:
-                config_info = json.loads(plain_content)
+            if "format" in config_info:
+                config_format = config_info["format"]
+
+            if config_format in [ConfigurationFormat.YAML, ConfigurationFormat.JSON]:
+                with open_decrypted_content(key.get_key(config_info), config_info) as plain_stream:
+                    config_info = load_configuration_content(config_format, plain_stream)
             else:
                 errmsg = "UnExpected error parsing decrypted configuration content.  Un-supported format."
                 raise ConfigurationError(errmsg)
 
-        return config_uri, config_info
+        config_info = wrap_encrypted_fields(config_info, key.get_key)
+
+        return config_info
+
+
+    def _decrypt_memoized(self, config_uri: str, config_format: Optional[ConfigurationFormat], config_info: dict,
+                          key: ConfigurationKey) -> dict:
+        """
+            Decrypts a configuration once per resolution when the loader has a resolution memo.
+        """
+
+        if self._memo is not None:
+            config_info = self._memo.get_or_load(("config", config_uri),
+                                                 lambda: self._decrypt_configuration(config_format, config_info, key))
+        else:
+            config_info = self._decrypt_configuration(config_format, config_info, key)
+
+        return config_info
+
+
+    def _probe_sources(self, config_name: str, deadline: Optional[Deadline] = None) -> Tuple[Optional[ConfigurationSourceBase], Optional[ConfigurationFormat], Optional[dict]]:
+        """
+            Walks the sources in priority order and returns the first source that has the configuration.
+        """
+
+        for src in self._sources:
+            config_format, config_info = self._try_load_from_source(src, config_name, deadline=deadline)
+            if config_info is not None:
+                return src, config_format, config_info
+
+        return None, None, None
+
+
+    def _probe_sources_concurrently(self, config_name: str, deadline: Optional[Deadline] = None) -> Tuple[Optional[ConfigurationSourceBase], Optional[ConfigurationFormat], Optional[dict]]:
+        """
+            Probes all the sources in parallel using a bounded thread pool.  The results are still consumed
+            in priority order so the highest priority hit wins, and once a hit is found the probes of the
+            lower priority sources are cancelled or their results ignored.
+        """
+
+        max_workers = max(1, min(self._max_workers, len(self._sources)))
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mojo-config-probe")
+        try:
+            futures = [
+                executor.submit(self._try_load_from_source, src, config_name, deadline=deadline) for src in self._sources
+            ]
+
+            for src, fut in zip(self._sources, futures):
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline.remaining
+
+                try:
+                    config_format, config_info = fut.result(timeout=timeout)
+                except FutureTimeoutError:
+                    break
+
+                if config_info is not None:
+                    return src, config_format, config_info
+
+        finally:
+            # Don't wait on any lower priority probes that are still in flight, their results are not needed
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return None, None, None
+
+
+    def _format_not_found_error(self, config_name: str, deadline: Optional[Deadline]) -> str:
+
+        timed_out = [src.uri for src in self._sources if src.has_timed_out(config_name)]
+
+        if deadline is not None and deadline.expired:
+            errmsg_list = [
+                f"The deadline of {deadline.budget} seconds expired before configuration name='{config_name}' could be located.",
+                "SOURCES:"
+            ]
+        elif len(timed_out) > 0:
+            errmsg_list = [
+                f"Timed out locating configuration name='{config_name}'",
+                "TIMED OUT SOURCES:"
+            ]
+            for uri in timed_out:
+                errmsg_list.append(f"    {uri}")
+            errmsg_list.append("CHECKED SOURCES:")
+        else:
+            errmsg_list = [
+                f"Unable to locate configuration name='{config_name}'",
+                "CHECKED SOURCES:"
+            ]
+
+        for uri in self.source_uris:
+            errmsg_list.append(f"    {uri}")
+
+        errmsg = os.linesep.join(errmsg_list)
+
+        return errmsg
 
 
     def _initialize(self):
 
-        for uri in self._source_uris:
-            if uri.startswith(CouchDBSource.scheme):
-                src = CouchDBSource.parse(uri)
-
-                if src is None:
-                    errmsg = f"CouchDBSource encountered an error parsing configuration source uri='{uri}'"
-                    raise ConfigurationError(errmsg)
-
-                self._sources.append(src)
-
-            elif uri.startswith(MongoDBSource.scheme):
-                src = MongoDBSource.parse(uri, verify_certificate=self._verify_certificate)
-                
-                if src is None:
-                    errmsg = f"MongoDBSource encountered an error parsing configuration source uri='{uri}'"
-                    raise ConfigurationError(errmsg)
-                
-                self._sources.append(src)
-
-            elif uri.startswith(HttpSource.scheme) or uri.startswith(HttpSource.secure_scheme):
-                src = HttpSource.parse(uri)
-                
-                if src is None:
-                    errmsg = f"HttpSource encountered an error parsing configuration source uri='{uri}'"
-                    raise ConfigurationError(errmsg)
-                
-                self._sources.append(src)
+        for source_uri in self._source_uris:
+            uri, options = split_source_uri_options(source_uri)
+
+            connect_timeout = self._get_float_option(source_uri, options, "connect_timeout", MOJO_CONFIG_DEFAULTS.MJR_CONFIG_SOURCE_CONNECT_TIMEOUT)
+            read_timeout = self._get_float_option(source_uri, options, "read_timeout", MOJO_CONFIG_DEFAULTS.MJR_CONFIG_SOURCE_READ_TIMEOUT)
+            ttl = self._get_float_option(source_uri, options, "ttl", MOJO_CONFIG_DEFAULTS.MJR_CONFIG_RESULT_CACHE_TTL)
+
+            # The hedge delay is converted when the source is created, make sure a bad value is reported here
+            self._get_float_option(source_uri, options, "hedge_delay", None)
 
+            def create_source(uri=uri, options=options, connect_timeout=connect_timeout, read_timeout=read_timeout):
+                return self._create_source(uri, options, connect_timeout, read_timeout)
+
+            if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_SHARE_SOURCES:
+                src = get_registered_source(self._get_source_key(uri, options, connect_timeout, read_timeout), create_source)
             else:
-                src = DirectorySource.parse(uri)
-                
-                if src is None:
-                    errmsg = f"DirectorySource encountered an error parsing configuration source uri='{uri}'"
-                    raise ConfigurationError(errmsg)
+                src = create_source()
+
+            self._sources.append(src)
+            self._source_ttls[src.uri] = ttl
+
+        return
+
+
+    def _create_source(self, uri: str, options: Dict[str, str], connect_timeout: float, read_timeout: float) -> ConfigurationSourceBase:
+
+        scheme = find_source_scheme(uri)
+
+        src = scheme.create(uri, options, connect_timeout, read_timeout, self._verify_certificate)
+
+        return src
+
+
+    def _get_float_option(self, source_uri: str, options: Dict[str, str], name: str, default: Optional[float]) -> Optional[float]:
+        """
+            Gets a numeric source option, raising a :class:`ConfigurationError` that names the option if the
+            value is not a number.
+        """
+
+        value = options.get(name, default)
+
+        if value is not None:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                errmsg = f"The source option '{name}' must be a number, found {name}={value!r} in source uri='{source_uri}'."
+                raise ConfigurationError(errmsg) from None
+
+        return value
+
+
+    def _get_source_key(self, uri: str, options: Dict[str, str], connect_timeout: float, read_timeout: float) -> tuple:
+        """
+            Gets the key of a source in the source registry from its normalized uri and the settings it is
+            created with.
+        """
 
-                self._sources.append(src)
+        http_cache = None
+        if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_HTTP_CACHE and MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_CACHE_SIZE > 0 and \
+            MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY is not None:
+            http_cache = MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY
+
+        source_key = (
+            normalize_source_uri(uri),
+            options.get("hedge_delay", MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_HEDGE_DELAY),
+            connect_timeout,
+            read_timeout,
+            self._verify_certificate,
+            http_cache,
+            MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_POOL_SIZE,
+            MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_PRECONNECT,
+            MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_SOURCE_MANIFESTS,
+            MOJO_CONFIG_DEFAULTS.MJR_CONFIG_SOURCE_MANIFEST_TTL,
+            MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_DIRECTORY_INDEX,
+            MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LIVE_RELOAD
+        )
+
+        return source_key
 
-        return
\ No newline at end of file
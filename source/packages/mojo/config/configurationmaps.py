@@ -11,14 +11,18 @@ __author__ = "Myron Walker"
 __copyright__ = "Copyright 2020, Myron W Walker"
 __credits__ = []
 
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
+import logging
 import os
+import threading
 
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from mojo.collections.context import Context
 from mojo.collections.contextpaths import ContextPaths
+from mojo.collections.mergemap import MergeMap
 from mojo.collections.wellknown import ContextSingleton
 
 
@@ -30,13 +34,37 @@ from mojo.config.configurationvariables import (
 
 
 from mojo.config.configurationloader import ConfigurationLoader
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+from mojo.config.deadline import Deadline
+from mojo.config.lazymaps import LazyConfigurationMap
+from mojo.config.resolutionmemo import ResolutionMemo
+from mojo.config.snapshots import (
+    CategorySnapshot,
+    ConfigurationSnapshot,
+    publish_configuration_snapshot
+)
+from mojo.config.sources.changewatcher import ConfigurationChangeWatcher
 
+logger = logging.getLogger()
 
+# The tables are swapped for new tables when they change, they are never changed in place
 CREDENTIALS_TABLE = None
 LANDSCAPE_TABLE = None
 RUNTIME_TABLE = None
 TOPOLOGY_TABLE = None
 
+CREDENTIALS_FILE_TABLE = None
+LANDSCAPE_FILE_TABLE = None
+RUNTIME_FILE_TABLE = None
+TOPOLOGY_FILE_TABLE = None
+
+CONFIGURATION_WATCHERS: List[ConfigurationChangeWatcher] = []
+
+CONFIGURATION_CATEGORIES = ["credentials", "landscape", "runtime", "topology"]
+
+CATEGORY_EXECUTOR_LOCK = threading.Lock()
+CATEGORY_EXECUTOR = None
+
 
 def resolve_configuration_maps(
         use_credentials: Optional[bool]=None,
@@ -44,7 +72,553 @@ def resolve_configuration_maps(
         use_runtime: Optional[bool]=None,
         use_topology: Optional[bool]=None,
         keyphrase: Optional[str]=None,
-        credentials: Optional[Dict[str, Tuple[str, str]]] = None):
+        credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+        timeout: Optional[float] = None,
+        lazy: Optional[bool] = None):
+    """
+        Resolves the configuration maps for the configuration categories that are in use.
+
+        :param timeout: An optional overall time budget in seconds for resolving all of the configurations.  When
+                        the budget runs out, sources fall back to cached copies where they have them, otherwise
+                        a :class:`ConfigurationError` is raised that reports the deadline expired.
+        :param lazy: Indicates the categories should be resolved on the first access to their configuration
+                     maps instead of now.  Defaults to the 'MJR_CONFIG_LAZY_RESOLUTION' setting.  When resolved
+                     lazily, the timeout applies to each category from the time it is first accessed.
+    """
+
+    use_credentials, use_landscape, use_runtime, use_topology, keyphrase = _establish_resolution_settings(
+        use_credentials, use_landscape, use_runtime, use_topology, keyphrase)
+
+    if lazy is None:
+        lazy = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LAZY_RESOLUTION
+
+    if lazy:
+        _install_lazy_configuration_maps(use_credentials, use_landscape, use_runtime, use_topology,
+                                         keyphrase, credentials, timeout)
+        return
+
+    deadline = None
+    if timeout is not None:
+        deadline = Deadline(timeout)
+
+    ctx = ContextSingleton()
+
+    _remove_lazy_configuration_maps(ctx)
+
+    # A configuration listed in more than one category is only loaded once per resolution
+    memo = ResolutionMemo()
+
+    categories = _get_resolution_categories(use_credentials, use_landscape, use_runtime, use_topology)
+
+    if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_CONCURRENT_CATEGORIES and len(categories) > 1:
+        _resolve_categories_concurrently(ctx, categories, keyphrase, credentials, deadline, memo)
+    else:
+        for _, prepare_category, apply_category in categories:
+            source_uris, config_names, config_files = prepare_category()
+            config_layers, file_layers = _load_configuration_layers(source_uris, config_names, config_files, keyphrase, credentials,
+                                                                    deadline, memo)
+            apply_category(ctx, config_layers, file_layers)
+
+    if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LIVE_RELOAD:
+        watch_configuration_maps(keyphrase=keyphrase, credentials=credentials)
+
+    return
+
+
+async def aresolve_configuration_maps(
+        use_credentials: Optional[bool]=None,
+        use_landscape: Optional[bool]=None,
+        use_runtime: Optional[bool]=None,
+        use_topology: Optional[bool]=None,
+        keyphrase: Optional[str]=None,
+        credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+        timeout: Optional[float] = None):
+    """
+        Asynchronous version of :func:`resolve_configuration_maps`.  The configurations for all of the
+        categories are loaded concurrently without blocking the event loop, then the configuration maps
+        are updated in the same order as :func:`resolve_configuration_maps` would update them.
+    """
+
+    import asyncio
+
+    use_credentials, use_landscape, use_runtime, use_topology, keyphrase = _establish_resolution_settings(
+        use_credentials, use_landscape, use_runtime, use_topology, keyphrase)
+
+    deadline = None
+    if timeout is not None:
+        deadline = Deadline(timeout)
+
+    ctx = ContextSingleton()
+
+    _remove_lazy_configuration_maps(ctx)
+
+    memo = ResolutionMemo()
+
+    categories = _get_resolution_categories(use_credentials, use_landscape, use_runtime, use_topology)
+
+    pending = []
+    for _, prepare_category, _ in categories:
+        source_uris, config_names, config_files = prepare_category()
+        pending.append(_aload_configuration_layers(source_uris, config_names, config_files, keyphrase, credentials, deadline, memo))
+
+    results = await asyncio.gather(*pending)
+
+    for (_, _, apply_category), (config_layers, file_layers) in zip(categories, results):
+        apply_category(ctx, config_layers, file_layers)
+
+    if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LIVE_RELOAD:
+        watch_configuration_maps(keyphrase=keyphrase, credentials=credentials)
+
+    return
+
+
+def replace_configuration_layer(config_uri: str, config_info: dict) -> bool:
+    """
+        Swaps the layer of a named configuration or configuration file in the configuration maps for a new
+        version of the configuration.  The layer keeps its position in the map so the layering order is preserved.
+
+        :param config_uri: The uri of the named configuration or the path of the configuration file that was
+                           loaded when the maps were resolved.
+        :param config_info: The new content of the configuration.
+
+        :returns: True if a layer was found and replaced, otherwise False.
+    """
+
+    replaced = False
+
+    def update(current: ConfigurationSnapshot) -> Dict[str, CategorySnapshot]:
+        nonlocal replaced
+
+        updates = {}
+
+        # The layers and tables are copied and swapped in, never changed in place, so readers always see either
+        # the previous version or the new version of a category
+        for category, config_map in _get_category_maps():
+            config_map = _unwrap_configuration_map(config_map)
+
+            layers = None
+            category_tables = []
+
+            for config_table in _get_category_tables(category):
+                if config_table is not None and config_uri in config_table:
+                    previous_info = config_table[config_uri]
+
+                    # A configuration that was listed more than once has a layer for each time it was listed
+                    for lidx, layer in enumerate(config_map.maps if layers is None else list(layers)):
+                        if layer is previous_info:
+                            if layers is None:
+                                layers = list(config_map.maps)
+                            layers[lidx] = config_info
+
+                    if layers is not None and config_table[config_uri] is not config_info:
+                        config_table = OrderedDict(config_table)
+                        config_table[config_uri] = config_info
+
+                category_tables.append(config_table)
+
+            if layers is not None:
+                config_map.maps = layers
+                _set_category_tables(category, *category_tables)
+                updates[category] = CategorySnapshot(layers, *category_tables)
+                replaced = True
+
+        return updates
+
+    publish_configuration_snapshot(update)
+
+    if replaced:
+        logger.info(f"Reloaded configuration uri={config_uri}")
+
+    return replaced
+
+
+def watch_configuration_maps(keyphrase: Optional[str] = None, credentials: Optional[Dict[str, Tuple[str, str]]] = None) -> List[ConfigurationChangeWatcher]:
+    """
+        Subscribes to the change notifications of the sources the named configurations were loaded from and
+        watches the configuration files.  When a configuration changes, only that configuration is loaded again
+        and its layer in the configuration maps is swapped for the new version.  The MongoDB sources are watched
+        with change streams, the CouchDB sources with the '_changes' feed and the directory sources and the
+        configuration files with inotify, or by polling when inotify is not available.  Any existing watchers
+        are stopped first.
+
+        :returns: The list of watchers that were started.
+    """
+
+    stop_watching_configuration_maps()
+
+    if keyphrase is None:
+        keyphrase = MOJO_CONFIG_VARIABLES.MJR_CONFIG_PASS_PHRASE
+
+    category_sources = [
+        (CREDENTIALS_TABLE, MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_SOURCES),
+        (LANDSCAPE_TABLE, MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_SOURCES),
+        (RUNTIME_TABLE, MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_SOURCES),
+        (TOPOLOGY_TABLE, MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_SOURCES)
+    ]
+
+    watchers = []
+
+    for config_table, source_uris in category_sources:
+        if config_table is None or len(config_table) == 0:
+            continue
+
+        config_loader = ConfigurationLoader(source_uris, credentials=credentials)
+        watchers.extend(config_loader.watch_configurations(list(config_table.keys()), replace_configuration_layer, keyphrase=keyphrase))
+
+    from mojo.config.sources.filewatcher import FileChangeWatcher
+
+    file_loader = ConfigurationLoader([], credentials=credentials)
+
+    def load_file(config_file):
+        config_info = file_loader.load_configuration_from_file(config_file, keyphrase=keyphrase)
+        return None, config_info
+
+    def on_file_change(config_file, config_format, config_info):
+        replace_configuration_layer(config_file, config_info)
+        return
+
+    for file_table in [CREDENTIALS_FILE_TABLE, LANDSCAPE_FILE_TABLE, RUNTIME_FILE_TABLE, TOPOLOGY_FILE_TABLE]:
+        if file_table is None or len(file_table) == 0:
+            continue
+
+        watched_files = { cfile: cfile for cfile in file_table.keys() }
+        watcher = FileChangeWatcher("file://", watched_files, load_file, on_file_change)
+        watcher.start()
+        watchers.append(watcher)
+
+    CONFIGURATION_WATCHERS.extend(watchers)
+
+    return watchers
+
+
+def stop_watching_configuration_maps():
+    """
+        Stops all of the configuration watchers started by :func:`watch_configuration_maps`.
+    """
+
+    while len(CONFIGURATION_WATCHERS) > 0:
+        watcher = CONFIGURATION_WATCHERS.pop()
+        watcher.stop()
+
+    return
+
+
+def resolve_credentials_configuration(ctx: Context, keyphrase: Optional[str] = None, credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+                                      deadline: Optional[Deadline] = None, memo: Optional[ResolutionMemo] = None):
+
+    source_uris, config_names, config_files = _prepare_credentials_configuration()
+
+    config_layers, file_layers = _load_configuration_layers(source_uris, config_names, config_files, keyphrase, credentials, deadline, memo)
+
+    _apply_credentials_configuration(ctx, config_layers, file_layers)
+
+    return
+
+
+def resolve_landscape_configuration(ctx: Context, keyphrase: Optional[str] = None, credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+                                    deadline: Optional[Deadline] = None, memo: Optional[ResolutionMemo] = None):
+
+    source_uris, config_names, config_files = _prepare_landscape_configuration()
+
+    config_layers, file_layers = _load_configuration_layers(source_uris, config_names, config_files, keyphrase, credentials, deadline, memo)
+
+    _apply_landscape_configuration(ctx, config_layers, file_layers)
+
+    return
+
+
+def resolve_runtime_configuration(ctx: Context, keyphrase: Optional[str] = None, credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+                                  deadline: Optional[Deadline] = None, memo: Optional[ResolutionMemo] = None):
+
+    source_uris, config_names, config_files = _prepare_runtime_configuration()
+
+    config_layers, file_layers = _load_configuration_layers(source_uris, config_names, config_files, keyphrase, credentials, deadline, memo)
+
+    _apply_runtime_configuration(ctx, config_layers, file_layers)
+
+    return
+
+
+def resolve_topology_configuration(ctx: Context, keyphrase: Optional[str] = None, credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+                                   deadline: Optional[Deadline] = None, memo: Optional[ResolutionMemo] = None):
+
+    source_uris, config_names, config_files = _prepare_topology_configuration()
+
+    config_layers, file_layers = _load_configuration_layers(source_uris, config_names, config_files, keyphrase, credentials, deadline, memo)
+
+    _apply_topology_configuration(ctx, config_layers, file_layers)
+
+    return
+
+
+def _get_category_maps() -> List[Tuple[str, MergeMap]]:
+    """
+        Gets the configuration map of each configuration category.
+    """
+
+    category_maps = [
+        ("credentials", CONFIGURATION_MAPS.CREDENTIAL_CONFIGURATION_MAP),
+        ("landscape", CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP),
+        ("runtime", CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP),
+        ("topology", CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP)
+    ]
+
+    return category_maps
+
+
+def _get_category_tables(category: str) -> Tuple[Optional["OrderedDict[str, dict]"], Optional["OrderedDict[str, dict]"]]:
+    """
+        Gets the tables of named configurations and configuration files of a configuration category.
+    """
+
+    if category == "credentials":
+        category_tables = (CREDENTIALS_TABLE, CREDENTIALS_FILE_TABLE)
+    elif category == "landscape":
+        category_tables = (LANDSCAPE_TABLE, LANDSCAPE_FILE_TABLE)
+    elif category == "runtime":
+        category_tables = (RUNTIME_TABLE, RUNTIME_FILE_TABLE)
+    elif category == "topology":
+        category_tables = (TOPOLOGY_TABLE, TOPOLOGY_FILE_TABLE)
+    else:
+        errmsg = f"Unknown configuration category category={category}"
+        raise ValueError(errmsg)
+
+    return category_tables
+
+
+def _set_category_tables(category: str, config_table: Optional["OrderedDict[str, dict]"], file_table: Optional["OrderedDict[str, dict]"]):
+    """
+        Swaps in new tables of named configurations and configuration files for a configuration category.
+    """
+
+    global CREDENTIALS_TABLE, CREDENTIALS_FILE_TABLE
+    global LANDSCAPE_TABLE, LANDSCAPE_FILE_TABLE
+    global RUNTIME_TABLE, RUNTIME_FILE_TABLE
+    global TOPOLOGY_TABLE, TOPOLOGY_FILE_TABLE
+
+    if category == "credentials":
+        CREDENTIALS_TABLE, CREDENTIALS_FILE_TABLE = config_table, file_table
+    elif category == "landscape":
+        LANDSCAPE_TABLE, LANDSCAPE_FILE_TABLE = config_table, file_table
+    elif category == "runtime":
+        RUNTIME_TABLE, RUNTIME_FILE_TABLE = config_table, file_table
+    elif category == "topology":
+        TOPOLOGY_TABLE, TOPOLOGY_FILE_TABLE = config_table, file_table
+    else:
+        errmsg = f"Unknown configuration category category={category}"
+        raise ValueError(errmsg)
+
+    return
+
+
+def _publish_category_layers(category: str, config_map: MergeMap, config_layers: List[Tuple[str, dict]],
+                             file_layers: List[Tuple[str, dict]]) -> CategorySnapshot:
+    """
+        Publishes the configurations of a resolved category.  The new layers are put on top of the layers of the
+        configuration map by swapping in a new 'maps' list, the tables of the category are swapped in and the next
+        configuration snapshot is published, all while holding the snapshot publish lock.  Readers see either
+        the previous version of the category or the new version, never a partially updated one.
+    """
+
+    config_map = _unwrap_configuration_map(config_map)
+
+    # The tables have an entry per uri, but every configuration listed gets a layer, so a name that is listed
+    # twice is layered twice
+    config_table = OrderedDict(config_layers)
+    file_table = OrderedDict(file_layers)
+
+    def update(current: ConfigurationSnapshot) -> Dict[str, CategorySnapshot]:
+        # Each configuration is put on top of the ones before it, so the last one has the highest priority
+        layers = [
+            *[config_info for _, config_info in reversed(file_layers)],
+            *[config_info for _, config_info in reversed(config_layers)],
+            *config_map.maps
+        ]
+
+        config_map.maps = layers
+        _set_category_tables(category, config_table, file_table)
+
+        return { category: CategorySnapshot(layers, config_table, file_table) }
+
+    snapshot = publish_configuration_snapshot(update)
+
+    return snapshot.get_category(category)
+
+
+def get_category_executor() -> ThreadPoolExecutor:
+    """
+        Gets the shared thread pool that is used to resolve the configuration categories concurrently.
+    """
+    global CATEGORY_EXECUTOR
+
+    if CATEGORY_EXECUTOR is None:
+        CATEGORY_EXECUTOR_LOCK.acquire()
+        try:
+            if CATEGORY_EXECUTOR is None:
+                CATEGORY_EXECUTOR = ThreadPoolExecutor(max_workers=len(CONFIGURATION_CATEGORIES), thread_name_prefix="mojo-config-category")
+        finally:
+            CATEGORY_EXECUTOR_LOCK.release()
+
+    return CATEGORY_EXECUTOR
+
+
+def _get_resolution_categories(use_credentials: bool, use_landscape: bool, use_runtime: bool,
+                               use_topology: bool) -> List[Tuple[str, Callable, Callable]]:
+    """
+        Gets the name and the prepare and apply functions of the configuration categories that are in use,
+        in the order their configuration maps are updated.
+    """
+
+    categories = []
+
+    if use_credentials:
+        categories.append(("credentials", _prepare_credentials_configuration, _apply_credentials_configuration))
+
+    if use_landscape:
+        categories.append(("landscape", _prepare_landscape_configuration, _apply_landscape_configuration))
+
+    if use_runtime:
+        categories.append(("runtime", _prepare_runtime_configuration, _apply_runtime_configuration))
+
+    if use_topology:
+        categories.append(("topology", _prepare_topology_configuration, _apply_topology_configuration))
+
+    return categories
+
+
+def _resolve_categories_concurrently(ctx: Context, categories: List[Tuple[str, Callable, Callable]], keyphrase: Optional[str],
+                                     credentials: Optional[Dict[str, Tuple[str, str]]], deadline: Optional[Deadline],
+                                     memo: Optional[ResolutionMemo] = None):
+    """
+        Loads the configurations of the categories concurrently on the shared category executor.  Once all of the
+        loads have finished, the configuration maps and the context are updated in category order so the result
+        is the same as resolving the categories one after another.  If a category fails, the categories before
+        it are still applied and the error of the first category that failed is raised.
+    """
+
+    executor = get_category_executor()
+
+    futures = []
+    for _, prepare_category, _ in categories:
+        source_uris, config_names, config_files = prepare_category()
+        futures.append(executor.submit(_load_configuration_layers, source_uris, config_names, config_files,
+                                       keyphrase, credentials, deadline, memo))
+
+    results = []
+    first_error = None
+    for (category, _, _), future in zip(categories, futures):
+        try:
+            results.append(future.result())
+        except Exception as xcpt:
+            logger.error(f"Failed to resolve the '{category}' configuration category. {xcpt}")
+            if first_error is None:
+                if hasattr(xcpt, "add_note"):
+                    xcpt.add_note(f"While resolving the '{category}' configuration category.")
+                first_error = xcpt
+            results.append(None)
+
+    for (_, _, apply_category), result in zip(categories, results):
+        if result is None:
+            break
+        config_layers, file_layers = result
+        apply_category(ctx, config_layers, file_layers)
+
+    if first_error is not None:
+        raise first_error
+
+    return
+
+
+def _install_lazy_configuration_maps(use_credentials: bool, use_landscape: bool, use_runtime: bool, use_topology: bool,
+                                     keyphrase: Optional[str], credentials: Optional[Dict[str, Tuple[str, str]]],
+                                     timeout: Optional[float]):
+    """
+        Replaces the configuration maps of the categories that are in use with :class:`LazyConfigurationMap`
+        proxies that resolve the category on first access.  The context entries for the maps are replaced
+        with the proxies as well.
+    """
+
+    ctx = ContextSingleton()
+
+    def create_resolver(resolve_category):
+        def resolve_lazily():
+            deadline = None
+            if timeout is not None:
+                deadline = Deadline(timeout)
+
+            resolve_category(ctx, keyphrase=keyphrase, credentials=credentials, deadline=deadline)
+
+            if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LIVE_RELOAD:
+                watch_configuration_maps(keyphrase=keyphrase, credentials=credentials)
+            return
+        return resolve_lazily
+
+    if use_credentials:
+        # The credentials map is not put into the context, see :func:`resolve_configuration_variables`
+        CONFIGURATION_MAPS.CREDENTIAL_CONFIGURATION_MAP = LazyConfigurationMap(
+            _unwrap_configuration_map(CONFIGURATION_MAPS.CREDENTIAL_CONFIGURATION_MAP),
+            create_resolver(resolve_credentials_configuration), "credentials")
+
+    if use_landscape:
+        CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP = LazyConfigurationMap(
+            _unwrap_configuration_map(CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP),
+            create_resolver(resolve_landscape_configuration), "landscape")
+        ctx.insert(ContextPaths.CONFIG_LANDSCAPE, CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP)
+
+    if use_runtime:
+        CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP = LazyConfigurationMap(
+            _unwrap_configuration_map(CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP),
+            create_resolver(resolve_runtime_configuration), "runtime")
+        ctx.insert(ContextPaths.CONFIG_RUNTIME, CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP)
+
+    if use_topology:
+        CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP = LazyConfigurationMap(
+            _unwrap_configuration_map(CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP),
+            create_resolver(resolve_topology_configuration), "topology")
+        ctx.insert(ContextPaths.CONFIG_TOPOLOGY, CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP)
+
+    return
+
+
+def _remove_lazy_configuration_maps(ctx: Context):
+    """
+        Puts the configuration maps behind any lazy proxies back in place so the categories can be resolved
+        eagerly.
+    """
+
+    if type(CONFIGURATION_MAPS.CREDENTIAL_CONFIGURATION_MAP) is LazyConfigurationMap:
+        CONFIGURATION_MAPS.CREDENTIAL_CONFIGURATION_MAP = CONFIGURATION_MAPS.CREDENTIAL_CONFIGURATION_MAP.target
+
+    if type(CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP) is LazyConfigurationMap:
+        CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP = CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP.target
+        ctx.insert(ContextPaths.CONFIG_LANDSCAPE, CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP)
+
+    if type(CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP) is LazyConfigurationMap:
+        CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP = CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP.target
+        ctx.insert(ContextPaths.CONFIG_RUNTIME, CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP)
+
+    if type(CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP) is LazyConfigurationMap:
+        CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP = CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP.target
+        ctx.insert(ContextPaths.CONFIG_TOPOLOGY, CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP)
+
+    return
+
+
+def _unwrap_configuration_map(config_map: MergeMap) -> MergeMap:
+    """
+        Gets the configuration map behind a lazy proxy, so proxies are never stacked on each other.
+    """
+    if type(config_map) is LazyConfigurationMap:
+        config_map = config_map.target
+    return config_map
+
+
+def _establish_resolution_settings(
+        use_credentials: Optional[bool],
+        use_landscape: Optional[bool],
+        use_runtime: Optional[bool],
+        use_topology: Optional[bool],
+        keyphrase: Optional[str]) -> Tuple[bool, bool, bool, bool, Optional[str]]:
 
     if use_credentials is None:
         use_credentials = MOJO_CONFIG_VARIABLES.MJR_CONFIG_USE_CREDENTIALS
@@ -74,31 +648,64 @@ def resolve_configuration_maps(
     else:
         keyphrase = MOJO_CONFIG_VARIABLES.MJR_CONFIG_PASS_PHRASE
 
-    ctx = ContextSingleton()
+    return use_credentials, use_landscape, use_runtime, use_topology, keyphrase
 
-    if use_credentials:
-        resolve_credentials_configuration(ctx, keyphrase=keyphrase, credentials=credentials)
 
-    if use_landscape:
-        resolve_landscape_configuration(ctx, keyphrase=keyphrase, credentials=credentials)
+def _load_configuration_layers(source_uris: List[str], config_names: Optional[List[str]], config_files: Optional[List[str]],
+                               keyphrase: Optional[str], credentials: Optional[Dict[str, Tuple[str, str]]],
+                               deadline: Optional[Deadline] = None, memo: Optional[ResolutionMemo] = None) -> Tuple[List[Tuple[str, dict]], List[Tuple[str, dict]]]:
+    """
+        Loads the named configurations and the configuration files for a single configuration category.  The
+        loads are shared through the resolution memo with the other categories of the same resolution.
 
-    if use_runtime:
-        resolve_runtime_configuration(ctx, keyphrase=keyphrase, credentials=credentials)
+        :returns: A tuple with the list of named configurations and the list of configuration files, as tuples of
+                  the uri or file and the configuration, in the order they were listed.
+    """
 
-    if use_topology:
-        resolve_topology_configuration(ctx, keyphrase=keyphrase, credentials=credentials)
+    config_layers = []
+    file_layers = []
 
-    return
+    config_loader = ConfigurationLoader(source_uris if config_names is not None else [], credentials=credentials, memo=memo)
 
+    if config_names is not None:
+        config_layers = config_loader.load_configurations_by_names(config_names, keyphrase=keyphrase, deadline=deadline)
 
-def resolve_credentials_configuration(ctx: Context, keyphrase: Optional[str] = None, credentials: Optional[Dict[str, Tuple[str, str]]] = None):
+    if config_files is not None:
+        for cfile in config_files:
+            config_info = config_loader.load_configuration_from_file(cfile, keyphrase=keyphrase)
+            file_layers.append((cfile, config_info))
 
-    global CREDENTIALS_TABLE
+    return config_layers, file_layers
 
-    CREDENTIALS_TABLE = OrderedDict()
 
-    MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_URIS = []
-    
+async def _aload_configuration_layers(source_uris: List[str], config_names: Optional[List[str]], config_files: Optional[List[str]],
+                                      keyphrase: Optional[str], credentials: Optional[Dict[str, Tuple[str, str]]],
+                                      deadline: Optional[Deadline] = None, memo: Optional[ResolutionMemo] = None) -> Tuple[List[Tuple[str, dict]], List[Tuple[str, dict]]]:
+    """
+        Asynchronous version of :func:`_load_configuration_layers`.
+    """
+
+    import asyncio
+
+    config_layers = []
+    file_layers = []
+
+    config_loader = ConfigurationLoader(source_uris if config_names is not None else [], credentials=credentials, memo=memo)
+
+    if config_names is not None:
+        config_layers = await config_loader.aload_configurations_by_names(config_names, keyphrase=keyphrase, deadline=deadline)
+
+    if config_files is not None:
+        file_infos = await asyncio.gather(*[
+            config_loader.aload_configuration_from_file(cfile, keyphrase=keyphrase) for cfile in config_files
+        ])
+        file_layers = list(zip(config_files, file_infos))
+
+    return config_layers, file_layers
+
+
+def _prepare_credentials_configuration() -> Tuple[List[str], Optional[List[str]], Optional[List[str]]]:
+
     config_names = MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_NAMES
     config_files = MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_FILES
 
@@ -106,37 +713,24 @@ def resolve_credentials_configuration(ctx: Context, keyphrase: Optional[str] = N
         MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_NAMES = ["credentials"]
         config_names = MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_NAMES
 
-    if config_names is not None:
-        source_uris = MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_SOURCES
+    source_uris = MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_SOURCES
 
-        config_loader = ConfigurationLoader(source_uris, credentials=credentials)
+    return source_uris, config_names, config_files
 
-        for cname in config_names:
-            config_uri, config_info = config_loader.load_configuration_by_name(cname, keyphrase=keyphrase)
-            CREDENTIALS_TABLE[config_uri] = config_info
-            CONFIGURATION_MAPS.CREDENTIAL_CONFIGURATION_MAP.maps.insert(0, config_info)
 
-        MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_URIS = [ cfguri for cfguri in  CREDENTIALS_TABLE.keys() ]
+def _apply_credentials_configuration(ctx: Context, config_layers: List[Tuple[str, dict]], file_layers: List[Tuple[str, dict]]):
 
-    if config_files is not None:
-        config_loader = ConfigurationLoader([], credentials=credentials)
-        for cfile in config_files:
-            config_info = config_loader.load_configuration_from_file(cfile, keyphrase=keyphrase)
-            CONFIGURATION_MAPS.CREDENTIAL_CONFIGURATION_MAP.maps.insert(0, config_info)
+    category_snapshot = _publish_category_layers("credentials", CONFIGURATION_MAPS.CREDENTIAL_CONFIGURATION_MAP, config_layers, file_layers)
+
+    MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_URIS = [ cfguri for cfguri in category_snapshot.config_table.keys() ]
 
     ctx.insert(ContextPaths.CONFIG_CREDENTIAL_URIS, MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_URIS)
 
     return
 
 
-def resolve_landscape_configuration(ctx: Context, keyphrase: Optional[str] = None, credentials: Optional[Dict[str, Tuple[str, str]]] = None):
+def _prepare_landscape_configuration() -> Tuple[List[str], Optional[List[str]], Optional[List[str]]]:
 
-    global LANDSCAPE_TABLE
-
-    LANDSCAPE_TABLE = OrderedDict()
-
-    MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_URIS = []
-    
     config_names = MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_NAMES
     config_files = MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_FILES
 
@@ -144,23 +738,16 @@ def resolve_landscape_configuration(ctx: Context, keyphrase: Optional[str] = Non
         MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_NAMES = ["default-landscape"]
         config_names = MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_NAMES
 
-    if config_names is not None:
-        source_uris = MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_SOURCES
+    source_uris = MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_SOURCES
 
-        config_loader = ConfigurationLoader(source_uris, credentials=credentials)
+    return source_uris, config_names, config_files
 
-        for cname in config_names:
-            config_uri, config_info = config_loader.load_configuration_by_name(cname, keyphrase=keyphrase)
-            LANDSCAPE_TABLE[config_uri] = config_info
-            CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP.maps.insert(0, config_info)
 
-        MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_URIS = [ cfguri for cfguri in  LANDSCAPE_TABLE.keys() ]
+def _apply_landscape_configuration(ctx: Context, config_layers: List[Tuple[str, dict]], file_layers: List[Tuple[str, dict]]):
 
-    if config_files is not None:
-        config_loader = ConfigurationLoader([], credentials=credentials)
-        for cfile in config_files:
-            config_info = config_loader.load_configuration_from_file(cfile, keyphrase=keyphrase)
-            CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP.maps.insert(0, config_info)
+    category_snapshot = _publish_category_layers("landscape", CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP, config_layers, file_layers)
+
+    MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_URIS = [ cfguri for cfguri in category_snapshot.config_table.keys() ]
 
     ctx.insert(ContextPaths.CONFIG_LANDSCAPE, CONFIGURATION_MAPS.LANDSCAPE_CONFIGURATION_MAP)
     ctx.insert(ContextPaths.CONFIG_LANDSCAPE_URIS, MOJO_CONFIG_VARIABLES.MJR_CONFIG_LANDSCAPE_URIS)
@@ -168,13 +755,7 @@ def resolve_landscape_configuration(ctx: Context, keyphrase: Optional[str] = Non
     return
 
 
-def resolve_runtime_configuration(ctx: Context, keyphrase: Optional[str] = None, credentials: Optional[Dict[str, Tuple[str, str]]] = None):
-
-    global RUNTIME_TABLE
-
-    RUNTIME_TABLE = OrderedDict()
-
-    MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_URIS = []
+def _prepare_runtime_configuration() -> Tuple[List[str], Optional[List[str]], Optional[List[str]]]:
 
     config_names = MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_NAMES
     config_files = MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_FILES
@@ -183,23 +764,16 @@ def resolve_runtime_configuration(ctx: Context, keyphrase: Optional[str] = None,
         MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_NAMES = ["default-runtime"]
         config_names = MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_NAMES
 
-    if config_names is not None:
-        source_uris = MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_SOURCES
+    source_uris = MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_SOURCES
 
-        config_loader = ConfigurationLoader(source_uris, credentials=credentials)
+    return source_uris, config_names, config_files
 
-        for cname in config_names:
-            config_uri, config_info = config_loader.load_configuration_by_name(cname, keyphrase=keyphrase)
-            RUNTIME_TABLE[config_uri] = config_info
-            CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP.maps.insert(0, config_info)
 
-        MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_URIS = [ cfguri for cfguri in  RUNTIME_TABLE.keys() ]
+def _apply_runtime_configuration(ctx: Context, config_layers: List[Tuple[str, dict]], file_layers: List[Tuple[str, dict]]):
 
-    if config_files is not None:
-        config_loader = ConfigurationLoader([], credentials=credentials)
-        for cfile in config_files:
-            config_info = config_loader.load_configuration_from_file(cfile, keyphrase=keyphrase)
-            CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP.maps.insert(0, config_info)
+    category_snapshot = _publish_category_layers("runtime", CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP, config_layers, file_layers)
+
+    MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_URIS = [ cfguri for cfguri in category_snapshot.config_table.keys() ]
 
     ctx.insert(ContextPaths.CONFIG_RUNTIME, CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP)
     ctx.insert(ContextPaths.CONFIG_RUNTIME_URIS, MOJO_CONFIG_VARIABLES.MJR_CONFIG_RUNTIME_URIS)
@@ -207,13 +781,7 @@ def resolve_runtime_configuration(ctx: Context, keyphrase: Optional[str] = None,
     return
 
 
-def resolve_topology_configuration(ctx: Context, keyphrase: Optional[str] = None, credentials: Optional[Dict[str, Tuple[str, str]]] = None):
-
-    global TOPOLOGY_TABLE
-
-    TOPOLOGY_TABLE = OrderedDict()
-
-    MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_URIS = []
+def _prepare_topology_configuration() -> Tuple[List[str], Optional[List[str]], Optional[List[str]]]:
 
     config_names = MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_NAMES
     config_files = MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_FILES
@@ -222,26 +790,18 @@ def resolve_topology_configuration(ctx: Context, keyphrase: Optional[str] = None
         MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_NAMES = ["default-topology"]
         config_names = MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_NAMES
 
-    if config_names is not None:
-        source_uris = MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_SOURCES
+    source_uris = MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_SOURCES
 
-        config_loader = ConfigurationLoader(source_uris, credentials=credentials)
+    return source_uris, config_names, config_files
 
-        for cname in config_names:
-            config_uri, config_info = config_loader.load_configuration_by_name(cname, keyphrase=keyphrase)
-            TOPOLOGY_TABLE[config_uri] = config_info
-            CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP.maps.insert(0, config_info)
 
-        MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_URIS = [ cfguri for cfguri in  TOPOLOGY_TABLE.keys() ]
+def _apply_topology_configuration(ctx: Context, config_layers: List[Tuple[str, dict]], file_layers: List[Tuple[str, dict]]):
 
-    if config_files is not None:
-        config_loader = ConfigurationLoader([], credentials=credentials)
-        for cfile in config_files:
-            config_info = config_loader.load_configuration_from_file(cfile, keyphrase=keyphrase)
-            CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP.maps.insert(0, config_info)
+    category_snapshot = _publish_category_layers("topology", CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP, config_layers, file_layers)
+
+    MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_URIS = [ cfguri for cfguri in category_snapshot.config_table.keys() ]
 
     ctx.insert(ContextPaths.CONFIG_TOPOLOGY, CONFIGURATION_MAPS.TOPOLOGY_CONFIGURATION_MAP)
     ctx.insert(ContextPaths.CONFIG_TOPOLOGY_URIS, MOJO_CONFIG_VARIABLES.MJR_CONFIG_TOPOLOGY_URIS)
 
     return
-
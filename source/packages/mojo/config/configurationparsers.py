@@ -0,0 +1,369 @@
+"""
+.. module:: configurationparsers
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the registry of the parser and emitter backends that are used to
+               read and write YAML and JSON configuration content.  The fastest backend that is installed
+               is used unless a backend is selected with the 'MJR_CONFIG_YAML_PARSER' or
+               'MJR_CONFIG_JSON_PARSER' settings.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Callable, Dict, IO, List, Optional, Union
+
+import importlib.util
+import json
+import math
+import re
+import threading
+
+from mojo.errors.exceptions import ConfigurationError
+
+from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+
+AUTO_SELECT_BACKEND = "auto"
+
+ContentType = Union[str, bytes, IO]
+
+# The orjson and msgspec backends only handle integers from -2**63 to 2**64 - 1, orjson silently turns
+# integers outside that range into floats.  A negative integer can be out of range with 19 digits, so content
+# with a run of 19 or more digits is parsed with the json module instead.
+LARGE_INTEGER_EXP = re.compile(r"\d{19,}")
+LARGE_INTEGER_BYTES_EXP = re.compile(rb"\d{19,}")
+
+INTEGER_64_MIN = -(2 ** 63)
+INTEGER_64_MAX = 2 ** 64 - 1
+
+
+class ParserBackend:
+    """
+        A :class:`ParserBackend` pairs the functions that parse and emit the content of a configuration format
+        for a parsing library.
+    """
+
+    def __init__(self, name: str, config_format: ConfigurationFormat, loads: Callable[[ContentType], Any],
+                 dumps: Callable[[Any, Optional[IO], Optional[int], bool], Optional[str]], available: Callable[[], bool]):
+        """
+            Creates a parser backend.
+
+            :param name: The name used to select the backend.
+            :param config_format: The configuration format the backend parses.
+            :param loads: The function that parses content, which can be a str, bytes or a stream.
+            :param dumps: The function that emits content to a stream, or returns a str if the stream is None.
+            :param available: The function that checks if the library the backend uses is installed.
+        """
+        self._name = name
+        self._config_format = config_format
+        self._loads = loads
+        self._dumps = dumps
+        self._available = available
+        return
+
+    @property
+    def config_format(self) -> ConfigurationFormat:
+        return self._config_format
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def is_available(self) -> bool:
+        return self._available()
+
+    def dumps(self, config_info: Any, stream: Optional[IO] = None, indent: Optional[int] = 4, safe: bool = True) -> Optional[str]:
+        return self._dumps(config_info, stream, indent, safe)
+
+    def loads(self, content: ContentType) -> Any:
+        return self._loads(content)
+
+
+PARSER_BACKENDS_LOCK = threading.Lock()
+PARSER_BACKENDS: Dict[ConfigurationFormat, List[ParserBackend]] = {
+    ConfigurationFormat.YAML: [],
+    ConfigurationFormat.JSON: []
+}
+
+SELECTED_BACKENDS: Dict[ConfigurationFormat, ParserBackend] = {}
+
+
+def register_parser_backend(backend: ParserBackend, prefer: bool = False):
+    """
+        Registers a parser backend.  When the backend is auto selected, the available backends are tried in
+        the order they were registered.
+
+        :param backend: The backend to register.
+        :param prefer: Indicates the backend should be tried before the backends that are already registered.
+    """
+
+    PARSER_BACKENDS_LOCK.acquire()
+    try:
+        backends = PARSER_BACKENDS.setdefault(backend.config_format, [])
+        if prefer:
+            backends.insert(0, backend)
+        else:
+            backends.append(backend)
+
+        SELECTED_BACKENDS.clear()
+    finally:
+        PARSER_BACKENDS_LOCK.release()
+
+    return
+
+
+def get_parser_backend(config_format: Union[str, ConfigurationFormat]) -> ParserBackend:
+    """
+        Gets the parser backend to use for a configuration format.  The backend named by the format's setting
+        is used, or the first available backend if the setting is 'auto'.
+
+        :param config_format: The configuration format to get the backend for.
+
+        :returns: The parser backend for the format.
+    """
+
+    config_format = ConfigurationFormat(config_format)
+
+    backend = SELECTED_BACKENDS.get(config_format)
+    if backend is None:
+        if config_format == ConfigurationFormat.YAML:
+            selection = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_YAML_PARSER
+        else:
+            selection = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_JSON_PARSER
+
+        PARSER_BACKENDS_LOCK.acquire()
+        try:
+            for cand in PARSER_BACKENDS.get(config_format, []):
+                if (selection == AUTO_SELECT_BACKEND or cand.name == selection) and cand.is_available():
+                    backend = cand
+                    break
+
+            if backend is None:
+                errmsg = f"No {config_format.value} parser backend is available for selection='{selection}'."
+                raise ConfigurationError(errmsg)
+
+            SELECTED_BACKENDS[config_format] = backend
+        finally:
+            PARSER_BACKENDS_LOCK.release()
+
+    return backend
+
+
+def load_configuration_content(config_format: Union[str, ConfigurationFormat], content: ContentType) -> Any:
+    """
+        Parses configuration content with the selected parser backend for the format.
+
+        :param config_format: The format of the content.
+        :param content: The content to parse as a str, bytes or a stream.
+
+        :returns: The parsed configuration.
+    """
+    backend = get_parser_backend(config_format)
+    config_info = backend.loads(content)
+    return config_info
+
+
+def dump_configuration_content(config_format: Union[str, ConfigurationFormat], config_info: Any, stream: Optional[IO] = None,
+                               indent: Optional[int] = 4, safe: bool = True) -> Optional[str]:
+    """
+        Emits configuration content with the selected emitter backend for the format.
+
+        :param config_format: The format to emit.
+        :param config_info: The configuration to emit.
+        :param stream: An optional text stream to write the content to.
+        :param indent: The indentation to use.
+        :param safe: For YAML, indicates only the standard YAML tags should be emitted.
+
+        :returns: The content as a str if no stream was provided, otherwise None.
+    """
+    backend = get_parser_backend(config_format)
+    content = backend.dumps(config_info, stream, indent, safe)
+    return content
+
+
+def reset_parser_backend_selection():
+    """
+        Clears the cached backend selections so the backends are selected again using the current settings.
+    """
+    PARSER_BACKENDS_LOCK.acquire()
+    try:
+        SELECTED_BACKENDS.clear()
+    finally:
+        PARSER_BACKENDS_LOCK.release()
+    return
+
+
+def _read_content(content: ContentType) -> Union[str, bytes]:
+    if hasattr(content, "read"):
+        content = content.read()
+    return content
+
+
+def _write_content(content: str, stream: Optional[IO]) -> Optional[str]:
+    if stream is not None:
+        stream.write(content)
+        content = None
+    return content
+
+
+def _is_module_available(module_name: str) -> bool:
+    return importlib.util.find_spec(module_name) is not None
+
+
+def _has_large_integers(content: Union[str, bytes]) -> bool:
+    if isinstance(content, bytes):
+        found = LARGE_INTEGER_BYTES_EXP.search(content)
+    else:
+        found = LARGE_INTEGER_EXP.search(content)
+    return found is not None
+
+
+def _has_unsupported_numbers(config_info: Any) -> bool:
+    """
+        Checks for integers that do not fit in 64 bits and for NaN or Infinity, which orjson and msgspec
+        either reject or silently write as null.
+    """
+
+    if isinstance(config_info, dict):
+        for val in config_info.values():
+            if _has_unsupported_numbers(val):
+                return True
+    elif isinstance(config_info, (list, tuple)):
+        for val in config_info:
+            if _has_unsupported_numbers(val):
+                return True
+    elif isinstance(config_info, float):
+        return not math.isfinite(config_info)
+    elif isinstance(config_info, int) and not isinstance(config_info, bool):
+        return config_info < INTEGER_64_MIN or config_info > INTEGER_64_MAX
+
+    return False
+
+
+def _get_yaml():
+    """
+        Imports the 'yaml' module the first time a YAML backend is used.  The configuration types register
+        their representers when the module is imported.
+    """
+    import yaml
+    return yaml
+
+
+def _libyaml_available() -> bool:
+    yaml = _get_yaml()
+    return yaml.__with_libyaml__
+
+
+def _libyaml_loads(content: ContentType) -> Any:
+    from mojo.config.encryptedfields import get_encrypted_field_loader
+
+    yaml = _get_yaml()
+    return yaml.load(content, Loader=get_encrypted_field_loader(use_libyaml=True))
+
+
+def _libyaml_dumps(config_info: Any, stream: Optional[IO], indent: Optional[int], safe: bool) -> Optional[str]:
+    yaml = _get_yaml()
+    dumper = yaml.CSafeDumper if safe else yaml.CDumper
+    return yaml.dump(config_info, stream, Dumper=dumper, indent=indent)
+
+
+def _pyyaml_loads(content: ContentType) -> Any:
+    from mojo.config.encryptedfields import get_encrypted_field_loader
+
+    yaml = _get_yaml()
+    return yaml.load(content, Loader=get_encrypted_field_loader())
+
+
+def _pyyaml_dumps(config_info: Any, stream: Optional[IO], indent: Optional[int], safe: bool) -> Optional[str]:
+    yaml = _get_yaml()
+    dumper = yaml.SafeDumper if safe else yaml.Dumper
+    return yaml.dump(config_info, stream, Dumper=dumper, indent=indent)
+
+
+def _orjson_loads(content: ContentType) -> Any:
+    import orjson
+
+    content = _read_content(content)
+    if _has_large_integers(content):
+        return _json_loads(content)
+
+    try:
+        config_info = orjson.loads(content)
+    except orjson.JSONDecodeError:
+        # orjson rejects NaN and Infinity, which the json module accepts
+        config_info = _json_loads(content)
+
+    return config_info
+
+
+def _orjson_dumps(config_info: Any, stream: Optional[IO], indent: Optional[int], safe: bool) -> Optional[str]:
+
+    if indent not in [None, 2] or _has_unsupported_numbers(config_info):
+        # orjson can only indent with two spaces, keep the layout of the files the same as before, and
+        # it would write NaN and Infinity as null
+        return _json_dumps(config_info, stream, indent, safe)
+
+    import orjson
+
+    options = orjson.OPT_INDENT_2 if indent == 2 else 0
+    try:
+        content = orjson.dumps(config_info, option=options).decode("utf-8")
+    except orjson.JSONEncodeError:
+        return _json_dumps(config_info, stream, indent, safe)
+
+    return _write_content(content, stream)
+
+
+def _msgspec_loads(content: ContentType) -> Any:
+    import msgspec
+
+    content = _read_content(content)
+    if _has_large_integers(content):
+        return _json_loads(content)
+
+    try:
+        config_info = msgspec.json.decode(content)
+    except msgspec.DecodeError:
+        # msgspec rejects NaN and Infinity, which the json module accepts
+        config_info = _json_loads(content)
+
+    return config_info
+
+
+def _msgspec_dumps(config_info: Any, stream: Optional[IO], indent: Optional[int], safe: bool) -> Optional[str]:
+    import msgspec
+
+    if _has_unsupported_numbers(config_info):
+        # msgspec would reject the large integers and write NaN and Infinity as null
+        return _json_dumps(config_info, stream, indent, safe)
+
+    try:
+        content = msgspec.json.encode(config_info)
+    except (msgspec.EncodeError, OverflowError):
+        return _json_dumps(config_info, stream, indent, safe)
+
+    if indent is not None:
+        content = msgspec.json.format(content, indent=indent)
+    content = content.decode("utf-8")
+
+    return _write_content(content, stream)
+
+
+def _json_loads(content: ContentType) -> Any:
+    return json.loads(_read_content(content))
+
+
+def _json_dumps(config_info: Any, stream: Optional[IO], indent: Optional[int], safe: bool) -> Optional[str]:
+    content = json.dumps(config_info, indent=indent)
+    return _write_content(content, stream)
+
+
+register_parser_backend(ParserBackend("libyaml", ConfigurationFormat.YAML, _libyaml_loads, _libyaml_dumps, _libyaml_available))
+register_parser_backend(ParserBackend("pyyaml", ConfigurationFormat.YAML, _pyyaml_loads, _pyyaml_dumps, lambda: True))
+
+register_parser_backend(ParserBackend("orjson", ConfigurationFormat.JSON, _orjson_loads, _orjson_dumps, lambda: _is_module_available("orjson")))
+register_parser_backend(ParserBackend("msgspec", ConfigurationFormat.JSON, _msgspec_loads, _msgspec_dumps, lambda: _is_module_available("msgspec")))
+register_parser_backend(ParserBackend("json", ConfigurationFormat.JSON, _json_loads, _json_dumps, lambda: True))
@@ -12,38 +12,140 @@ __copyright__ = "Copyright 2020, Myron W Walker"
 __credits__ = []
 
 
-from typing import Optional
+from typing import Any, Optional
 
-from mojo.startup.wellknown import StartupConfigSingleton
-from mojo.startup.presencesettings import establish_presence_settings
+import threading
 
-default_config = {}
 
-config = StartupConfigSingleton()
-if "MOJO-CONFIG" in config:
-    default_config = config["MOJO-CONFIG"]
+class StartupConfigSettings(type):
+    """
+        Metaclass for a class of settings where each 'MJR_' setting can be overridden in the 'MOJO-CONFIG'
+        section of the startup configuration.  The startup configuration is only read the first time one of
+        the settings is accessed, not when the settings module is imported.  Settings that are assigned in code
+        before then keep the value they were assigned.
+    """
 
-class MOJO_CONFIG_DEFAULTS:
+    def __new__(mcs, name, bases, namespace):
+        defaults = { sname: namespace.pop(sname) for sname in list(namespace.keys()) if sname.startswith("MJR_") }
+
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._setting_defaults = defaults
+        cls._settings_loaded = False
+        cls._settings_lock = threading.RLock()
+
+        return cls
+
+    def __getattr__(cls, name: str) -> Any:
+
+        if name not in type.__getattribute__(cls, "_setting_defaults"):
+            errmsg = f"type object '{cls.__name__}' has no attribute '{name}'"
+            raise AttributeError(errmsg)
+
+        cls.load_startup_settings()
+
+        return type.__getattribute__(cls, name)
+
+    def get_setting_default(cls, name: str) -> Any:
+        """
+            Gets the default value a setting was declared with, without reading the startup configuration.
+        """
+        return cls._setting_defaults[name]
+
+    def load_startup_settings(cls):
+        """
+            Reads the overrides for the settings from the startup configuration.
+        """
+
+        cls._settings_lock.acquire()
+        try:
+            if not cls._settings_loaded:
+                from mojo.startup.wellknown import StartupConfigSingleton
+
+                default_config = {}
+
+                config = StartupConfigSingleton()
+                if "MOJO-CONFIG" in config:
+                    default_config = config["MOJO-CONFIG"]
+
+                for sname, svalue in cls._setting_defaults.items():
+                    if sname in cls.__dict__:
+                        continue
+                    if sname in default_config:
+                        svalue = default_config[sname]
+                    setattr(cls, sname, svalue)
+
+                cls._settings_loaded = True
+        finally:
+            cls._settings_lock.release()
+
+        return
+
+
+class MOJO_CONFIG_DEFAULTS(metaclass=StartupConfigSettings):
 
     MJR_CONFIG_REQUIRE_CREDENTIALS = False
-    if "MJR_CONFIG_REQUIRE_CREDENTIALS" in default_config:
-        MJR_CONFIG_REQUIRE_CREDENTIALS = default_config["MJR_CONFIG_REQUIRE_CREDENTIALS"]
 
     MJR_CONFIG_REQUIRE_LANDSCAPE = False
-    if "MJR_CONFIG_REQUIRE_LANDSCAPE" in default_config:
-        MJR_CONFIG_REQUIRE_LANDSCAPE = default_config["MJR_CONFIG_REQUIRE_LANDSCAPE"]
 
     MJR_CONFIG_REQUIRE_RUNTIME = False
-    if "MJR_CONFIG_REQUIRE_RUNTIME" in default_config:
-        MJR_CONFIG_REQUIRE_RUNTIME = default_config["MJR_CONFIG_REQUIRE_RUNTIME"]
 
     MJR_CONFIG_REQUIRE_TOPOLOGY = False
-    if "MJR_CONFIG_REQUIRE_TOPOLOGY" in default_config:
-        MJR_CONFIG_REQUIRE_TOPOLOGY = default_config["MJR_CONFIG_REQUIRE_TOPOLOGY"]
 
     MJR_CONFIG_STORAGE_URI = ""
-    if "MJR_CONFIG_STORAGE_URI" in default_config:
-        MJR_CONFIG_STORAGE_URI = default_config["MJR_CONFIG_STORAGE_URI"]
+
+    MJR_CONFIG_CONCURRENT_SOURCES = False
+
+    MJR_CONFIG_MAX_SOURCE_WORKERS = 8
+
+    MJR_CONFIG_SOURCE_CONNECT_TIMEOUT = 10
+
+    MJR_CONFIG_SOURCE_READ_TIMEOUT = 30
+
+    MJR_CONFIG_HTTP_POOL_SIZE = 10
+
+    MJR_CONFIG_HTTP_PRECONNECT = False
+
+    MJR_CONFIG_USE_SOURCE_MANIFESTS = False
+
+    MJR_CONFIG_SOURCE_MANIFEST_TTL = 300
+
+    MJR_CONFIG_USE_DIRECTORY_INDEX = True
+
+    MJR_CONFIG_HTTP_HEDGE_DELAY = None
+
+    MJR_CONFIG_USE_HTTP_CACHE = False
+
+    MJR_CONFIG_HTTP_CACHE_SIZE = 64 * 1024 * 1024
+
+    MJR_CONFIG_YAML_PARSER = "auto"
+
+    MJR_CONFIG_JSON_PARSER = "auto"
+
+    MJR_CONFIG_USE_PARSED_CACHE = False
+
+    MJR_CONFIG_PARSED_CACHE_SIZE = 128 * 1024 * 1024
+
+    MJR_CONFIG_PARSED_CACHE_VERIFY_HASH = False
+
+    MJR_CONFIG_PARSED_CACHE_PLAINTEXT = False
+
+    MJR_CONFIG_RESULT_CACHE_TTL = 0
+
+    MJR_CONFIG_RESULT_CACHE_SIZE = 64 * 1024 * 1024
+
+    MJR_CONFIG_KDF = "scrypt"
+
+    MJR_CONFIG_KDF_USE_KEYRING = False
+
+    MJR_CONFIG_KDF_KEYRING_TIMEOUT = 3600
+
+    MJR_CONFIG_SHARE_SOURCES = True
+
+    MJR_CONFIG_CONCURRENT_CATEGORIES = True
+
+    MJR_CONFIG_LAZY_RESOLUTION = False
+
+    MJR_CONFIG_LIVE_RELOAD = False
 
     DEFAULT_CONFIGURATION = {
         "version": "1.0.0",
@@ -65,6 +167,8 @@ def establish_config_settings(*, name: Optional[str]=None, home_dir: Optional[st
     if not CONFIG_SETTINGS_ESTABLISHED:
         CONFIG_SETTINGS_ESTABLISHED = True
 
+        from mojo.startup.presencesettings import establish_presence_settings
+
         establish_presence_settings(name=name, home_dir=home_dir, settings_file=settings_file, extension_modules=extension_modules, **other)
 
         if default_configuration is not None:
@@ -74,12 +74,14 @@ class MOJO_CONFIG_VARNAMES:
 
 class MOJO_CONFIG_VARIABLES(MOJO_PRESENCE_VARIABLES):
 
-    MJR_CONFIG_REQUIRE_CREDENTIALS = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_REQUIRE_CREDENTIALS
-    MJR_CONFIG_REQUIRE_LANDSCAPE = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_REQUIRE_LANDSCAPE
-    MJR_CONFIG_REQUIRE_RUNTIME = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_REQUIRE_RUNTIME
-    MJR_CONFIG_REQUIRE_TOPOLOGY = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_REQUIRE_TOPOLOGY
+    # Start with the declared defaults so the startup configuration is not read at import, the overrides
+    # from the startup configuration and the environment are applied when the variables are resolved
+    MJR_CONFIG_REQUIRE_CREDENTIALS = MOJO_CONFIG_DEFAULTS.get_setting_default("MJR_CONFIG_REQUIRE_CREDENTIALS")
+    MJR_CONFIG_REQUIRE_LANDSCAPE = MOJO_CONFIG_DEFAULTS.get_setting_default("MJR_CONFIG_REQUIRE_LANDSCAPE")
+    MJR_CONFIG_REQUIRE_RUNTIME = MOJO_CONFIG_DEFAULTS.get_setting_default("MJR_CONFIG_REQUIRE_RUNTIME")
+    MJR_CONFIG_REQUIRE_TOPOLOGY = MOJO_CONFIG_DEFAULTS.get_setting_default("MJR_CONFIG_REQUIRE_TOPOLOGY")
 
-    MJR_CONFIG_STORAGE_URI = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_STORAGE_URI
+    MJR_CONFIG_STORAGE_URI = MOJO_CONFIG_DEFAULTS.get_setting_default("MJR_CONFIG_STORAGE_URI")
 
     MJR_CONFIG_USE_CREDENTIALS = False
     MJR_CONFIG_USE_LANDSCAPE = False
@@ -135,6 +137,13 @@ def resolve_configuration_variables():
     ctx.insert(ContextPaths.PRESENCE_CONFIG_DIRECTORY, MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY)
 
 
+    # Pick up any overrides of the defaults from the startup configuration
+    MOJO_CONFIG_VARIABLES.MJR_CONFIG_REQUIRE_CREDENTIALS = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_REQUIRE_CREDENTIALS
+    MOJO_CONFIG_VARIABLES.MJR_CONFIG_REQUIRE_LANDSCAPE = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_REQUIRE_LANDSCAPE
+    MOJO_CONFIG_VARIABLES.MJR_CONFIG_REQUIRE_RUNTIME = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_REQUIRE_RUNTIME
+    MOJO_CONFIG_VARIABLES.MJR_CONFIG_REQUIRE_TOPOLOGY = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_REQUIRE_TOPOLOGY
+
+    MOJO_CONFIG_VARIABLES.MJR_CONFIG_STORAGE_URI = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_STORAGE_URI
     if MOJO_CONFIG_VARNAMES.MJR_CONFIG_STORAGE_URI in environ:
         MOJO_CONFIG_VARIABLES.MJR_CONFIG_STORAGE_URI = environ[MOJO_CONFIG_VARNAMES.MJR_CONFIG_STORAGE_URI]
     ctx.insert(ContextPaths.CONFIG_STORAGE_URI, MOJO_CONFIG_VARIABLES.MJR_CONFIG_STORAGE_URI)
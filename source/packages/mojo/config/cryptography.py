@@ -11,12 +11,49 @@ __author__ = "Myron Walker"
 __copyright__ = "Copyright 2020, Myron W Walker"
 __credits__ = []
 
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple, Union
+
 import base64
+import hashlib
+import hmac
+import io
+import json
+import os
 import random
+import struct
+import threading
 
-from cryptography.fernet import Fernet
+from mojo.errors.exceptions import ConfigurationError
 
 from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+from mojo.config.encryptedfields import dump_field_encrypted_yaml, encrypt_configuration_fields
+
+KDF_SCRYPT = "scrypt"
+KDF_PBKDF2 = "pbkdf2-sha256"
+
+DEFAULT_SCRYPT_PARAMETERS = {"n": 2 ** 15, "r": 8, "p": 1}
+DEFAULT_PBKDF2_ITERATIONS = 600000
+
+# The KDF parameters are read from the document, so they are limited to keep a crafted document from
+# making the derivation use an unbounded amount of memory or time.  Scrypt uses 128 * n * r bytes.
+MAX_SCRYPT_N = 2 ** 20
+MAX_SCRYPT_R = 16
+MAX_SCRYPT_P = 16
+MAX_SCRYPT_MEMORY = 256 * 1024 * 1024
+MAX_PBKDF2_ITERATIONS = 10000000
+
+ENCRYPTED_FORMAT_VERSION_1 = "1.0"
+ENCRYPTED_FORMAT_VERSION_2 = "2.0"
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Each chunk of a version 2 document starts with a header that binds the chunk to its document and
+# position: a 16 byte stream id that is the same for every chunk, the chunk index and a final chunk flag.
+CHUNK_HEADER = struct.Struct(">16sIB")
+
+DERIVED_KEY_LOCK = threading.Lock()
+DERIVED_KEY_TABLE: Dict[Tuple[str, str], bytes] = {}
 
 def encode_key(key: bytes) -> str:
     rtnval = base64.b64encode(key)
@@ -46,25 +83,247 @@ def generate_fernet_key(keyphrase: str) -> str:
     return key
 
 
-def create_encrypted_configuration(key: str, plain_configuration: str, format: str=ConfigurationFormat.JSON):
+def create_kdf_info(kdf: Optional[str] = None) -> dict:
+    """
+        Creates the key derivation parameters for a new encrypted configuration with a new random salt.
+
+        :param kdf: The key derivation function to use, 'scrypt' or 'pbkdf2-sha256'.  Defaults to the
+                    'MJR_CONFIG_KDF' setting.
+
+        :returns: The key derivation parameters that are stored in the 'kdf' field of the docinfo.
+    """
+
+    if kdf is None:
+        kdf = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_KDF
+
+    salt = base64.b64encode(os.urandom(16)).decode("utf-8")
+
+    if kdf == KDF_SCRYPT:
+        kdf_info = {"name": KDF_SCRYPT, "salt": salt}
+        kdf_info.update(DEFAULT_SCRYPT_PARAMETERS)
+    elif kdf == KDF_PBKDF2:
+        kdf_info = {"name": KDF_PBKDF2, "salt": salt, "iterations": DEFAULT_PBKDF2_ITERATIONS}
+    else:
+        errmsg = f"Unsupported key derivation function kdf={kdf}"
+        raise ConfigurationError(errmsg)
+
+    return kdf_info
+
+
+def derive_fernet_key(keyphrase: str, kdf_info: dict) -> bytes:
+    """
+        Derives a 'Fernet' encryption and decryption key from the 'keyphrase' using the key derivation function
+        and salt in the 'kdf_info'.  Derived keys are memoized for the life of the process and, when the
+        'MJR_CONFIG_KDF_USE_KEYRING' setting is enabled, stored in the Linux user keyring so other processes
+        run by the same user don't pay the cost of the derivation.
+
+        :param keyphrase: The keyphrase to derive the key from.
+        :param kdf_info: The key derivation parameters from the 'kdf' field of the docinfo.
+
+        :returns: The derived encryption and decryption key
+
+        :raises ConfigurationError: If the key derivation parameters are unsupported or over the limits.
+    """
+
+    validate_kdf_info(kdf_info)
+
+    params_id = json.dumps(kdf_info, sort_keys=True)
+    keyphrase_check = hmac.new(base64.b64decode(kdf_info["salt"]), keyphrase.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    memo_key = (keyphrase_check, params_id)
+
+    key = DERIVED_KEY_TABLE.get(memo_key)
+    if key is None:
+
+        keyring_description = None
+        if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_KDF_USE_KEYRING:
+            keyring_description = f"mojo-config:{hashlib.sha256(params_id.encode('utf-8')).hexdigest()}"
+            key = _read_keyring_key(keyring_description, keyphrase_check)
+
+        if key is None:
+            key = _run_kdf(keyphrase, kdf_info)
+
+            if keyring_description is not None:
+                from mojo.config.kernelkeyring import write_keyring_entry
+
+                payload = json.dumps({"check": keyphrase_check, "key": key.decode("utf-8")}).encode("utf-8")
+                write_keyring_entry(keyring_description, payload, timeout=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_KDF_KEYRING_TIMEOUT)
+
+        DERIVED_KEY_LOCK.acquire()
+        try:
+            DERIVED_KEY_TABLE[memo_key] = key
+        finally:
+            DERIVED_KEY_LOCK.release()
+
+    return key
+
+
+def validate_kdf_info(kdf_info: dict):
+    """
+        Validates the key derivation parameters from the 'kdf' field of a docinfo against the supported key
+        derivation functions and the maximum cost of the derivation.
+
+        :raises ConfigurationError: If the parameters are unsupported, malformed or over the limits.
+    """
+
+    if not isinstance(kdf_info, dict) or not isinstance(kdf_info.get("salt"), str):
+        errmsg = "The key derivation parameters of the encrypted configuration are malformed."
+        raise ConfigurationError(errmsg)
+
+    kdf_name = kdf_info.get("name")
+
+    if kdf_name == KDF_SCRYPT:
+        n = _get_kdf_parameter(kdf_info, "n", MAX_SCRYPT_N)
+        r = _get_kdf_parameter(kdf_info, "r", MAX_SCRYPT_R)
+        _get_kdf_parameter(kdf_info, "p", MAX_SCRYPT_P)
+
+        if n < 2 or (n & (n - 1)) != 0:
+            errmsg = f"The scrypt parameter n={n} must be a power of 2."
+            raise ConfigurationError(errmsg)
 
-    encrypted_configuration = encrypt_content(key, plain_configuration)
+        if 128 * n * r > MAX_SCRYPT_MEMORY:
+            errmsg = f"The scrypt parameters n={n} r={r} need more than the maximum of {MAX_SCRYPT_MEMORY} bytes."
+            raise ConfigurationError(errmsg)
+
+    elif kdf_name == KDF_PBKDF2:
+        _get_kdf_parameter(kdf_info, "iterations", MAX_PBKDF2_ITERATIONS)
+
+    else:
+        errmsg = f"Unsupported key derivation function kdf={kdf_name}"
+        raise ConfigurationError(errmsg)
+
+    return
+
+
+class ConfigurationKey:
+    """
+        The :class:`ConfigurationKey` provides the decryption key for an encrypted configuration document from
+        either an explicit key or a keyphrase.  Documents that have a 'kdf' field in their docinfo get a key
+        derived with the key derivation function and salt of the document, legacy documents get the key from
+        :func:`generate_fernet_key`.
+    """
+
+    def __init__(self, key: Optional[Union[str, bytes]] = None, keyphrase: Optional[str] = None):
+        self._key = key
+        self._keyphrase = keyphrase
+        self._legacy_key = None
+        return
+
+    @property
+    def key(self) -> Optional[Union[str, bytes]]:
+        return self._key
+
+    @property
+    def keyphrase(self) -> Optional[str]:
+        return self._keyphrase
+
+    def get_key(self, docinfo: Optional[dict] = None) -> Optional[Union[str, bytes]]:
+        """
+            Gets the key to use to decrypt the encrypted configuration document provided.
+        """
+
+        if docinfo is not None and "kdf" in docinfo and self._keyphrase is not None:
+            key = derive_fernet_key(self._keyphrase, docinfo["kdf"])
+        elif self._key is not None:
+            key = self._key
+        elif self._keyphrase is not None:
+            if self._legacy_key is None:
+                self._legacy_key = generate_fernet_key(self._keyphrase)
+            key = self._legacy_key
+        else:
+            key = None
+
+        return key
+
+
+def create_encrypted_configuration(key: str, plain_configuration: str, format: str=ConfigurationFormat.JSON, kdf_info: Optional[dict] = None,
+                                   version: str = ENCRYPTED_FORMAT_VERSION_1, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+        Creates an encrypted configuration document.
+
+        :param key: The key to encrypt the configuration with.
+        :param plain_configuration: The plain text content of the configuration.
+        :param format: The format of the plain text content.
+        :param kdf_info: The key derivation parameters the key was derived with, if it was derived with
+                         :func:`derive_fernet_key`.
+        :param version: The version of the encrypted document format, "1.0" encrypts the content as a single
+                        token, "2.0" encrypts the content as a list of chunks that can be decrypted incrementally.
+        :param chunk_size: The size of the plain text chunks for the "2.0" format.
+    """
+
+    if version == ENCRYPTED_FORMAT_VERSION_2:
+        encrypted_configuration = encrypt_content_chunks(key, plain_configuration, chunk_size=chunk_size)
+    elif version == ENCRYPTED_FORMAT_VERSION_1:
+        encrypted_configuration = encrypt_content(key, plain_configuration)
+        if kdf_info is not None:
+            version = "1.1"
+    else:
+        errmsg = f"Unsupported encrypted configuration version={version}"
+        raise ConfigurationError(errmsg)
 
     docinfo = {
-        "version": "1.0",
+        "version": version,
         "format": format,
         "encrypted_content": encrypted_configuration
     }
 
+    if kdf_info is not None:
+        docinfo["kdf"] = kdf_info
+
+    return docinfo
+
+
+def create_encrypted_configuration_with_keyphrase(keyphrase: str, plain_configuration: str, format: str=ConfigurationFormat.JSON,
+                                                  kdf: Optional[str] = None, version: str = ENCRYPTED_FORMAT_VERSION_1):
+    """
+        Creates an encrypted configuration document with a key that is derived from the keyphrase with a
+        key derivation function and a new random salt, which are stored in the docinfo.
+    """
+
+    kdf_info = create_kdf_info(kdf)
+
+    key = derive_fernet_key(keyphrase, kdf_info)
+
+    docinfo = create_encrypted_configuration(key, plain_configuration, format=format, kdf_info=kdf_info, version=version)
+
     return docinfo
 
 
+def create_field_encrypted_configuration(key: str, config_info: dict, field_names: List[str], format: str=ConfigurationFormat.YAML) -> str:
+    """
+        Creates the content of a configuration where only the values of the fields with the names provided are
+        encrypted.  In YAML the encrypted values are written as `!encrypted` tags, in JSON as `{"$enc": ...}`
+        markers.  The rest of the configuration stays readable and is loaded without decrypting anything.
+
+        :param key: The key to encrypt the fields with.
+        :param config_info: The configuration to encrypt the fields of.
+        :param field_names: The names of the fields to encrypt wherever they are found in the configuration.
+        :param format: The format of the content to create.
+
+        :returns: The content of the configuration.
+    """
+
+    encrypted_info = encrypt_configuration_fields(key, config_info, field_names)
+
+    if format == ConfigurationFormat.YAML:
+        content = dump_field_encrypted_yaml(encrypted_info)
+    elif format == ConfigurationFormat.JSON:
+        content = json.dumps(encrypted_info, indent=4)
+    else:
+        errmsg = f"Unsupported configuration format={format}"
+        raise ConfigurationError(errmsg)
+
+    return content
+
+
 def encrypt_content(key: str, plain_content: str) -> str:
     """
         Takes a plain content string and encrypts it with the key provided.  Then it
         converts the encrypted content to a base64 encoded str.
     """
     
+    from cryptography.fernet import Fernet
+
     cryptor = Fernet(key)
 
     # Before we can encrypt the configuration content, we need to convert it to bytes
@@ -79,12 +338,19 @@ def encrypt_content(key: str, plain_content: str) -> str:
     return encrypted_content
 
 
-def decrypt_content(key: str, encrypted_content: str) -> str:
+def decrypt_content(key: str, encrypted_content: Union[str, List[str]]) -> str:
     """
         Takes a base64 encoded and encrypted content string and decodes the content into bytes.  Then
         it decrypts the content and encodes the result as a str
     """
 
+    if isinstance(encrypted_content, list):
+        # Version "2.0" documents are a list of encrypted chunks
+        plaincontent = b"".join(iter_decrypted_chunks(key, encrypted_content)).decode("utf-8")
+        return plaincontent
+
+    from cryptography.fernet import Fernet
+
     cryptor = Fernet(key)
 
     # Encrypted content is b64 encoded so decode it first into bytes
@@ -98,3 +364,204 @@ def decrypt_content(key: str, encrypted_content: str) -> str:
 
     return plaincontent
 
+
+def encrypt_content_chunks(key: str, plain_content: Union[str, bytes], chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+    """
+        Encrypts content as a list of independently authenticated 'Fernet' tokens of at most 'chunk_size' bytes
+        of plain text each.  Each chunk carries a header with a stream id, its index and a final chunk flag, so
+        chunks that are dropped, re-ordered or mixed in from another document are detected when decrypting.
+    """
+
+    if isinstance(plain_content, str):
+        plain_content = plain_content.encode("utf-8")
+
+    if chunk_size <= 0:
+        errmsg = f"The chunk size must be greater than zero, chunk_size={chunk_size}"
+        raise ConfigurationError(errmsg)
+
+    from cryptography.fernet import Fernet
+
+    cryptor = Fernet(key)
+
+    stream_id = os.urandom(16)
+
+    content_view = memoryview(plain_content)
+    content_len = len(content_view)
+
+    encrypted_chunks = []
+
+    offset = 0
+    index = 0
+    while True:
+        chunk = content_view[offset: offset + chunk_size]
+        offset += len(chunk)
+
+        final = offset >= content_len
+        header = CHUNK_HEADER.pack(stream_id, index, 1 if final else 0)
+
+        token = cryptor.encrypt(header + bytes(chunk))
+        encrypted_chunks.append(token.decode("utf-8"))
+
+        if final:
+            break
+        index += 1
+
+    return encrypted_chunks
+
+
+def iter_decrypted_chunks(key: str, encrypted_chunks: Iterable[str]) -> Iterator[bytes]:
+    """
+        Decrypts the chunks of a version "2.0" encrypted document one at a time and yields the plain text bytes
+        of each chunk.
+
+        :raises ConfigurationError: If the chunks are out of order, from different documents or truncated.
+    """
+
+    from cryptography.fernet import Fernet
+
+    cryptor = Fernet(key)
+
+    stream_id = None
+    expected_index = 0
+    final = False
+
+    for token in encrypted_chunks:
+        if final:
+            errmsg = "Encrypted configuration has content after the final chunk."
+            raise ConfigurationError(errmsg)
+
+        plainbytes = cryptor.decrypt(token)
+
+        if len(plainbytes) < CHUNK_HEADER.size:
+            errmsg = f"Encrypted configuration chunk {expected_index} is too short to have a chunk header."
+            raise ConfigurationError(errmsg)
+
+        chunk_stream_id, chunk_index, chunk_final = CHUNK_HEADER.unpack_from(plainbytes)
+        if stream_id is None:
+            stream_id = chunk_stream_id
+
+        if chunk_stream_id != stream_id or chunk_index != expected_index:
+            errmsg = f"Encrypted configuration chunk {expected_index} is out of order or from another document."
+            raise ConfigurationError(errmsg)
+
+        final = chunk_final == 1
+        expected_index += 1
+
+        yield plainbytes[CHUNK_HEADER.size:]
+
+    if not final:
+        errmsg = "Encrypted configuration is truncated, the final chunk is missing."
+        raise ConfigurationError(errmsg)
+
+    return
+
+
+class DecryptingStream(io.RawIOBase):
+    """
+        A read-only binary stream over the plain text of a version "2.0" encrypted document.  The chunks are
+        decrypted as the stream is read, so a parser that reads from the stream only ever needs one decrypted
+        chunk in memory in addition to what it has already parsed.
+    """
+
+    def __init__(self, key: str, encrypted_chunks: Iterable[str]):
+        super().__init__()
+        self._chunks = iter_decrypted_chunks(key, encrypted_chunks)
+        self._pending = b""
+        self._pending_offset = 0
+        return
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+
+        while self._pending_offset >= len(self._pending):
+            try:
+                self._pending = next(self._chunks)
+                self._pending_offset = 0
+            except StopIteration:
+                return 0
+
+        count = min(len(buffer), len(self._pending) - self._pending_offset)
+        buffer[:count] = self._pending[self._pending_offset: self._pending_offset + count]
+        self._pending_offset += count
+
+        return count
+
+
+def open_decrypted_content(key: str, docinfo: dict) -> IO[bytes]:
+    """
+        Opens a binary stream over the decrypted content of an encrypted configuration document.  Version "2.0"
+        documents are decrypted incrementally as the stream is read.
+
+        :param key: The key to decrypt the configuration with.
+        :param docinfo: The encrypted configuration document.
+
+        :returns: A binary stream of the plain text content of the configuration.
+    """
+
+    encrypted_content = docinfo["encrypted_content"]
+
+    if isinstance(encrypted_content, list):
+        stream = io.BufferedReader(DecryptingStream(key, encrypted_content), buffer_size=DEFAULT_CHUNK_SIZE)
+    else:
+        from cryptography.fernet import Fernet
+
+        cryptor = Fernet(key)
+        stream = io.BytesIO(cryptor.decrypt(base64.b64decode(encrypted_content)))
+
+    return stream
+
+
+def _get_kdf_parameter(kdf_info: dict, name: str, maximum: int) -> int:
+
+    value = kdf_info.get(name)
+
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1 or value > maximum:
+        errmsg = f"The key derivation parameter {name}={value!r} must be an integer from 1 to {maximum}."
+        raise ConfigurationError(errmsg)
+
+    return value
+
+
+def _read_keyring_key(description: str, keyphrase_check: str) -> Optional[bytes]:
+
+    from mojo.config.kernelkeyring import read_keyring_entry
+
+    key = None
+
+    payload = read_keyring_entry(description)
+    if payload is not None:
+        try:
+            entry = json.loads(payload)
+            # Make sure the key was derived from the same keyphrase
+            if hmac.compare_digest(entry["check"], keyphrase_check):
+                key = entry["key"].encode("utf-8")
+        except (ValueError, KeyError, TypeError):
+            key = None
+
+    return key
+
+
+def _run_kdf(keyphrase: str, kdf_info: dict) -> bytes:
+
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+    salt = base64.b64decode(kdf_info["salt"])
+    kdf_name = kdf_info.get("name")
+
+    if kdf_name == KDF_SCRYPT:
+        kdf = Scrypt(salt=salt, length=32, n=int(kdf_info["n"]), r=int(kdf_info["r"]), p=int(kdf_info["p"]))
+    elif kdf_name == KDF_PBKDF2:
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=int(kdf_info["iterations"]))
+    else:
+        errmsg = f"Unsupported key derivation function kdf={kdf_name}"
+        raise ConfigurationError(errmsg)
+
+    key_bytes = kdf.derive(keyphrase.encode("utf-8"))
+
+    key = base64.urlsafe_b64encode(key_bytes)
+
+    return key
@@ -0,0 +1,63 @@
+"""
+.. module:: deadline
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the :class:`Deadline` class which is used to put an overall
+               time budget on the resolution of configurations.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Optional
+
+import time
+
+
+class Deadline:
+    """
+        A :class:`Deadline` tracks the time that is remaining of an overall time budget.  The deadline
+        is passed down to the configuration sources so they can limit their timeouts to the time that
+        is remaining.
+    """
+
+    def __init__(self, budget: float):
+        """
+            Creates a deadline that expires after the budget provided.
+
+            :param budget: The time budget in seconds.
+        """
+        self._budget = budget
+        self._expires = time.monotonic() + budget
+        return
+
+    @property
+    def budget(self) -> float:
+        return self._budget
+
+    @property
+    def expired(self) -> bool:
+        rtnval = time.monotonic() >= self._expires
+        return rtnval
+
+    @property
+    def remaining(self) -> float:
+        rtnval = max(0.0, self._expires - time.monotonic())
+        return rtnval
+
+    def clamp_timeout(self, timeout: Optional[float]) -> float:
+        """
+            Limits a timeout so that it does not run past the deadline.
+
+            :param timeout: The timeout to limit or None for no timeout.
+
+            :returns: The timeout limited to the time remaining before the deadline.
+        """
+        remaining = self.remaining
+
+        if timeout is None or timeout > remaining:
+            timeout = remaining
+
+        return timeout
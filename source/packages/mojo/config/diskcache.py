@@ -0,0 +1,219 @@
+"""
+.. module:: diskcache
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains a small size bounded on-disk cache that is used to persist
+               configuration related results between processes.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Optional
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+CACHE_ENTRY_SUFFIX = ".cache"
+
+CACHE_DIR_MODE = 0o700
+
+
+class DiskCache:
+    """
+        The :class:`DiskCache` stores JSON entries as individual files in a cache directory.  Entries
+        are written to a temporary file and moved into place so that many processes can share the same
+        cache directory safely.  When the total size of the entries grows beyond the size bound, the least
+        recently used entries are evicted.  The modification time of an entry file is used to track when
+        the entry was last used.
+
+        The cache directory is created so only the owner can access it, the entry files are only readable
+        by the owner and entries that are owned by another user are ignored.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """
+            Creates a disk cache.
+
+            :param cache_dir: The directory to store the cache entries in.
+            :param max_bytes: The maximum total size in bytes of the entries in the cache.
+        """
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        return
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+            Gets the value stored in the cache for the key provided.
+
+            :param key: The key of the entry to lookup.
+
+            :returns: The value stored for the key or None if the key is not in the cache.
+        """
+
+        value = None
+
+        entry_file = self._entry_file(key)
+
+        try:
+            with open(entry_file, 'r', encoding="utf-8") as ef:
+                if hasattr(os, "getuid") and os.fstat(ef.fileno()).st_uid != os.getuid():
+                    # Don't trust entries that were written by another user
+                    entry = None
+                else:
+                    entry = json.load(ef)
+
+            if not isinstance(entry, dict) or entry.get("key") != key:
+                value = None
+            else:
+                value = entry.get("value")
+                # Mark the entry as recently used
+                os.utime(entry_file)
+
+        except (OSError, ValueError, TypeError):
+            value = None
+
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+            Stores a value in the cache for the key provided and evicts the least recently used entries
+            if the cache has grown beyond its size bound.
+
+            :param key: The key of the entry to store.
+            :param value: The value to store, the value must be made of dictionaries with string keys, lists,
+                          strings, integers, finite floats, booleans and None so it can be stored as JSON.
+
+            :raises TypeError: If the value cannot be stored as JSON without changing it.
+            :raises OSError: If the entry cannot be written to the cache directory.
+        """
+
+        if not is_json_value(value):
+            errmsg = f"The value for cache key={key} cannot be stored as JSON."
+            raise TypeError(errmsg)
+
+        os.makedirs(self._cache_dir, mode=CACHE_DIR_MODE, exist_ok=True)
+
+        entry_file = self._entry_file(key)
+
+        # The temporary file is created with a mode that only allows the owner to read and write it
+        tmpfd, tmpfile = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(tmpfd, 'w', encoding="utf-8") as tf:
+                json.dump({"key": key, "value": value}, tf, allow_nan=False)
+            os.replace(tmpfile, entry_file)
+        except:
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+            raise
+
+        self._evict()
+
+        return
+
+    def remove(self, key: str):
+        """
+            Removes the entry for the key provided from the cache.
+        """
+
+        try:
+            os.remove(self._entry_file(key))
+        except FileNotFoundError:
+            pass
+
+        return
+
+    def purge(self):
+        """
+            Removes all of the entries from the cache.
+        """
+
+        for entry_file, _, _ in self._list_entries():
+            try:
+                os.remove(entry_file)
+            except FileNotFoundError:
+                pass
+
+        return
+
+    def _entry_file(self, key: str) -> str:
+        entry_name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        entry_file = os.path.join(self._cache_dir, f"{entry_name}{CACHE_ENTRY_SUFFIX}")
+        return entry_file
+
+    def _evict(self):
+
+        with self._lock:
+            entries = self._list_entries()
+
+            total_bytes = sum([size for _, size, _ in entries])
+            if total_bytes > self._max_bytes:
+
+                # Evict the least recently used entries first
+                entries.sort(key=lambda entry: entry[2])
+
+                for entry_file, size, _ in entries:
+                    if total_bytes <= self._max_bytes:
+                        break
+
+                    try:
+                        os.remove(entry_file)
+                    except FileNotFoundError:
+                        # Another process has already evicted this entry
+                        pass
+
+                    total_bytes -= size
+
+        return
+
+    def _list_entries(self):
+
+        entries = []
+
+        try:
+            with os.scandir(self._cache_dir) as dirents:
+                for dent in dirents:
+                    if dent.name.endswith(CACHE_ENTRY_SUFFIX):
+                        try:
+                            stinfo = dent.stat()
+                            entries.append((dent.path, stinfo.st_size, stinfo.st_mtime_ns))
+                        except FileNotFoundError:
+                            pass
+        except FileNotFoundError:
+            pass
+
+        return entries
+
+
+def is_json_value(value: Any) -> bool:
+    """
+        Checks if a value can be stored as JSON and read back as an equal value.
+    """
+
+    if value is None or isinstance(value, (str, bool, int)):
+        is_json = True
+    elif isinstance(value, float):
+        is_json = value == value and value not in (float("inf"), float("-inf"))
+    elif isinstance(value, list):
+        # Read the raw items so encrypted fields are never decrypted into the cache
+        is_json = all(is_json_value(item) for item in list.__iter__(value))
+    elif isinstance(value, dict):
+        is_json = all(isinstance(key, str) and is_json_value(item) for key, item in dict.items(value))
+    else:
+        is_json = False
+
+    return is_json
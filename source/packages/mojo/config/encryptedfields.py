@@ -0,0 +1,390 @@
+"""
+.. module:: encryptedfields
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the field level encryption of configuration values.  Encrypted fields
+               are stored as a `{"$enc": <token>}` marker in JSON or as a `!encrypted <token>` tag in YAML.
+               When a configuration is loaded, the encrypted fields are kept as :class:`EncryptedValue`
+               handles that are only decrypted the first time the value is read.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Union
+
+import json
+import threading
+
+
+from mojo.errors.exceptions import ConfigurationError
+
+from mojo.config.frozen import FrozenDict, FrozenList
+from mojo.config.postimport import call_when_imported
+
+ENCRYPTED_FIELD_MARKER = "$enc"
+ENCRYPTED_FIELD_TAG = "!encrypted"
+
+ENCRYPTED_FIELD_LOADERS: Dict[bool, type] = {}
+
+KeyResolver = Callable[[dict], Optional[Union[str, bytes]]]
+
+
+class EncryptedValue:
+    """
+        A handle to an encrypted configuration value.  The value is decrypted the first time :meth:`decrypt`
+        is called and then memoized.
+    """
+
+    def __init__(self, marker: dict, resolve_key: KeyResolver):
+        """
+            Creates a handle for an encrypted value.
+
+            :param marker: The encrypted field marker, `{"$enc": <token>}`.
+            :param resolve_key: The function that returns the decryption key for the marker.
+        """
+        self._marker = marker
+        self._resolve_key = resolve_key
+        self._lock = threading.Lock()
+        self._decrypted = False
+        self._value = None
+        return
+
+    @property
+    def decrypted(self) -> bool:
+        return self._decrypted
+
+    @property
+    def marker(self) -> dict:
+        return self._marker
+
+    def decrypt(self) -> Any:
+        """
+            Decrypts the value, or returns the memoized value if it has already been decrypted.
+        """
+
+        if not self._decrypted:
+            self._lock.acquire()
+            try:
+                if not self._decrypted:
+                    key = self._resolve_key(self._marker)
+                    if key is None:
+                        errmsg = "A 'key' or 'keyphrase' is required to decrypt an encrypted configuration field."
+                        raise ConfigurationError(errmsg)
+
+                    self._value = decrypt_field_value(key, self._marker)
+                    self._decrypted = True
+            finally:
+                self._lock.release()
+
+        return self._value
+
+    def __repr__(self) -> str:
+        return "EncryptedValue(<encrypted>)"
+
+
+class LazyDecryptingDict(dict):
+    """
+        A dictionary with :class:`EncryptedValue` items that are decrypted when they are read.  Iterating the
+        keys does not decrypt anything, reading items or values decrypts the values that are read.  Copies made
+        with `dict(...)` or `{**...}` get the decrypted values, because overriding `__iter__` keeps Python from
+        copying the raw storage of the dictionary.
+    """
+
+    def __getitem__(self, key):
+        return _resolve_item(dict.__getitem__(self, key))
+
+    def __iter__(self):
+        return dict.__iter__(self)
+
+    def keys(self):
+        return dict.keys(self)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def pop(self, key, *args):
+        return _resolve_item(dict.pop(self, key, *args))
+
+    def copy(self) -> "LazyDecryptingDict":
+        return LazyDecryptingDict(dict.items(self))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, dict) or len(self) != len(other):
+            return False
+        return all(key in other and self[key] == other[key] for key in self)
+
+    def __ne__(self, other) -> bool:
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"LazyDecryptingDict({dict.__repr__(self)})"
+
+    def __reduce__(self):
+        # Copies are made with the values decrypted, the handles are bound to the key of this process
+        return (dict, (self.items(),))
+
+
+class LazyDecryptingList(list):
+    """
+        A list with :class:`EncryptedValue` items that are decrypted when they are read.
+    """
+
+    def __getitem__(self, index):
+        item = list.__getitem__(self, index)
+        if isinstance(index, slice):
+            item = [_resolve_item(v) for v in item]
+        else:
+            item = _resolve_item(item)
+        return item
+
+    def __iter__(self):
+        for item in list.__iter__(self):
+            yield _resolve_item(item)
+        return
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, list) or len(self) != len(other):
+            return False
+        return all(a == b for a, b in zip(self, other))
+
+    def __ne__(self, other) -> bool:
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def copy(self) -> "LazyDecryptingList":
+        return LazyDecryptingList(list.__iter__(self))
+
+    def __repr__(self) -> str:
+        return f"LazyDecryptingList({list.__repr__(self)})"
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+class FrozenLazyDecryptingDict(FrozenDict, LazyDecryptingDict):
+    """
+        A read-only :class:`LazyDecryptingDict`, used when the encrypted fields of a frozen result are wrapped
+        so the result stays read-only.
+    """
+
+    def __repr__(self) -> str:
+        return f"FrozenLazyDecryptingDict({dict.__repr__(self)})"
+
+
+class FrozenLazyDecryptingList(FrozenList, LazyDecryptingList):
+    """
+        A read-only :class:`LazyDecryptingList`, used when the encrypted fields of a frozen result are wrapped
+        so the result stays read-only.
+    """
+
+    def __repr__(self) -> str:
+        return f"FrozenLazyDecryptingList({list.__repr__(self)})"
+
+
+# Freezing a lazily decrypting container keeps its values encrypted until they are read
+LazyDecryptingDict.frozen_type = FrozenLazyDecryptingDict
+LazyDecryptingList.frozen_type = FrozenLazyDecryptingList
+
+
+def is_encrypted_field(value: Any) -> bool:
+    """
+        Checks if a parsed value is an encrypted field marker.
+    """
+    encrypted = isinstance(value, dict) and len(value) > 0 and ENCRYPTED_FIELD_MARKER in value and \
+        set(value.keys()) <= {ENCRYPTED_FIELD_MARKER, "kdf"}
+    return encrypted
+
+
+def encrypt_field_value(key: Union[str, bytes], value: Any) -> dict:
+    """
+        Encrypts a configuration value and returns the encrypted field marker that replaces it.  The value is
+        serialized as JSON before it is encrypted so its type is preserved.
+    """
+
+    from cryptography.fernet import Fernet
+
+    cryptor = Fernet(key)
+
+    plainbytes = json.dumps(value).encode("utf-8")
+    token = cryptor.encrypt(plainbytes).decode("utf-8")
+
+    marker = { ENCRYPTED_FIELD_MARKER: token }
+
+    return marker
+
+
+def decrypt_field_value(key: Union[str, bytes], marker: dict) -> Any:
+    """
+        Decrypts an encrypted field marker and returns the original value.
+    """
+
+    from cryptography.fernet import Fernet
+
+    cryptor = Fernet(key)
+
+    plainbytes = cryptor.decrypt(marker[ENCRYPTED_FIELD_MARKER])
+    value = json.loads(plainbytes)
+
+    return value
+
+
+def encrypt_configuration_fields(key: Union[str, bytes], config_info: Any, field_names: Iterable[str]) -> Any:
+    """
+        Creates a copy of a configuration with the values of the fields with the names provided replaced by
+        encrypted field markers.
+
+        :param key: The key to encrypt the fields with.
+        :param config_info: The configuration to encrypt the fields of.
+        :param field_names: The names of the fields to encrypt wherever they are found in the configuration.
+
+        :returns: The configuration with the encrypted fields.
+    """
+    field_names = set(field_names)
+    encrypted_info = _encrypt_fields(key, config_info, field_names)
+    return encrypted_info
+
+
+def wrap_encrypted_fields(config_info: Any, resolve_key: KeyResolver) -> Any:
+    """
+        Replaces the encrypted field markers in a loaded configuration with :class:`EncryptedValue` handles.
+        Only the containers on the path to an encrypted field are copied, a configuration without any
+        encrypted fields is returned as is.  The copies of frozen containers are frozen as well.
+
+        :param config_info: The loaded configuration.
+        :param resolve_key: The function that returns the decryption key for an encrypted field marker.
+
+        :returns: The configuration with lazily decrypted fields.
+    """
+
+    wrapped = config_info
+
+    if is_encrypted_field(config_info):
+        wrapped = EncryptedValue(config_info, resolve_key)
+    elif isinstance(config_info, dict):
+        items = [(key, wrap_encrypted_fields(value, resolve_key)) for key, value in config_info.items()]
+        if any(wvalue is not value for (_, wvalue), value in zip(items, config_info.values())):
+            if isinstance(config_info, FrozenDict):
+                wrapped = FrozenLazyDecryptingDict(items)
+            else:
+                wrapped = LazyDecryptingDict(items)
+    elif isinstance(config_info, list):
+        values = [wrap_encrypted_fields(value, resolve_key) for value in config_info]
+        if any(wv is not v for wv, v in zip(values, config_info)):
+            if isinstance(config_info, FrozenList):
+                wrapped = FrozenLazyDecryptingList(values)
+            else:
+                wrapped = LazyDecryptingList(values)
+
+    return wrapped
+
+
+def get_encrypted_field_loader(use_libyaml: bool = False) -> type:
+    """
+        Gets the safe YAML loader that loads the `!encrypted` tag as an encrypted field marker, so it is handled
+        the same as the JSON marker.  The constructor is only registered with this private subclass of the
+        safe loader, the loaders of the 'yaml' module are left as they are.
+
+        :param use_libyaml: Indicates the loader should be based on the libyaml 'CSafeLoader'.
+    """
+
+    import yaml
+
+    loader = ENCRYPTED_FIELD_LOADERS.get(use_libyaml)
+    if loader is None:
+        base_loader = yaml.CSafeLoader if use_libyaml else yaml.SafeLoader
+
+        loader = type(f"EncryptedField{base_loader.__name__}", (base_loader,), {})
+        loader.add_constructor(ENCRYPTED_FIELD_TAG, _construct_encrypted_field)
+
+        ENCRYPTED_FIELD_LOADERS[use_libyaml] = loader
+
+    return loader
+
+
+def register_yaml_representers():
+    """
+        Registers the YAML representers for the lazily decrypting containers with the dumpers, the values
+        are decrypted as they are emitted.  This is called when the 'yaml' module is imported.
+    """
+
+    import yaml
+
+    dumpers = [yaml.SafeDumper, yaml.Dumper]
+    if yaml.__with_libyaml__:
+        dumpers.extend([yaml.CSafeDumper, yaml.CDumper])
+
+    for dumper in dumpers:
+        for dict_type in [LazyDecryptingDict, FrozenLazyDecryptingDict]:
+            dumper.add_representer(dict_type, yaml.representer.SafeRepresenter.represent_dict)
+        for list_type in [LazyDecryptingList, FrozenLazyDecryptingList]:
+            dumper.add_representer(list_type, yaml.representer.SafeRepresenter.represent_list)
+
+    return
+
+
+def dump_field_encrypted_yaml(config_info: Any, stream=None, indent: Optional[int] = 4) -> Optional[str]:
+    """
+        Emits a configuration with encrypted field markers as YAML, writing the markers as `!encrypted` tags.
+    """
+
+    import yaml
+
+    class EncryptedFieldDumper(yaml.SafeDumper):
+        pass
+
+    def represent_dict(dumper, data):
+        if is_encrypted_field(data) and len(data) == 1:
+            return dumper.represent_scalar(ENCRYPTED_FIELD_TAG, data[ENCRYPTED_FIELD_MARKER])
+        return dumper.represent_dict(data)
+
+    EncryptedFieldDumper.add_representer(dict, represent_dict)
+
+    content = yaml.dump(config_info, stream, Dumper=EncryptedFieldDumper, indent=indent)
+
+    return content
+
+
+def _construct_encrypted_field(loader, node) -> dict:
+    token = loader.construct_scalar(node)
+    marker = { ENCRYPTED_FIELD_MARKER: token }
+    return marker
+
+
+def _encrypt_fields(key: Union[str, bytes], value: Any, field_names: Set[str]) -> Any:
+
+    if isinstance(value, dict):
+        encrypted = {}
+        for fkey, fvalue in value.items():
+            if fkey in field_names:
+                encrypted[fkey] = encrypt_field_value(key, fvalue)
+            else:
+                encrypted[fkey] = _encrypt_fields(key, fvalue, field_names)
+    elif isinstance(value, (list, tuple)):
+        encrypted = [_encrypt_fields(key, item, field_names) for item in value]
+    else:
+        encrypted = value
+
+    return encrypted
+
+
+def _resolve_item(item: Any) -> Any:
+    if isinstance(item, EncryptedValue):
+        item = item.decrypt()
+    return item
+
+
+call_when_imported("yaml", register_yaml_representers)
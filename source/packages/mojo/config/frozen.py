@@ -0,0 +1,123 @@
+"""
+.. module:: frozen
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains read-only versions of the dict and list containers that are used to
+               hand out shared configuration results without allowing callers to change them.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any
+
+from mojo.config.postimport import call_when_imported
+
+
+def _raise_read_only(self, *args, **kwargs):
+    errmsg = f"The '{type(self).__name__}' object is read-only, make a copy to modify it."
+    raise TypeError(errmsg)
+
+
+class FrozenDict(dict):
+    """
+        A read-only dictionary.  It is a real :class:`dict` so it can be used anywhere a dict is expected,
+        like the layers of a :class:`MergeMap`, but any attempt to modify it raises a :class:`TypeError`.
+        Use :meth:`copy` to get a modifiable shallow copy.
+    """
+
+    __setitem__ = _raise_read_only
+    __delitem__ = _raise_read_only
+    __ior__ = _raise_read_only
+    clear = _raise_read_only
+    pop = _raise_read_only
+    popitem = _raise_read_only
+    setdefault = _raise_read_only
+    update = _raise_read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({dict.__repr__(self)})"
+
+    def copy(self) -> dict:
+        return dict(self)
+
+
+class FrozenList(list):
+    """
+        A read-only list.  Any attempt to modify it raises a :class:`TypeError`.  Use :meth:`copy` to get a
+        modifiable shallow copy.
+    """
+
+    __setitem__ = _raise_read_only
+    __delitem__ = _raise_read_only
+    __iadd__ = _raise_read_only
+    __imul__ = _raise_read_only
+    append = _raise_read_only
+    clear = _raise_read_only
+    extend = _raise_read_only
+    insert = _raise_read_only
+    pop = _raise_read_only
+    remove = _raise_read_only
+    reverse = _raise_read_only
+    sort = _raise_read_only
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+    def __repr__(self) -> str:
+        return f"FrozenList({list.__repr__(self)})"
+
+    def copy(self) -> list:
+        return list(self)
+
+
+def freeze(value: Any) -> Any:
+    """
+        Creates a deep read-only version of a configuration value.  Dictionaries become :class:`FrozenDict`
+        objects and lists and tuples become :class:`FrozenList` objects.  Other values are returned as is.
+
+        The raw items of the containers are copied, a container class can name the read-only class its copies
+        should have with a 'frozen_type' attribute, which is how lazily decrypted values stay encrypted.
+    """
+
+    if isinstance(value, (FrozenDict, FrozenList)):
+        frozen = value
+    elif isinstance(value, dict):
+        frozen_type = getattr(type(value), "frozen_type", FrozenDict)
+        frozen = frozen_type((k, freeze(v)) for k, v in dict.items(value))
+    elif isinstance(value, list):
+        frozen_type = getattr(type(value), "frozen_type", FrozenList)
+        frozen = frozen_type(freeze(v) for v in list.__iter__(value))
+    elif isinstance(value, tuple):
+        frozen = FrozenList(freeze(v) for v in value)
+    else:
+        frozen = value
+
+    return frozen
+
+
+def register_yaml_representers():
+    """
+        Registers the YAML representers for the frozen containers with the dumpers so frozen configurations
+        can be emitted the same as plain ones.  This is called when the 'yaml' module is imported.
+    """
+
+    import yaml
+
+    dumpers = [yaml.SafeDumper, yaml.Dumper]
+    if yaml.__with_libyaml__:
+        dumpers.extend([yaml.CSafeDumper, yaml.CDumper])
+
+    for dumper in dumpers:
+        dumper.add_representer(FrozenDict, yaml.representer.SafeRepresenter.represent_dict)
+        dumper.add_representer(FrozenList, yaml.representer.SafeRepresenter.represent_list)
+
+    return
+
+
+call_when_imported("yaml", register_yaml_representers)
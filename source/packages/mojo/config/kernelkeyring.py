@@ -0,0 +1,124 @@
+"""
+.. module:: kernelkeyring
+    :platform: Linux
+    :synopsis: Module that contains functions for storing derived configuration keys in the Linux kernel
+               keyring using 'libkeyutils', so short lived processes run by the same user don't need to
+               pay the cost of deriving the keys again.  On other platforms, or when 'libkeyutils' is not
+               installed, the functions do nothing.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Optional
+
+import ctypes
+import ctypes.util
+import logging
+import sys
+import threading
+
+logger = logging.getLogger()
+
+KEY_SPEC_USER_KEYRING = -4
+
+KEY_TYPE_USER = b"user"
+
+KEYUTILS_LOCK = threading.Lock()
+KEYUTILS_LIBRARY = None
+KEYUTILS_LOADED = False
+
+
+def get_keyutils() -> Optional[ctypes.CDLL]:
+    """
+        Gets the 'libkeyutils' library or None if it is not available.
+    """
+
+    global KEYUTILS_LIBRARY
+    global KEYUTILS_LOADED
+
+    if not KEYUTILS_LOADED:
+        KEYUTILS_LOCK.acquire()
+        try:
+            if not KEYUTILS_LOADED:
+                KEYUTILS_LOADED = True
+
+                libname = None
+                if sys.platform.startswith("linux"):
+                    libname = ctypes.util.find_library("keyutils")
+
+                if libname is not None:
+                    try:
+                        lib = ctypes.CDLL(libname, use_errno=True)
+
+                        lib.add_key.restype = ctypes.c_int32
+                        lib.add_key.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int32]
+                        lib.request_key.restype = ctypes.c_int32
+                        lib.request_key.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int32]
+                        lib.keyctl_read_alloc.restype = ctypes.c_long
+                        lib.keyctl_read_alloc.argtypes = [ctypes.c_int32, ctypes.POINTER(ctypes.c_void_p)]
+                        lib.keyctl_set_timeout.restype = ctypes.c_long
+                        lib.keyctl_set_timeout.argtypes = [ctypes.c_int32, ctypes.c_uint]
+
+                        KEYUTILS_LIBRARY = lib
+                    except (OSError, AttributeError) as xcpt:
+                        logger.debug(f"Unable to load libkeyutils, {xcpt}")
+        finally:
+            KEYUTILS_LOCK.release()
+
+    return KEYUTILS_LIBRARY
+
+
+def read_keyring_entry(description: str) -> Optional[bytes]:
+    """
+        Reads the payload of a 'user' key from the user keyring.
+
+        :param description: The description of the key.
+
+        :returns: The payload of the key or None if the key was not found.
+    """
+
+    payload = None
+
+    lib = get_keyutils()
+    if lib is not None:
+        serial = lib.request_key(KEY_TYPE_USER, description.encode("utf-8"), None, KEY_SPEC_USER_KEYRING)
+        if serial > 0:
+            buffer = ctypes.c_void_p()
+            length = lib.keyctl_read_alloc(serial, ctypes.byref(buffer))
+            if length >= 0 and buffer.value is not None:
+                try:
+                    payload = ctypes.string_at(buffer.value, length)
+                finally:
+                    ctypes.CDLL(None).free(buffer)
+
+    return payload
+
+
+def write_keyring_entry(description: str, payload: bytes, timeout: Optional[int] = None) -> bool:
+    """
+        Writes a 'user' key to the user keyring.
+
+        :param description: The description of the key.
+        :param payload: The payload to store.
+        :param timeout: An optional number of seconds after which the kernel expires the key.
+
+        :returns: True if the key was stored.
+    """
+
+    stored = False
+
+    lib = get_keyutils()
+    if lib is not None:
+        serial = lib.add_key(KEY_TYPE_USER, description.encode("utf-8"), payload, len(payload), KEY_SPEC_USER_KEYRING)
+        if serial > 0:
+            stored = True
+            if timeout is not None and timeout > 0:
+                lib.keyctl_set_timeout(serial, int(timeout))
+        else:
+            logger.debug(f"Unable to add key to the user keyring, errno={ctypes.get_errno()}")
+
+    return stored
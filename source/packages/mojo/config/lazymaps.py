@@ -0,0 +1,129 @@
+"""
+.. module:: lazymaps
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the :class:`LazyConfigurationMap` proxy that is used in place of a
+               configuration map when the configuration categories are resolved lazily.  The category is
+               resolved the first time the map is accessed.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Callable
+
+import threading
+
+from mojo.collections.mergemap import MergeMap
+
+
+class LazyConfigurationMap:
+    """
+        A proxy for a configuration :class:`MergeMap` that resolves the configuration category the first time
+        the map is accessed.  Resolution happens once, even when the map is first accessed from several threads
+        at the same time.  If resolution fails, the error is raised to the caller that accessed the map and the
+        next access tries again.
+    """
+
+    def __init__(self, target: MergeMap, resolver: Callable[[], None], category: str):
+        """
+            Creates a lazy configuration map.
+
+            :param target: The configuration map that is filled in by the resolver.
+            :param resolver: The function that resolves the configuration category.
+            :param category: The name of the configuration category, used in the representation of the proxy.
+        """
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_resolver", resolver)
+        object.__setattr__(self, "_category", category)
+        object.__setattr__(self, "_lock", threading.RLock())
+        object.__setattr__(self, "_resolving", False)
+        object.__setattr__(self, "_resolved", False)
+        return
+
+    @property
+    def __class__(self):
+        # Let isinstance checks against MergeMap and dict pass for the proxy
+        return type(object.__getattribute__(self, "_target"))
+
+    @property
+    def resolved(self) -> bool:
+        return object.__getattribute__(self, "_resolved")
+
+    @property
+    def target(self) -> MergeMap:
+        """
+            The configuration map behind the proxy, without resolving the category.
+        """
+        return object.__getattribute__(self, "_target")
+
+    def resolve(self) -> MergeMap:
+        """
+            Resolves the configuration category if it has not been resolved yet and returns the map.
+        """
+
+        if not object.__getattribute__(self, "_resolved"):
+            lock = object.__getattribute__(self, "_lock")
+
+            lock.acquire()
+            try:
+                # The resolver fills in the map through the proxy, so the thread that is resolving the
+                # category gets the map as is
+                if not object.__getattribute__(self, "_resolved") and not object.__getattribute__(self, "_resolving"):
+                    object.__setattr__(self, "_resolving", True)
+                    try:
+                        object.__getattribute__(self, "_resolver")()
+                        object.__setattr__(self, "_resolved", True)
+                    finally:
+                        object.__setattr__(self, "_resolving", False)
+            finally:
+                lock.release()
+
+        return object.__getattribute__(self, "_target")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self.resolve(), name, value)
+        return
+
+    def __getitem__(self, key):
+        return self.resolve()[key]
+
+    def __setitem__(self, key, value):
+        self.resolve()[key] = value
+        return
+
+    def __delitem__(self, key):
+        del self.resolve()[key]
+        return
+
+    def __contains__(self, key) -> bool:
+        return key in self.resolve()
+
+    def __iter__(self):
+        return iter(self.resolve())
+
+    def __len__(self) -> int:
+        return len(self.resolve())
+
+    def __bool__(self) -> bool:
+        return bool(self.resolve())
+
+    def __eq__(self, other) -> bool:
+        return self.resolve() == other
+
+    def __ne__(self, other) -> bool:
+        return self.resolve() != other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        if object.__getattribute__(self, "_resolved"):
+            rep = repr(object.__getattribute__(self, "_target"))
+        else:
+            rep = f"<LazyConfigurationMap category={object.__getattribute__(self, '_category')} unresolved>"
+        return rep
@@ -3,12 +3,15 @@ __author__ = "Myron Walker"
 __copyright__ = "Copyright 2020, Myron W Walker"
 __credits__ = []
 
-from typing import List
+from typing import Dict, List, Tuple
 
 import os
+import re
 
 SEPARATOR = ";"
 
+URL_SCHEME_EXP = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+
 mime_source_prefixes = [
     "http://",
     "https://",
@@ -74,3 +77,44 @@ def split_and_normalize_source_list(sources_val: str, sep: str=SEPARATOR) -> Lis
     norm_sources = normalize_source_path_list(search_sources)
 
     return norm_sources
+
+def split_source_uri_options(uri: str) -> Tuple[str, Dict[str, str]]:
+    """
+        Splits the source options off of a source uri.  Source options are specified as a uri fragment
+        of 'name=value' pairs separated by '&', for example 'https://host/configs#read_timeout=5'.  Only
+        uris with a url scheme have options, a directory path is returned as is even if it has a '#', use
+        a 'dir://' uri to give a directory options.
+
+        :param uri: The source uri to split.
+
+        :returns: A tuple with the source uri without the options and a table of the options.
+    """
+
+    options = {}
+
+    source_uri = uri
+
+    if URL_SCHEME_EXP.match(uri.strip()) is not None:
+        source_uri, sep, fragment = uri.partition("#")
+        if sep and len(fragment) > 0:
+            for option in fragment.split("&"):
+                name, _, value = option.partition("=")
+                options[name.strip()] = value.strip()
+
+    return source_uri, options
+
+
+def normalize_source_uri(uri: str) -> str:
+    """
+        Normalizes a source uri so the different spellings of the same source compare equal.  Directory
+        paths are made absolute and trailing separators are removed from the other uris.
+    """
+
+    uri = uri.strip()
+
+    if starts_with_mime_prefix(uri) or "://" in uri:
+        norm_uri = uri.rstrip("/")
+    else:
+        norm_uri = os.path.abspath(os.path.expandvars(os.path.expanduser(uri)))
+
+    return norm_uri
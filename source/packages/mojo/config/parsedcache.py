@@ -0,0 +1,230 @@
+"""
+.. module:: parsedcache
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the persistent cache of parsed configuration files.  Parsed files are
+               stored in a :class:`DiskCache` keyed by the identity of the file, its path, size and
+               modification time, so unchanged files don't need to be parsed again by every process.  The
+               shared cache is only used when the 'MJR_CONFIG_USE_PARSED_CACHE' setting enables it and
+               credential files are never cached.
+
+               Encrypted configuration documents are only ever cached in their encrypted form.  The decrypted
+               content is only cached when the 'MJR_CONFIG_PARSED_CACHE_PLAINTEXT' setting allows it.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Optional, Tuple, Union
+
+import hashlib
+import logging
+import os
+import threading
+
+from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.configurationparsers import load_configuration_content
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+from mojo.config.configurationvariables import MOJO_CONFIG_VARIABLES
+from mojo.config.diskcache import DiskCache
+
+logger = logging.getLogger()
+
+PARSED_CACHE_LOCK = threading.Lock()
+PARSED_CACHE_TABLE = {}
+
+
+def get_parsed_configuration_cache() -> Optional[DiskCache]:
+    """
+        Gets the shared cache of parsed configuration files, or None if the cache has not been enabled with
+        'MJR_CONFIG_USE_PARSED_CACHE', 'MJR_CONFIG_PARSED_CACHE_SIZE' is zero or there is no configuration directory.
+    """
+
+    cache = None
+
+    max_bytes = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_PARSED_CACHE_SIZE
+    if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_PARSED_CACHE and max_bytes > 0 and \
+        MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY is not None:
+        cache_dir = os.path.join(MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY, "cache", "parsed")
+
+        PARSED_CACHE_LOCK.acquire()
+        try:
+            cache = PARSED_CACHE_TABLE.get(cache_dir)
+            if cache is None:
+                cache = DiskCache(cache_dir, max_bytes)
+                PARSED_CACHE_TABLE[cache_dir] = cache
+        finally:
+            PARSED_CACHE_LOCK.release()
+
+    return cache
+
+
+def get_file_identity(filename: str) -> Optional[str]:
+    """
+        Gets the identity of a file from its absolute path, size and modification time.  The identity changes
+        whenever the file is modified or replaced.
+    """
+
+    try:
+        fstat = os.stat(filename)
+        identity = f"{os.path.abspath(filename)}|{fstat.st_size}|{fstat.st_mtime_ns}"
+    except OSError:
+        identity = None
+
+    return identity
+
+
+def is_credential_file(filename: str) -> bool:
+    """
+        Checks if a file is one of the credential files or is named like a credential configuration.  The
+        content of credential files is never cached.
+    """
+
+    credential_names = MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_NAMES or ["credentials"]
+    credential_files = MOJO_CONFIG_VARIABLES.MJR_CONFIG_CREDENTIAL_FILES or []
+
+    leafname, _ = os.path.splitext(os.path.basename(filename))
+    credential = leafname in credential_names
+
+    if not credential:
+        fullpath = os.path.abspath(filename)
+        for cfile in credential_files:
+            if os.path.abspath(cfile) == fullpath:
+                credential = True
+                break
+
+    return credential
+
+
+def is_encrypted_configuration(config_info: Any) -> bool:
+    """
+        Checks if a parsed configuration is an encrypted configuration document.
+    """
+    encrypted = isinstance(config_info, dict) and "encrypted_content" in config_info
+    return encrypted
+
+
+def load_configuration_file(filename: str, config_format: Union[str, ConfigurationFormat], cache: Optional[DiskCache] = None) -> Any:
+    """
+        Loads and parses a configuration file, using the parsed result from the cache if the file has not
+        changed since it was cached.  When 'MJR_CONFIG_PARSED_CACHE_VERIFY_HASH' is set, the content hash of the
+        file must match as well, which still reads the file but skips parsing it.  A cache that cannot be read
+        or written is treated as a cache miss.
+
+        :param filename: The configuration file to load.
+        :param config_format: The format of the configuration file.
+        :param cache: The cache to use, defaults to the shared parsed configuration cache.
+
+        :returns: The parsed configuration document.  Encrypted documents are returned still encrypted.
+    """
+
+    if cache is None:
+        cache = get_parsed_configuration_cache()
+
+    identity = None
+    if cache is not None and not is_credential_file(filename):
+        identity = get_file_identity(filename)
+
+    config_info = None
+    content = None
+    content_hash = None
+
+    if identity is not None:
+        cache_key = f"{identity}|{ConfigurationFormat(config_format).value}"
+
+        cached = None
+        try:
+            cached = cache.get(cache_key)
+        except OSError as oserr:
+            logger.warning(f"Unable to read the parsed configuration cache, parsing file={filename}. {oserr}")
+
+        if cached is not None:
+            cached_hash, cached_info = cached
+
+            if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_PARSED_CACHE_VERIFY_HASH:
+                content, content_hash = _read_content(filename)
+                if cached_hash == content_hash:
+                    config_info = cached_info
+            else:
+                config_info = cached_info
+
+    if config_info is None:
+        if content is None:
+            content, content_hash = _read_content(filename)
+
+        config_info = load_configuration_content(config_format, content)
+
+        if identity is not None:
+            try:
+                cache.put(cache_key, [content_hash, config_info])
+            except (OSError, TypeError) as xcpt:
+                # The cache might be unwritable or the content might have values that JSON can't hold, like dates
+                logger.debug(f"Unable to cache the parsed configuration file={filename}. {xcpt}")
+
+    return config_info
+
+
+def get_cached_decryption(filename: str, key: Union[str, bytes], cache: Optional[DiskCache] = None) -> Optional[Any]:
+    """
+        Gets the cached decrypted content of an encrypted configuration file.  Nothing is returned unless
+        caching of plaintext has been allowed with the 'MJR_CONFIG_PARSED_CACHE_PLAINTEXT' setting.
+    """
+
+    config_info = None
+
+    cache_key, cache = _get_decryption_cache_key(filename, key, cache)
+    if cache_key is not None:
+        try:
+            config_info = cache.get(cache_key)
+        except OSError as oserr:
+            logger.warning(f"Unable to read the decrypted configuration cache for file={filename}. {oserr}")
+
+    return config_info
+
+
+def put_cached_decryption(filename: str, key: Union[str, bytes], config_info: Any, cache: Optional[DiskCache] = None):
+    """
+        Stores the decrypted content of an encrypted configuration file in the cache, but only if caching of
+        plaintext has been allowed with the 'MJR_CONFIG_PARSED_CACHE_PLAINTEXT' setting.
+    """
+
+    cache_key, cache = _get_decryption_cache_key(filename, key, cache)
+    if cache_key is not None:
+        try:
+            cache.put(cache_key, config_info)
+        except (OSError, TypeError) as xcpt:
+            logger.debug(f"Unable to cache the decrypted configuration file={filename}. {xcpt}")
+
+    return
+
+
+def _get_decryption_cache_key(filename: str, key: Union[str, bytes], cache: Optional[DiskCache]) -> Tuple[Optional[str], Optional[DiskCache]]:
+
+    cache_key = None
+
+    if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_PARSED_CACHE_PLAINTEXT and key is not None and not is_credential_file(filename):
+        if cache is None:
+            cache = get_parsed_configuration_cache()
+
+        if cache is not None:
+            identity = get_file_identity(filename)
+            if identity is not None:
+                if isinstance(key, str):
+                    key = key.encode("utf-8")
+                # Only a fingerprint of the key is kept in the cache key
+                key_fingerprint = hashlib.sha256(key).hexdigest()
+                cache_key = f"{identity}|decrypted|{key_fingerprint}"
+
+    return cache_key, cache
+
+
+def _read_content(filename: str) -> Tuple[bytes, str]:
+
+    with open(filename, 'rb') as cf:
+        content = cf.read()
+
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    return content, content_hash
@@ -0,0 +1,114 @@
+"""
+.. module:: postimport
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that runs registration functions when a module is imported.  This lets the configuration
+               types register themselves with an optional library like 'yaml' when they are imported, without
+               importing the library eagerly.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Callable, Dict, List
+
+import sys
+import threading
+
+POST_IMPORT_LOCK = threading.RLock()
+POST_IMPORT_CALLBACKS: Dict[str, List[Callable[[], None]]] = {}
+POST_IMPORT_FINDER = None
+
+
+class PostImportLoader:
+    """
+        Wraps the loader of a module and runs the registered callbacks after the module has been executed.
+    """
+
+    def __init__(self, loader, module_name: str):
+        self._loader = loader
+        self._module_name = module_name
+        return
+
+    def create_module(self, spec):
+        module = None
+        if hasattr(self._loader, "create_module"):
+            module = self._loader.create_module(spec)
+        return module
+
+    def exec_module(self, module):
+        self._loader.exec_module(module)
+        _run_post_import_callbacks(self._module_name)
+        return
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class PostImportFinder:
+    """
+        A meta path finder that finds the modules with registered callbacks using the other finders and wraps
+        their loaders with a :class:`PostImportLoader`.
+    """
+
+    def find_spec(self, fullname, path, target=None):
+
+        if fullname not in POST_IMPORT_CALLBACKS:
+            return None
+
+        spec = None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+
+        if spec is not None and spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = PostImportLoader(spec.loader, fullname)
+
+        return spec
+
+
+def call_when_imported(module_name: str, callback: Callable[[], None]):
+    """
+        Calls the callback now if the module has already been imported, otherwise right after the module
+        is imported.
+
+        :param module_name: The name of the module to wait for.
+        :param callback: The function to call once the module has been imported.
+    """
+    global POST_IMPORT_FINDER
+
+    POST_IMPORT_LOCK.acquire()
+    try:
+        imported = module_name in sys.modules
+        if not imported:
+            POST_IMPORT_CALLBACKS.setdefault(module_name, []).append(callback)
+
+            if POST_IMPORT_FINDER is None:
+                POST_IMPORT_FINDER = PostImportFinder()
+                sys.meta_path.insert(0, POST_IMPORT_FINDER)
+    finally:
+        POST_IMPORT_LOCK.release()
+
+    if imported:
+        callback()
+
+    return
+
+
+def _run_post_import_callbacks(module_name: str):
+
+    POST_IMPORT_LOCK.acquire()
+    try:
+        callbacks = POST_IMPORT_CALLBACKS.pop(module_name, [])
+    finally:
+        POST_IMPORT_LOCK.release()
+
+    for callback in callbacks:
+        callback()
+
+    return
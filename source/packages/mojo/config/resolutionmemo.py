@@ -0,0 +1,103 @@
+"""
+.. module:: resolutionmemo
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the :class:`ResolutionMemo` that is shared by the loaders of a single
+               resolution of the configuration maps, so a configuration that is listed in more than one
+               category is only loaded, decrypted and parsed once.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import threading
+
+from concurrent.futures import Future
+
+
+class ResolutionMemo:
+    """
+        The :class:`ResolutionMemo` memoizes the results of the loads done during a resolution.  Each key is
+        loaded exactly once, callers that ask for a key that is already being loaded on another thread wait
+        for that load and get the same result object.  Errors are memoized as well, so a failed load is
+        reported the same way to every caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Future] = {}
+        return
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def claim(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+            Claims the load of a key.
+
+            :returns: A tuple with the future for the result of the key and a flag that is True when the caller
+                      owns the load and must set the result or the exception of the future.
+        """
+
+        self._lock.acquire()
+        try:
+            future = self._entries.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._entries[key] = future
+        finally:
+            self._lock.release()
+
+        return future, owner
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+            Gets the result for a key, calling 'load' to produce it if no other caller has loaded it yet.
+        """
+
+        future, owner = self.claim(key)
+        if owner:
+            self.complete(future, load)
+
+        result = future.result()
+
+        return result
+
+    async def aget_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+            Asynchronous version of :meth:`get_or_load` where 'load' returns an awaitable.
+        """
+
+        import asyncio
+
+        future, owner = self.claim(key)
+        if owner:
+            try:
+                future.set_result(await load())
+            except BaseException as xcpt:
+                future.set_exception(xcpt)
+                raise
+
+        result = await asyncio.wrap_future(future)
+
+        return result
+
+    def complete(self, future: Future, load: Callable[[], Any]):
+        """
+            Runs the load for a claimed key and stores its result or exception in the future.
+        """
+
+        try:
+            future.set_result(load())
+        except BaseException as xcpt:
+            future.set_exception(xcpt)
+
+        return
@@ -0,0 +1,185 @@
+"""
+.. module:: resultcache
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the process wide in-memory cache of the configurations that have been
+               loaded from the configuration sources.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Dict, Optional, Tuple, Union
+
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+
+from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+from mojo.config.frozen import freeze
+
+
+def estimate_size(value: Any) -> int:
+    """
+        Estimates the memory used by a parsed configuration value.
+    """
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+
+    return size
+
+
+class ConfigurationResultCache:
+    """
+        The :class:`ConfigurationResultCache` is a size bounded LRU cache of the configurations loaded from
+        the configuration sources keyed by source uri and configuration name.  Each entry expires after the
+        time to live of the source it was loaded from.  The cached configurations are frozen so the results
+        that are handed out can be shared without being changed by the callers.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+            Creates a result cache.
+
+            :param max_bytes: The maximum estimated size in bytes of the configurations in the cache, defaults
+                              to the 'MJR_CONFIG_RESULT_CACHE_SIZE' setting when the cache is first used.
+        """
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, int, Optional[ConfigurationFormat], Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        return
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is None:
+            self._max_bytes = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_RESULT_CACHE_SIZE
+        return self._max_bytes
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+            The hit, miss and eviction counters and the current number and size of the entries.
+        """
+        with self._lock:
+            stats = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes
+            }
+        return stats
+
+    def get(self, source_uri: str, config_name: str) -> Union[Tuple[Optional[ConfigurationFormat], Any], Tuple[None, None]]:
+        """
+            Gets the cached result for a configuration name from a source.
+
+            :returns: A tuple with the format and the frozen configuration or (None, None) if the configuration is
+                      not in the cache or the entry has expired.
+        """
+
+        key = (source_uri, config_name)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                expires, size, config_format, config_info = entry
+                if expires <= time.monotonic():
+                    self._remove_entry(key)
+                    entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None, None
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+
+        return config_format, config_info
+
+    def put(self, source_uri: str, config_name: str, config_format: Optional[ConfigurationFormat], config_info: Any,
+            ttl: float) -> Any:
+        """
+            Stores a result in the cache and evicts the least recently used entries if the cache has grown past
+            its size bound.
+
+            :returns: The frozen configuration that was stored, which should be handed out instead of the original.
+        """
+
+        config_info = freeze(config_info)
+
+        size = estimate_size(config_info)
+        if ttl <= 0 or size > self.max_bytes:
+            return config_info
+
+        key = (source_uri, config_name)
+        expires = time.monotonic() + ttl
+
+        with self._lock:
+            if key in self._entries:
+                self._remove_entry(key)
+
+            self._entries[key] = (expires, size, config_format, config_info)
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes and len(self._entries) > 0:
+                oldest_key = next(iter(self._entries))
+                self._remove_entry(oldest_key)
+                self._evictions += 1
+
+        return config_info
+
+    def invalidate(self, config_name: Optional[str] = None, source_uri: Optional[str] = None):
+        """
+            Removes the entries for a configuration name, for a source or for both from the cache.  If neither
+            is provided, all of the entries are removed.
+        """
+
+        with self._lock:
+            for key in list(self._entries.keys()):
+                entry_source, entry_name = key
+                if (config_name is None or entry_name == config_name) and (source_uri is None or entry_source == source_uri):
+                    self._remove_entry(key)
+
+        return
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+        return
+
+    def _remove_entry(self, key: Tuple[str, str]):
+        _, size, _, _ = self._entries.pop(key)
+        self._total_bytes -= size
+        return
+
+
+CONFIGURATION_RESULT_CACHE = ConfigurationResultCache()
+
+
+def invalidate_configuration_results(config_name: Optional[str] = None, source_uri: Optional[str] = None):
+    """
+        Removes cached configuration results from the process wide result cache.  See
+        :meth:`ConfigurationResultCache.invalidate`.
+    """
+    CONFIGURATION_RESULT_CACHE.invalidate(config_name=config_name, source_uri=source_uri)
+    return
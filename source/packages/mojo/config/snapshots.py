@@ -0,0 +1,210 @@
+"""
+.. module:: snapshots
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the immutable, versioned :class:`ConfigurationSnapshot` objects that are
+               published each time the configuration maps change.  A new snapshot is published by swapping a
+               single reference, so readers never see a partially updated configuration and never need a lock.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import threading
+import time
+
+from mojo.collections.mergemap import MergeMap
+
+from mojo.config.frozen import FrozenDict, freeze
+
+
+def _raise_read_only(self, *args, **kwargs):
+    errmsg = f"The '{type(self).__name__}' object is read-only, publish a new snapshot to change it."
+    raise TypeError(errmsg)
+
+
+class CategorySnapshot:
+    """
+        The read-only state of one configuration category in a :class:`ConfigurationSnapshot`.  The snapshot
+        holds deep frozen copies of the layers and tables, the live configuration maps keep the originals, so
+        writes through a live map or into a nested mapping can never change a published snapshot.
+    """
+
+    def __init__(self, layers: Tuple[Mapping, ...] = (), config_table: Optional[Mapping[str, Mapping]] = None,
+                 file_table: Optional[Mapping[str, Mapping]] = None):
+        """
+            Creates a category snapshot.
+
+            :param layers: The layers of the configuration map of the category, highest priority first.
+            :param config_table: The named configurations of the category by uri.
+            :param file_table: The configuration files of the category by path.
+        """
+        # A configuration is both a layer and a table entry, it is only frozen once so they stay the same object
+        frozen_copies = {}
+
+        def freeze_layer(layer: Mapping) -> Mapping:
+            frozen = frozen_copies.get(id(layer))
+            if frozen is None:
+                frozen = freeze(layer)
+                frozen_copies[id(layer)] = frozen
+            return frozen
+
+        config_table = config_table if config_table is not None else {}
+        file_table = file_table if file_table is not None else {}
+
+        object.__setattr__(self, "_layers", tuple(freeze_layer(layer) for layer in layers))
+        object.__setattr__(self, "_config_table", FrozenDict((uri, freeze_layer(info)) for uri, info in config_table.items()))
+        object.__setattr__(self, "_file_table", FrozenDict((path, freeze_layer(info)) for path, info in file_table.items()))
+        object.__setattr__(self, "_map_lock", threading.Lock())
+        object.__setattr__(self, "_map", None)
+        return
+
+    __setattr__ = _raise_read_only
+    __delattr__ = _raise_read_only
+
+    @property
+    def config_table(self) -> Mapping[str, Mapping]:
+        return self._config_table
+
+    @property
+    def file_table(self) -> Mapping[str, Mapping]:
+        return self._file_table
+
+    @property
+    def layers(self) -> Tuple[Mapping, ...]:
+        return self._layers
+
+    @property
+    def map(self) -> MergeMap:
+        """
+            A configuration map over the layers of the category.  The map has a read-only top layer, so any
+            attempt to write to the map raises a :class:`TypeError` instead of changing a shared layer.
+        """
+
+        if self._map is None:
+            self._map_lock.acquire()
+            try:
+                if self._map is None:
+                    object.__setattr__(self, "_map", MergeMap(FrozenDict(), *self._layers))
+            finally:
+                self._map_lock.release()
+
+        return self._map
+
+
+EMPTY_CATEGORY = CategorySnapshot()
+
+
+class ConfigurationSnapshot:
+    """
+        An immutable, versioned snapshot of the configuration categories.  Each time the configuration maps are
+        resolved, or a layer is reloaded, a new snapshot with the next version number is published.  A reader that
+        keeps a reference to a snapshot has pinned that version, it keeps seeing the same configuration no matter
+        how many newer snapshots are published.
+    """
+
+    def __init__(self, version: int = 0, categories: Optional[Dict[str, CategorySnapshot]] = None):
+        """
+            Creates a configuration snapshot.
+
+            :param version: The version of the snapshot.
+            :param categories: The snapshots of the configuration categories by category name.
+        """
+        object.__setattr__(self, "_version", version)
+        object.__setattr__(self, "_categories", FrozenDict(categories if categories is not None else {}))
+        object.__setattr__(self, "_created", time.time())
+        return
+
+    __setattr__ = _raise_read_only
+    __delattr__ = _raise_read_only
+
+    @property
+    def categories(self) -> Mapping[str, CategorySnapshot]:
+        return self._categories
+
+    @property
+    def created(self) -> float:
+        return self._created
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get_category(self, category: str) -> CategorySnapshot:
+        """
+            Gets the snapshot of a configuration category, an empty category snapshot is returned for categories
+            that have not been resolved.
+        """
+        return self._categories.get(category, EMPTY_CATEGORY)
+
+    def get_map(self, category: str) -> MergeMap:
+        """
+            Gets the read-only configuration map of a configuration category.
+        """
+        return self.get_category(category).map
+
+    def lookup(self, category: str, key: Any, default: Any = None) -> Any:
+        """
+            Looks up a top level key in the configuration map of a configuration category.
+        """
+        config_map = self.get_map(category)
+        if key in config_map:
+            return config_map[key]
+        return default
+
+    def with_categories(self, updates: Dict[str, CategorySnapshot]) -> "ConfigurationSnapshot":
+        """
+            Creates the next version of the snapshot with the category snapshots provided replacing the ones in
+            this snapshot.
+        """
+        categories = dict(self._categories)
+        categories.update(updates)
+
+        snapshot = ConfigurationSnapshot(self._version + 1, categories)
+
+        return snapshot
+
+    def __repr__(self) -> str:
+        return f"<ConfigurationSnapshot version={self._version} categories={list(self._categories.keys())}>"
+
+
+SNAPSHOT_PUBLISH_LOCK = threading.RLock()
+CURRENT_SNAPSHOT = ConfigurationSnapshot()
+
+
+def get_configuration_snapshot() -> ConfigurationSnapshot:
+    """
+        Gets the current configuration snapshot.  Reading the snapshot does not take a lock, keep the reference to
+        the snapshot to read a consistent version of the configuration across several lookups.
+    """
+    return CURRENT_SNAPSHOT
+
+
+def publish_configuration_snapshot(update: Callable[[ConfigurationSnapshot], Dict[str, CategorySnapshot]]) -> ConfigurationSnapshot:
+    """
+        Publishes the next configuration snapshot.  Publishers are serialized, the 'update' function is called with
+        the current snapshot while the publish lock is held and returns the category snapshots that changed.  The
+        new snapshot is published with a single reference swap, if nothing changed the current snapshot is kept.
+
+        :param update: A function that takes the current snapshot and returns the updated category snapshots.
+
+        :returns: The snapshot that was published.
+    """
+    global CURRENT_SNAPSHOT
+
+    SNAPSHOT_PUBLISH_LOCK.acquire()
+    try:
+        snapshot = CURRENT_SNAPSHOT
+
+        updates = update(snapshot)
+        if len(updates) > 0:
+            snapshot = snapshot.with_categories(updates)
+            CURRENT_SNAPSHOT = snapshot
+    finally:
+        SNAPSHOT_PUBLISH_LOCK.release()
+
+    return snapshot
@@ -0,0 +1,195 @@
+"""
+.. module:: sourcemanifest
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains functions for generating and reading configuration source manifests.
+               A source manifest is an 'index.json' file in the root of a configuration source that lists
+               the configurations that are available so the loader does not need to probe for them.
+
+               Manifests are opt-in and are only trusted when they carry the manifest schema marker and a
+               supported version.  A manifest is only a hint, names that are not listed in the manifest and
+               files that the manifest lists but which are gone are still probed for.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Dict, List, Optional
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from mojo.config.configurationformat import ConfigurationFormat
+
+MANIFEST_FILENAME = "index.json"
+MANIFEST_SCHEMA = "mojo-config-source-manifest"
+MANIFEST_VERSION = "1.0"
+
+# The order of the extensions is the order of preference when more than one file has the same name
+MANIFEST_EXTENSIONS = [
+    ("yaml", ConfigurationFormat.YAML),
+    ("yml", ConfigurationFormat.YAML),
+    ("json", ConfigurationFormat.JSON)
+]
+
+
+def generate_source_manifest(directory: str) -> dict:
+    """
+        Generates the source manifest for the configuration files in a directory.
+
+        :param directory: The directory to generate the manifest for.
+
+        :returns: The manifest document.
+    """
+
+    candidates = {}
+
+    with os.scandir(directory) as dirents:
+        for dent in dirents:
+            if not dent.is_file() or dent.name == MANIFEST_FILENAME:
+                continue
+
+            config_name, fileext = os.path.splitext(dent.name)
+            fileext = fileext.lstrip(".")
+
+            for ext_pref, (ext, config_format) in enumerate(MANIFEST_EXTENSIONS):
+                if fileext == ext:
+                    if config_name not in candidates or ext_pref < candidates[config_name][0]:
+                        candidates[config_name] = (ext_pref, dent.name, config_format)
+                    break
+
+    configurations = {}
+
+    for config_name in sorted(candidates.keys()):
+        _, filename, config_format = candidates[config_name]
+
+        filepath = os.path.join(directory, filename)
+
+        configurations[config_name] = {
+            "file": filename,
+            "format": config_format.value,
+            "size": os.path.getsize(filepath),
+            "sha256": _hash_file(filepath)
+        }
+
+    manifest = {
+        "schema": MANIFEST_SCHEMA,
+        "version": MANIFEST_VERSION,
+        "configurations": configurations
+    }
+
+    return manifest
+
+
+def write_source_manifests(root_dir: str, recurse: bool = True) -> List[str]:
+    """
+        Generates and writes a source manifest for each directory in the directory tree that contains
+        configuration files.
+
+        :param root_dir: The root directory of the configuration tree.
+        :param recurse: Indicates if manifests should be written for the sub-directories of the root.
+
+        :returns: The list of manifest files that were written.
+    """
+
+    manifest_files = []
+
+    for dirpath, dirnames, _ in os.walk(root_dir):
+        dirnames.sort()
+
+        manifest = generate_source_manifest(dirpath)
+        if len(manifest["configurations"]) > 0:
+            manifest_file = os.path.join(dirpath, MANIFEST_FILENAME)
+            with open(manifest_file, 'w') as mf:
+                json.dump(manifest, mf, indent=4)
+            manifest_files.append(manifest_file)
+
+        if not recurse:
+            break
+
+    return manifest_files
+
+
+def is_source_manifest(manifest: Any) -> bool:
+    """
+        Checks if a document is a source manifest that can be trusted, a document that is not a dictionary,
+        does not carry the manifest schema marker or has an unsupported version is not a source manifest.
+
+        :param manifest: The document read from the manifest file.
+
+        :returns: True if the document is a source manifest.
+    """
+
+    is_manifest = isinstance(manifest, dict) and manifest.get("schema") == MANIFEST_SCHEMA and \
+        manifest.get("version") == MANIFEST_VERSION and isinstance(manifest.get("configurations"), dict)
+
+    return is_manifest
+
+
+def lookup_manifest_entry(manifest: dict, config_name: str) -> Optional[Dict[str, str]]:
+    """
+        Looks up the entry for a configuration in a source manifest.
+
+        :param manifest: The manifest document.
+        :param config_name: The name of the configuration to lookup.
+
+        :returns: The manifest entry for the configuration or None if the manifest does not have a valid entry
+                  for the configuration.
+    """
+
+    entry = manifest.get("configurations", {}).get(config_name)
+
+    if not isinstance(entry, dict) or not _is_plain_filename(entry.get("file")) or \
+        entry.get("format") not in [config_format.value for _, config_format in MANIFEST_EXTENSIONS]:
+        entry = None
+
+    return entry
+
+
+def _is_plain_filename(filename: Any) -> bool:
+    # The manifest can only point at files in the directory of the manifest
+    is_plain = isinstance(filename, str) and filename not in ["", ".", ".."] and \
+        "/" not in filename and os.sep not in filename
+    return is_plain
+
+
+def _hash_file(filepath: str) -> str:
+
+    hasher = hashlib.sha256()
+
+    with open(filepath, 'rb') as hf:
+        for chunk in iter(lambda: hf.read(65536), b""):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+        Command line entry point for generating the source manifests for a configuration directory tree.
+    """
+
+    parser = argparse.ArgumentParser(description="Generates the 'index.json' source manifests for a configuration directory tree.")
+    parser.add_argument("directory", help="The root directory of the configuration tree.")
+    parser.add_argument("--no-recurse", action="store_true", help="Only generate the manifest for the root directory.")
+
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        print(f"The path '{args.directory}' is not a directory.", file=sys.stderr)
+        return 1
+
+    manifest_files = write_source_manifests(args.directory, recurse=not args.no_recurse)
+    for manifest_file in manifest_files:
+        print(manifest_file)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Callable, List, Optional
+
+import logging
+import threading
+
+from abc import abstractmethod, ABC
+
+from mojo.config.configurationformat import ConfigurationFormat
+
+logger = logging.getLogger()
+
+ChangeCallback = Callable[[str, Optional[ConfigurationFormat], dict], None]
+
+
+class ConfigurationChangeWatcher(ABC):
+    """
+        The :class:`ConfigurationChangeWatcher` is the base for the watchers that subscribe to the change
+        notifications of a configuration source.  A watcher runs a daemon thread that waits on the change
+        feed of the source and calls the change callback with the name, format and content of each
+        configuration document that changed.  If the feed fails the watcher waits and then re-subscribes
+        from the last checkpoint it saw.
+    """
+
+    def __init__(self, source_uri: str, config_names: List[str], on_change: ChangeCallback, retry_interval: float = 5.0):
+        self._source_uri = source_uri
+        self._config_names = list(config_names)
+        self._on_change = on_change
+        self._retry_interval = retry_interval
+        self._stop_event = threading.Event()
+        self._thread = None
+        return
+
+    @property
+    def config_names(self) -> List[str]:
+        return self._config_names
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def source_uri(self) -> str:
+        return self._source_uri
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def start(self):
+        """
+            Starts the thread that watches the change feed.
+        """
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch_worker, name="mojo-config-watcher", daemon=True)
+        self._thread.start()
+        return
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+            Stops watching the change feed and waits for the watcher thread to exit.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        return
+
+    def notify_change(self, config_name: str, config_format: Optional[ConfigurationFormat], config_info: dict):
+        """
+            Forwards a changed configuration to the change callback.  Errors raised by the callback are
+            logged so a bad document does not stop the watcher.
+        """
+        try:
+            self._on_change(config_name, config_format, config_info)
+        except Exception as xcpt:
+            logger.error(f"Error applying the change to configuration name='{config_name}' from source uri={self._source_uri}, {xcpt}")
+        return
+
+    @abstractmethod
+    def watch_changes(self):
+        """
+            Waits on the change feed of the source until the watcher is stopped.  Implementations should
+            return periodically so the stop request can be honored, and should keep a checkpoint so the
+            feed can be resumed after an error.
+        """
+
+    def _watch_worker(self):
+
+        while not self._stop_event.is_set():
+            try:
+                self.watch_changes()
+            except Exception as xcpt:
+                logger.warning(f"Configuration change feed for source uri={self._source_uri} failed, retrying. {xcpt}")
+                self._stop_event.wait(self._retry_interval)
+
+        return
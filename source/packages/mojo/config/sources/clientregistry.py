@@ -0,0 +1,108 @@
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import atexit
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger()
+
+
+def credential_fingerprint(username: Optional[str], password: Optional[str]) -> Optional[str]:
+    """
+        Creates a fingerprint of a set of credentials that can be used as part of a registry key
+        without keeping the password in the key.
+    """
+    fingerprint = None
+
+    if username is not None or password is not None:
+        fingerprint = hashlib.sha256(f"{username}:{password}".encode("utf-8")).hexdigest()
+
+    return fingerprint
+
+
+class ClientRegistry:
+    """
+        The :class:`ClientRegistry` keeps the database clients used by the configuration sources for the
+        lifetime of the process so their connection pools are re-used across configuration loads.  The
+        clients are keyed by host and credentials.  After a fork the child process drops the clients it
+        inherited and creates new ones, and the clients are closed when the process exits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Hashable, Tuple[Any, Optional[Callable[[Any], None]]]] = {}
+        self._pid = os.getpid()
+        return
+
+    def get_client(self, key: Hashable, factory: Callable[[], Any], closer: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+            Gets the client registered for a key or creates and registers a new client.
+
+            :param key: The key that identifies the client, typically the host and a credential fingerprint.
+            :param factory: A callable that creates a new client.
+            :param closer: An optional callable that closes a client when the registry is closed.
+
+            :returns: The client for the key.
+        """
+
+        self._check_for_fork()
+
+        entry = self._clients.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._clients.get(key)
+                if entry is None:
+                    entry = (factory(), closer)
+                    self._clients[key] = entry
+
+        client, _ = entry
+
+        return client
+
+    def close_all(self):
+        """
+            Closes all of the clients in the registry.
+        """
+
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+
+        for client, closer in entries:
+            if closer is not None:
+                try:
+                    closer(client)
+                except Exception as xcpt:
+                    logger.warning(f"Error closing configuration source client, {xcpt}")
+
+        return
+
+    def reset_after_fork(self):
+        """
+            Drops the clients that were inherited from the parent process without closing them, the
+            connections they hold belong to the parent.
+        """
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._pid = os.getpid()
+        return
+
+    def _check_for_fork(self):
+        if self._pid != os.getpid():
+            self.reset_after_fork()
+        return
+
+
+CLIENT_REGISTRY = ClientRegistry()
+
+atexit.register(CLIENT_REGISTRY.close_all)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=CLIENT_REGISTRY.reset_after_fork)
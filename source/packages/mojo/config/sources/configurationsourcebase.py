@@ -4,20 +4,39 @@ __author__ = "Myron Walker"
 __copyright__ = "Copyright 2020, Myron W Walker"
 __credits__ = []
 
-from typing import Tuple, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+import itertools
 
 from abc import abstractmethod, ABC
 
 from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.deadline import Deadline
+from mojo.config.sources.changewatcher import ChangeCallback, ConfigurationChangeWatcher
 
 class ConfigurationSourceBase(ABC):
 
     scheme: str = "not-set"
+    supports_batch_load: bool = False
+    supports_change_feed: bool = False
 
-    def __init__(self, uri: str):
+    def __init__(self, uri: str, connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None):
         self._uri = uri
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._timed_out_names: Set[str] = set()
+        self._change_positions: Dict[str, Tuple[int, Any]] = {}
+        self._change_position_order = itertools.count()
         return
 
+    @property
+    def connect_timeout(self) -> Optional[float]:
+        return self._connect_timeout
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self._read_timeout
+
     @property
     def uri(self):
         return self._uri
@@ -29,3 +48,118 @@ class ConfigurationSourceBase(ABC):
     @abstractmethod
     def try_load_configuration(self, config_name: str) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
         return
+
+    async def atry_load_configuration(self, config_name: str, credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+                                      deadline: Optional[Deadline] = None) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
+        """
+            Asynchronous version of :meth:`try_load_configuration`.  Sources that have a native asynchronous
+            client can override this method, the default implementation runs the blocking load in the
+            default thread pool executor of the event loop.
+        """
+        import asyncio
+
+        config_format, config_info = await asyncio.to_thread(self.try_load_configuration, config_name, credentials, deadline=deadline)
+        return config_format, config_info
+
+    def try_load_configurations(self, config_names: List[str], credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+                                deadline: Optional[Deadline] = None) -> Dict[str, Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]]:
+        """
+            Attempts to load a set of configurations from the source.  Sources that can retrieve several
+            documents in a single round trip set `supports_batch_load` and override this method, the
+            default implementation loads the configurations one at a time.
+
+            :param config_names: The names of the configurations to load.
+            :param credentials: An optional table of credentials by host.
+            :param deadline: The optional deadline for the resolution of the configurations.
+
+            :returns: A table of the `(format, config)` results by configuration name.
+        """
+
+        results = {}
+
+        for cname in config_names:
+            results[cname] = self.try_load_configuration(cname, credentials, deadline=deadline)
+
+        return results
+
+    def create_change_watcher(self, config_names: List[str], on_change: ChangeCallback,
+                              credentials: Optional[Dict[str, Tuple[str, str]]] = None) -> Optional[ConfigurationChangeWatcher]:
+        """
+            Creates a watcher that subscribes to the change notifications of the source for the configuration
+            names provided.  Sources that have a change feed set `supports_change_feed` and override this method.
+
+            :param config_names: The names of the configurations to watch.
+            :param on_change: The callback that is called with the name, format and content of a changed configuration.
+            :param credentials: An optional table of credentials by host.
+
+            :returns: The watcher for the source, which has not been started, or None if the source has no change feed.
+        """
+        return None
+
+    def get_change_position(self, config_names: List[str]) -> Optional[Any]:
+        """
+            Gets the position in the change feed of the source to start watching a set of configurations
+            from.  The earliest position recorded when the configurations were loaded is returned, so no
+            change made after any of the configurations was loaded is missed.
+
+            :param config_names: The names of the configurations that will be watched.
+
+            :returns: The position recorded for the configurations, or None if no position was recorded.
+        """
+
+        recorded = [self._change_positions[cname] for cname in config_names if cname in self._change_positions]
+
+        position = None
+        if len(recorded) > 0:
+            _, position = min(recorded, key=lambda entry: entry[0])
+
+        return position
+
+    def record_change_position(self, config_names: List[str], position: Any):
+        """
+            Records the position in the change feed of the source at the time a set of configurations was
+            loaded.  Sources that have a change feed call this on each load, the positions are only ordered
+            by when they were recorded, so they can be opaque values.
+        """
+        if position is not None:
+            order = next(self._change_position_order)
+            for cname in config_names:
+                self._change_positions[cname] = (order, position)
+        return
+
+    def has_timed_out(self, config_name: str) -> bool:
+        """
+            Checks if the last attempt to load a configuration from the source timed out, so a configuration
+            that could not be located can be reported as timed out instead of missing.
+        """
+        timed_out = config_name in self._timed_out_names
+        return timed_out
+
+    def record_timeout(self, config_name: str, timed_out: bool):
+        """
+            Records if the last attempt to load a configuration from the source timed out.
+        """
+        if timed_out:
+            self._timed_out_names.add(config_name)
+        else:
+            self._timed_out_names.discard(config_name)
+        return
+
+    def get_timeouts(self, deadline: Optional[Deadline] = None) -> Tuple[Optional[float], Optional[float]]:
+        """
+            Gets the connect and read timeouts to use for a request to the source, limited to the time
+            remaining before the deadline if a deadline was provided.
+
+            :param deadline: The optional deadline for the resolution of the configuration.
+
+            :returns: A tuple with the connect timeout and the read timeout.
+        """
+
+        connect_timeout = self._connect_timeout
+        read_timeout = self._read_timeout
+
+        if deadline is not None:
+            connect_timeout = deadline.clamp_timeout(connect_timeout)
+            read_timeout = deadline.clamp_timeout(read_timeout)
+
+        return connect_timeout, read_timeout
@@ -3,24 +3,91 @@ __author__ = "Myron Walker"
 __copyright__ = "Copyright 2020, Myron W Walker"
 __credits__ = []
 
-from typing import Dict, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
+import json
 import re
+import threading
 import traceback
 
+from contextlib import contextmanager
+
 from mojo.errors.exceptions import ConfigurationError
 from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+from mojo.config.deadline import Deadline
 from mojo.config.sources.configurationsourcebase import (
     ConfigurationSourceBase
 )
+from mojo.config.sources.changewatcher import ChangeCallback, ConfigurationChangeWatcher
+from mojo.config.sources.clientregistry import CLIENT_REGISTRY, credential_fingerprint
+
+CALL_TIMEOUT = threading.local()
+
+
+def get_call_timeout() -> Optional[float]:
+    """
+        Gets the socket timeout for the CouchDB request being made on the current thread.
+    """
+    timeout = getattr(CALL_TIMEOUT, "value", None)
+    return timeout
+
+
+@contextmanager
+def call_timeout(timeout: Optional[float]):
+    """
+        Sets the socket timeout for the CouchDB requests made on the current thread inside the context.
+    """
+    previous = get_call_timeout()
+    CALL_TIMEOUT.value = timeout
+    try:
+        yield
+    finally:
+        CALL_TIMEOUT.value = previous
+    return
+
+
+def create_call_timeout_session():
+    """
+        Creates a couchdb session with a connection pool that applies the timeout of the current call to each
+        connection it hands out.  The pooled clients are shared by sources with different timeouts and the
+        couchdb session only has a single timeout, so the timeout is applied per call instead.
+    """
+    import couchdb
+
+    from couchdb.http import ConnectionPool
+
+    class CallTimeoutConnectionPool(ConnectionPool):
+
+        # New connections are created with the timeout of the current call
+        timeout = property(lambda self: get_call_timeout(), lambda self, value: None)
+
+        def get(self, url):
+            conn = super().get(url)
+
+            # Connections re-used from the pool still have the timeout of the call that created them
+            conn.timeout = get_call_timeout()
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+
+            return conn
+
+    session = couchdb.Session()
+    session.connection_pool = CallTimeoutConnectionPool(None)
+
+    return session
+
 
 class CouchDBSource(ConfigurationSourceBase):
 
     scheme = "couchdb"
+    supports_batch_load = True
+    supports_change_feed = True
     parse_exp = re.compile(r"couchdb://(?P<scheme>[htps]+)\+(?P<host>[a-zA-Z\.0-9\-]+)(?P<port>[:0-9]+)*/(?P<database>[a-zA-Z\.0-9\-]+)")
 
-    def __init__(self, uri: str, cscheme: str, host: str, database: str, port: Optional[int]):
-        super().__init__(uri)
+    def __init__(self, uri: str, cscheme: str, host: str, database: str, port: Optional[int],
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None):
+        super().__init__(uri, connect_timeout=connect_timeout, read_timeout=read_timeout)
         self._cscheme = cscheme
         self._host = host
         self._database = database
@@ -40,7 +107,7 @@ class CouchDBSource(ConfigurationSourceBase):
         return self._port
 
     @classmethod
-    def parse(cls, uri: str) -> Union[None, "CouchDBSource"]:
+    def parse(cls, uri: str, connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None) -> Union[None, "CouchDBSource"]:
 
         rtnobj = None
 
@@ -63,37 +130,183 @@ class CouchDBSource(ConfigurationSourceBase):
             
             database = matchinfo["database"]
 
-            rtnobj = CouchDBSource(uri, cscheme, host, database, port)
+            rtnobj = CouchDBSource(uri, cscheme, host, database, port, connect_timeout=connect_timeout, read_timeout=read_timeout)
 
         return rtnobj
     
-    def try_load_configuration(self, config_name: str, credentials: Dict[str, Tuple[str, str]]) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
+    def create_change_watcher(self, config_names: List[str], on_change: ChangeCallback,
+                              credentials: Optional[Dict[str, Tuple[str, str]]] = None) -> "CouchDBChangeWatcher":
+        watcher = CouchDBChangeWatcher(self, config_names, on_change, credentials)
+        return watcher
+
+    def get_database(self, credentials: Optional[Dict[str, Tuple[str, str]]]):
+        """
+            Gets the pooled database client for the host and credentials.
+        """
+        db = self._get_database(credentials)
+        return db
+
+    def try_load_configuration(self, config_name: str, credentials: Dict[str, Tuple[str, str]],
+                               deadline: Optional[Deadline] = None) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
         
         config_info = None
         config_format = None
 
+        if deadline is not None and deadline.expired:
+            return config_format, config_info
+
         try:
-            dburi = None
-            
+            db = self._get_database(credentials)
+
+            with call_timeout(self.get_call_timeout(deadline)):
+                self._record_update_seq(db, [config_name])
+                config_info = db.get(config_name)
+            config_format = ConfigurationFormat.JSON
+
+        except:
+            errmsg = traceback.format_exc()
+            print(errmsg)
+            config_info = None
+
+        return config_format, config_info
+
+    def try_load_configurations(self, config_names: List[str], credentials: Dict[str, Tuple[str, str]],
+                                deadline: Optional[Deadline] = None) -> Dict[str, Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]]:
+        """
+            Loads a set of configurations from the database with a single '_all_docs' request.
+        """
+
+        results = { cname: (None, None) for cname in config_names }
+
+        if deadline is not None and deadline.expired:
+            return results
+
+        try:
+            db = self._get_database(credentials)
+
+            # The view results are requested when they are first iterated
+            with call_timeout(self.get_call_timeout(deadline)):
+                self._record_update_seq(db, config_names)
+                rows = list(db.view("_all_docs", keys=list(config_names), include_docs=True))
+
+            for row in rows:
+                # Rows for missing or deleted documents come back without a document
+                config_info = row.get("doc")
+                if config_info is not None and row.key in results:
+                    results[row.key] = (ConfigurationFormat.JSON, config_info)
+
+        except:
+            errmsg = traceback.format_exc()
+            print(errmsg)
+
+        return results
+
+    def get_call_timeout(self, deadline: Optional[Deadline] = None) -> Optional[float]:
+        """
+            Gets the socket timeout for a request to the database, limited to the time remaining before the
+            deadline if a deadline was provided.  The couchdb session only supports a single socket timeout,
+            so the larger of the connect and read timeouts is used.
+        """
+
+        timeouts = [tval for tval in self.get_timeouts(deadline) if tval is not None]
+        timeout = max(timeouts) if len(timeouts) > 0 else None
+
+        return timeout
+
+    def _get_database(self, credentials: Optional[Dict[str, Tuple[str, str]]]):
+        """
+            Gets the pooled database client for the host and credentials from the client registry.  The
+            timeouts are not part of the client key, they are applied to each call made with the client.
+        """
+
+        username = None
+        password = None
+        if credentials is not None and self._host in credentials:
+            username, password = credentials[self._host]
+
+        registry_key = (self.scheme, self._cscheme, self._host, self._port, self._database,
+                        credential_fingerprint(username, password))
+
+        def create_database():
+            import couchdb
+
             if self._port is not None:
                 dburi = f"{self._cscheme}://{self._host}:{self._port}/{self._database}"
             else:
                 dburi = f"{self._cscheme}://{self._host}/{self._database}"
 
-            import couchdb
-
-            db = couchdb.Database(dburi)
+            db = couchdb.Database(dburi, session=create_call_timeout_session())
 
-            if credentials is not None and self._host in credentials:
-                username, password = credentials[self._host]
+            if username is not None:
                 db.resource.credentials = (username, password)
 
-            config_info = db.get(config_name)
-            config_format = ConfigurationFormat.JSON
+            return db
 
-        except:
-            errmsg = traceback.format_exc()
-            print(errmsg)
-            config_info = None
+        db = CLIENT_REGISTRY.get_client(registry_key, create_database)
 
-        return config_format, config_info
+        return db
+
+    def _record_update_seq(self, db, config_names: List[str]):
+        """
+            Records the update sequence of the database before the configurations are read, so a change feed
+            started later for the configurations does not miss the changes made after they were read.  The
+            extra request is only made when live reload is enabled.
+        """
+
+        if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LIVE_RELOAD:
+            self.record_change_position(config_names, db.info().get("update_seq"))
+
+        return
+
+
+class CouchDBChangeWatcher(ConfigurationChangeWatcher):
+    """
+        Watches a CouchDB database for changes to a set of configuration documents using long polls of
+        the '_changes' feed filtered to the watched document ids.  The feed starts from the update sequence
+        recorded when the documents were loaded and the 'since' sequence of the last poll is kept as a
+        checkpoint so the feed can be resumed without missing changes.
+    """
+
+    def __init__(self, source: CouchDBSource, config_names: List[str], on_change: ChangeCallback,
+                 credentials: Optional[Dict[str, Tuple[str, str]]], poll_timeout: float = 10.0):
+        super().__init__(source.uri, config_names, on_change)
+        self._source = source
+        self._credentials = credentials
+        self._poll_timeout = poll_timeout
+
+        self._since = source.get_change_position(config_names)
+        if self._since is None:
+            # Nothing was recorded when the documents were loaded, changes made since then can't be replayed
+            self._since = "now"
+        return
+
+    @property
+    def since(self):
+        return self._since
+
+    def watch_changes(self):
+
+        db = self._source.get_database(self._credentials)
+
+        # The long poll is held open by the server for the poll timeout before the read timeout applies
+        request_timeout = self._source.get_call_timeout()
+        poll_request_timeout = request_timeout + self._poll_timeout if request_timeout is not None else None
+
+        while not self.stopped:
+            with call_timeout(poll_request_timeout):
+                feed = db.changes(feed="longpoll", since=self._since, timeout=int(self._poll_timeout * 1000),
+                                  filter="_doc_ids", doc_ids=json.dumps(self._config_names))
+
+            for change in feed["results"]:
+                if change.get("deleted", False):
+                    continue
+
+                # Only the documents that changed are fetched
+                with call_timeout(request_timeout):
+                    config_info = db.get(change["id"])
+                if config_info is not None:
+                    self.notify_change(change["id"], ConfigurationFormat.JSON, config_info)
+
+            self._since = feed["last_seq"]
+
+        return
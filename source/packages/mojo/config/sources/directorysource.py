@@ -3,15 +3,19 @@ __author__ = "Myron Walker"
 __copyright__ = "Copyright 2020, Myron W Walker"
 __credits__ = []
 
-from typing import Dict, Optional, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import json
 import os
 import re
-import yaml
+import threading
 
 from mojo.errors.exceptions import ConfigurationError
 from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.parsedcache import load_configuration_file
+from mojo.config.deadline import Deadline
+from mojo.config.sourcemanifest import MANIFEST_FILENAME, is_source_manifest, lookup_manifest_entry
+from mojo.config.sources.changewatcher import ChangeCallback
 from mojo.config.sources.configurationsourcebase import (
     ConfigurationSourceBase
 )
@@ -23,18 +27,92 @@ EXTENSION_TO_CONFIG_FORMAT = {
     "json": ConfigurationFormat.JSON
 }
 
+MANIFEST_LOCK = threading.Lock()
+MANIFEST_TABLE: Dict[str, Tuple[int, Optional[dict]]] = {}
+
+DIRECTORY_INDEX_LOCK = threading.Lock()
+DIRECTORY_INDEX_TABLE: Dict[str, Tuple[int, Dict[str, List[Tuple[str, ConfigurationFormat]]]]] = {}
+
+
+def get_directory_index(directory: str) -> Dict[str, List[Tuple[str, ConfigurationFormat]]]:
+    """
+        Gets the index of the configuration files in a directory.  The index maps each configuration name
+        to its candidate files in the order the extensions are searched.  The index is built with a single
+        pass over the directory, cached for the process and re-built when the modification time of the
+        directory changes, so lookups of names that are not in the directory don't cost a stat call per
+        extension.
+
+        :param directory: The directory to get the index for.
+
+        :returns: The table of candidate files by configuration name.
+    """
+
+    try:
+        mtime_ns = os.stat(directory).st_mtime_ns
+    except OSError:
+        return {}
+
+    cached = DIRECTORY_INDEX_TABLE.get(directory)
+    if cached is not None and cached[0] == mtime_ns:
+        index = cached[1]
+    else:
+        index = {}
+
+        ext_order = ["yaml", "yml", "json"]
+
+        with os.scandir(directory) as dir_entries:
+            for dentry in dir_entries:
+                name, _, ext = dentry.name.rpartition(".")
+                if ext not in EXTENSION_TO_CONFIG_FORMAT or name == "":
+                    continue
+
+                try:
+                    if not dentry.is_file():
+                        continue
+                except OSError:
+                    continue
+
+                if name not in index:
+                    index[name] = []
+                index[name].append((dentry.name, EXTENSION_TO_CONFIG_FORMAT[ext]))
+
+        for candidates in index.values():
+            candidates.sort(key=lambda cand: ext_order.index(cand[0].rpartition(".")[2]))
+
+        DIRECTORY_INDEX_LOCK.acquire()
+        try:
+            DIRECTORY_INDEX_TABLE[directory] = (mtime_ns, index)
+        finally:
+            DIRECTORY_INDEX_LOCK.release()
+
+    return index
+
+
 class DirectorySource(ConfigurationSourceBase):
 
     scheme = "dir"
-    parse_exp = re.compile(r"dir://(?P<directory>[/s/S]+)")
+    parse_exp = re.compile(r"dir://(?P<directory>[\s\S]+)")
 
-    def __init__(self, uri: str, directory: str):
+    def __init__(self, uri: str, directory: str, use_manifest: bool = False, use_index: bool = True, live_reload: bool = False):
         super().__init__(uri)
         self._directory = os.path.expandvars(os.path.expanduser(directory))
+        self._use_manifest = use_manifest
+        self._use_index = use_index
+        self._live_reload = live_reload
         return
 
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @property
+    def supports_change_feed(self) -> bool:
+        # Watching the files costs a thread and an inotify instance, so the files are only watched when
+        # live reload is enabled
+        return self._live_reload
+
     @classmethod
-    def parse(cls, uri: str) -> Union[None, "DirectorySource"]:
+    def parse(cls, uri: str, use_manifest: bool = False, use_index: bool = True, live_reload: bool = False) -> Union[None, "DirectorySource"]:
 
         rtnobj = None
 
@@ -42,29 +120,136 @@ class DirectorySource(ConfigurationSourceBase):
         if mobj is not None:
             matchinfo = mobj.groupdict()
             directory = matchinfo["directory"]
-            rtnobj = DirectorySource(uri, directory)
+            rtnobj = DirectorySource(uri, directory, use_manifest=use_manifest, use_index=use_index, live_reload=live_reload)
         else:
-            rtnobj = DirectorySource(uri, uri)
+            rtnobj = DirectorySource(uri, uri, use_manifest=use_manifest, use_index=use_index, live_reload=live_reload)
 
         return rtnobj
 
-    def try_load_configuration(self, config_name: str, credentials: Optional[Dict[str, Tuple[str, str]]]) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
+    def get_manifest(self) -> Optional[dict]:
+        """
+            Gets the source manifest for the directory if the directory has one.  The manifest is cached
+            for the process and only re-read when the manifest file is modified.  A manifest file that
+            cannot be read or is not a source manifest is ignored.
+        """
+
+        manifest = None
+
+        manifest_file = os.path.join(self._directory, MANIFEST_FILENAME)
+
+        try:
+            mtime_ns = os.stat(manifest_file).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+
+        if mtime_ns is not None:
+            cached = MANIFEST_TABLE.get(manifest_file)
+            if cached is not None and cached[0] == mtime_ns:
+                manifest = cached[1]
+            else:
+                try:
+                    with open(manifest_file, 'r') as mf:
+                        manifest = json.load(mf)
+                except (OSError, ValueError):
+                    manifest = None
+
+                if not is_source_manifest(manifest):
+                    manifest = None
+
+                MANIFEST_LOCK.acquire()
+                try:
+                    MANIFEST_TABLE[manifest_file] = (mtime_ns, manifest)
+                finally:
+                    MANIFEST_LOCK.release()
+
+        return manifest
+
+    def create_change_watcher(self, config_names: List[str], on_change: ChangeCallback,
+                              credentials: Optional[Dict[str, Tuple[str, str]]] = None) -> Optional["FileChangeWatcher"]:
+
+        from mojo.config.sources.filewatcher import FileChangeWatcher
+
+        watched_files = {}
+        file_formats = {}
+
+        for cname in config_names:
+            checkfile, config_format = self.locate_configuration(cname)
+            if checkfile is not None:
+                watched_files[cname] = checkfile
+                file_formats[checkfile] = config_format
+
+        watcher = None
+        if len(watched_files) > 0:
+            def load_file(checkfile):
+                return self._read_configuration_file(checkfile, file_formats[checkfile])
+
+            watcher = FileChangeWatcher(self._uri, watched_files, load_file, on_change)
+
+        return watcher
+
+    def locate_configuration(self, config_name: str) -> Union[Tuple[str, ConfigurationFormat], Tuple[None, None]]:
+        """
+            Locates the file for a configuration in the directory.
+
+            :returns: A tuple with the path of the file and the format of the file, or (None, None) if the
+                      directory does not have the configuration.
+        """
+
+        if self._use_manifest:
+            manifest = self.get_manifest()
+            if manifest is not None:
+                # The manifest tells us which file to load, but the manifest can be stale, so if the name
+                # is not listed or the file is gone we fall back to looking for the file
+                entry = lookup_manifest_entry(manifest, config_name)
+                if entry is not None:
+                    checkfile = os.path.join(self._directory, entry["file"])
+                    if os.path.exists(checkfile):
+                        return checkfile, ConfigurationFormat(entry["format"])
+
+        if self._use_index and os.sep not in config_name and "/" not in config_name:
+            # The directory index already tells us which of the candidate files exist
+            candidates = get_directory_index(self._directory).get(config_name, [])
+            for filename, cand_format in candidates:
+                checkfile = os.path.join(self._directory, filename)
+                if os.path.exists(checkfile):
+                    return checkfile, cand_format
+
+        # The index matches names exactly and is only re-built when the modification time of the directory
+        # changes, so it can miss a file on a case-insensitive file system or a file created right after the
+        # index was built.  Probe for the candidate files before giving up.
+        candidates = [
+            (f"{config_name}.{ext}", EXTENSION_TO_CONFIG_FORMAT[ext]) for ext in ["yaml", "yml", "json"]
+        ]
+
+        for filename, cand_format in candidates:
+            checkfile = os.path.join(self._directory, filename)
+            if os.path.exists(checkfile):
+                return checkfile, cand_format
+
+        return None, None
+
+    def try_load_configuration(self, config_name: str, credentials: Optional[Dict[str, Tuple[str, str]]],
+                               deadline: Optional[Deadline] = None) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
         
         config_format = None
         config_info = None
 
-        for ext in ["yaml", "yml", "json"]:
-            checkfile = os.path.join(self._directory, f"{config_name}.{ext}")
-            if os.path.exists(checkfile):
-                config_format = EXTENSION_TO_CONFIG_FORMAT[ext]
-                with open(checkfile, 'r') as cf:
-                    if config_format == ConfigurationFormat.YAML:
-                        config_info = yaml.safe_load(cf)
-                        if config_info == None: # We likely encountered an empty config file
-                            config_info = {}
-                    elif config_format == ConfigurationFormat.JSON:
-                        config_info = json.load(cf)
-                break
+        checkfile, file_format = self.locate_configuration(config_name)
+        if checkfile is not None:
+            config_format, config_info = self._read_configuration_file(checkfile, file_format)
+
+        return config_format, config_info
+
+    def _read_configuration_file(self, checkfile: str, config_format: ConfigurationFormat) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
+
+        config_info = None
+
+        if config_format == ConfigurationFormat.YAML:
+            config_info = load_configuration_file(checkfile, config_format)
+            if config_info == None: # We likely encountered an empty config file
+                config_info = {}
+        elif config_format == ConfigurationFormat.JSON:
+            config_info = load_configuration_file(checkfile, config_format)
 
         if config_info is not None:
             config_format = None
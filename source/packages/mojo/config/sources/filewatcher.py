@@ -0,0 +1,234 @@
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.sources.changewatcher import ChangeCallback, ConfigurationChangeWatcher
+
+logger = logging.getLogger()
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# We watch the directories that contain the files instead of the files themselves, that way atomic
+# rename deployments and symlink swaps, like the '..data' swap of a Kubernetes ConfigMap, are seen
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+FileLoader = Callable[[str], Tuple[Optional[ConfigurationFormat], Optional[dict]]]
+
+
+def get_file_signature(filename: str) -> Optional[Tuple[int, int, int, int]]:
+    """
+        Gets a signature of the file the path currently resolves to, which changes when the content of the file
+        is modified or when the path is switched to a different file by a rename or a symlink swap.
+    """
+    try:
+        fstat = os.stat(filename)
+        signature = (fstat.st_dev, fstat.st_ino, fstat.st_size, fstat.st_mtime_ns)
+    except OSError:
+        signature = None
+    return signature
+
+
+def open_inotify() -> Optional[Tuple[ctypes.CDLL, int]]:
+    """
+        Opens an inotify instance using the C library.
+
+        :returns: A tuple with the C library and the inotify file descriptor, or None if inotify is not available.
+    """
+
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        inotify_fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+
+    if inotify_fd < 0:
+        return None
+
+    return libc, inotify_fd
+
+
+class FileChangeWatcher(ConfigurationChangeWatcher):
+    """
+        Watches a set of configuration files for changes using Linux inotify, or by polling the files when
+        inotify is not available or the directories cannot be watched.  Bursts of events are debounced, up to
+        a maximum delay, then the files are checked against the signature they had when they were last loaded
+        and only the files that actually changed are loaded again and passed to the change callback.
+    """
+
+    def __init__(self, source_uri: str, watched_files: Dict[str, str], load_file: FileLoader, on_change: ChangeCallback,
+                 debounce: float = 0.25, max_debounce: float = 2.0, poll_interval: float = 2.0, use_inotify: bool = True):
+        """
+            Creates a file watcher.
+
+            :param source_uri: The uri of the source the files belong to.
+            :param watched_files: A table of the files to watch by the name that is passed to the change callback.
+            :param load_file: The callable that loads and parses a file that changed.
+            :param on_change: The callback that is called with the name, format and content of a changed file.
+            :param debounce: The quiet time in seconds to wait for after an event before the files are checked.
+            :param max_debounce: The maximum time in seconds a steady stream of events can delay the check.
+            :param poll_interval: The interval in seconds the files are checked at when inotify is not available.
+            :param use_inotify: Indicates if inotify should be used when it is available.
+        """
+        super().__init__(source_uri, list(watched_files.keys()), on_change)
+        self._watched_files = dict(watched_files)
+        self._load_file = load_file
+        self._debounce = debounce
+        self._max_debounce = max_debounce
+        self._poll_interval = poll_interval
+        self._use_inotify = use_inotify
+
+        self._signatures = {}
+        for filename in self._watched_files.values():
+            self._signatures[filename] = get_file_signature(filename)
+
+        return
+
+    @property
+    def watched_files(self) -> Dict[str, str]:
+        return self._watched_files
+
+    def check_for_changes(self):
+        """
+            Checks each of the watched files against its signature and reloads the files that changed.
+        """
+
+        for name, filename in self._watched_files.items():
+            signature = get_file_signature(filename)
+
+            # A missing file is most likely in the middle of a swap, wait for it to come back
+            if signature is None or signature == self._signatures.get(filename):
+                continue
+
+            try:
+                config_format, config_info = self._load_file(filename)
+            except Exception as xcpt:
+                # The file might have been caught part way through a write, we will see another event
+                logger.warning(f"Unable to reload configuration file={filename}, {xcpt}")
+                continue
+
+            self._signatures[filename] = signature
+
+            if config_info is not None:
+                self.notify_change(name, config_format, config_info)
+
+        return
+
+    def watch_changes(self):
+
+        inotify = None
+        if self._use_inotify:
+            inotify = open_inotify()
+
+        if inotify is not None:
+            libc, inotify_fd = inotify
+            try:
+                self._add_inotify_watches(libc, inotify_fd)
+            except OSError as oserr:
+                # The directory might not exist yet or the inotify watch limit has been reached, polling
+                # still works in both cases so don't keep retrying inotify
+                logger.warning(f"Unable to watch the configuration files with inotify, polling for changes instead. {oserr}")
+                os.close(inotify_fd)
+                inotify = None
+                self._use_inotify = False
+
+        if inotify is None:
+            self._poll_for_changes()
+        else:
+            try:
+                self._watch_inotify(inotify_fd)
+            finally:
+                os.close(inotify_fd)
+
+        return
+
+    def _poll_for_changes(self):
+
+        while not self._stop_event.wait(self._poll_interval):
+            self.check_for_changes()
+
+        return
+
+    def _add_inotify_watches(self, libc: ctypes.CDLL, inotify_fd: int):
+
+        watch_dirs: Set[str] = set()
+        for filename in self._watched_files.values():
+            watch_dirs.add(os.path.dirname(os.path.abspath(filename)))
+
+        for watch_dir in watch_dirs:
+            wd = libc.inotify_add_watch(inotify_fd, watch_dir.encode(), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, f"Unable to add an inotify watch for directory={watch_dir}")
+
+        return
+
+    def _watch_inotify(self, inotify_fd: int):
+
+        # Pick up anything that changed while the watches were being set up
+        self.check_for_changes()
+
+        while not self.stopped:
+            if not self._wait_for_events(inotify_fd, timeout=1.0):
+                continue
+
+            # Debounce the burst of events a deployment generates, then check the files once.  A directory
+            # that never goes quiet can only delay the check by the maximum debounce time.
+            debounce_end = time.monotonic() + self._max_debounce
+            while not self.stopped:
+                remaining = debounce_end - time.monotonic()
+                if remaining <= 0 or not self._wait_for_events(inotify_fd, timeout=min(self._debounce, remaining)):
+                    break
+
+            self.check_for_changes()
+
+        return
+
+    def _wait_for_events(self, inotify_fd: int, timeout: float) -> bool:
+        """
+            Waits for inotify events and drains them.  We only need to know that something happened in one
+            of the watched directories, the files themselves are compared by signature.
+        """
+
+        ready, _, _ = select.select([inotify_fd], [], [], timeout)
+
+        got_events = False
+
+        if len(ready) > 0:
+            try:
+                while True:
+                    buffer = os.read(inotify_fd, 64 * 1024)
+                    if len(buffer) < INOTIFY_EVENT_HEADER.size:
+                        break
+                    got_events = True
+            except BlockingIOError:
+                pass
+
+        return got_events
@@ -0,0 +1,259 @@
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Dict, List, Optional, Tuple, Union
+
+import logging
+import math
+import re
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.deadline import Deadline
+from mojo.config.sources.configurationsourcebase import (
+    ConfigurationSourceBase
+)
+from mojo.config.sources.httpsource import HttpSource
+
+logger = logging.getLogger()
+
+MIRROR_SEPARATOR = "|"
+
+MIRROR_SCHEME_EXP = re.compile(r"^https?://")
+
+DEFAULT_HEDGE_DELAY = 0.25
+DEFAULT_HEDGE_WORKERS = 8
+
+# The minimum number of latency samples a mirror must have before its p95 is trusted
+MIN_LATENCY_SAMPLES = 20
+
+
+class MirrorLatencyStats:
+    """
+        Keeps a window of the most recent request latencies for each mirror so the hedge delay
+        can be estimated from the observed p95 latency of the primary mirror.
+    """
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+        return
+
+    def percentile(self, mirror_uri: str, pct: float = 0.95) -> Optional[float]:
+        """
+            Gets the latency percentile for a mirror or None if there are not enough samples.
+        """
+
+        rtnval = None
+
+        with self._lock:
+            samples = self._samples.get(mirror_uri)
+            if samples is not None and len(samples) >= MIN_LATENCY_SAMPLES:
+                ordered = sorted(samples)
+                index = min(len(ordered) - 1, int(math.ceil(pct * len(ordered))) - 1)
+                rtnval = ordered[index]
+
+        return rtnval
+
+    def record(self, mirror_uri: str, latency: float):
+        """
+            Records the latency of a request made to a mirror.
+        """
+
+        with self._lock:
+            samples = self._samples.get(mirror_uri)
+            if samples is None:
+                samples = deque(maxlen=self._window)
+                self._samples[mirror_uri] = samples
+            samples.append(latency)
+
+        return
+
+
+MIRROR_LATENCY_STATS = MirrorLatencyStats()
+
+HEDGE_EXECUTOR_LOCK = threading.Lock()
+HEDGE_EXECUTOR = None
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """
+        Gets the shared thread pool that is used to make the requests to the mirrors.
+    """
+    global HEDGE_EXECUTOR
+
+    if HEDGE_EXECUTOR is None:
+        HEDGE_EXECUTOR_LOCK.acquire()
+        try:
+            if HEDGE_EXECUTOR is None:
+                HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=DEFAULT_HEDGE_WORKERS, thread_name_prefix="mojo-config-hedge")
+        finally:
+            HEDGE_EXECUTOR_LOCK.release()
+
+    return HEDGE_EXECUTOR
+
+
+class HttpMirrorSource(ConfigurationSourceBase):
+    """
+        A configuration source for a group of HTTP mirrors that host the same configuration tree.  The
+        request is sent to the primary mirror first and if it has not answered after the hedge delay, a
+        hedged request is sent to the next mirror.  The first mirror that answers with the configuration
+        is used, a mirror that fails or does not have the configuration only causes the next mirror to be
+        asked.  A mirror group is specified by separating the http or https mirror uris with a '|'.
+    """
+
+    scheme = "http"
+    secure_scheme = "https"
+
+    def __init__(self, uri: str, mirrors: List[HttpSource], hedge_delay: Optional[float] = None):
+        super().__init__(uri)
+        self._mirrors = mirrors
+        self._hedge_delay = hedge_delay
+        return
+
+    @property
+    def hedge_delay(self) -> Optional[float]:
+        return self._hedge_delay
+
+    @property
+    def mirrors(self) -> List[HttpSource]:
+        return self._mirrors
+
+    @classmethod
+    def is_mirror_group(cls, uri: str) -> bool:
+        mirror_uris = uri.split(MIRROR_SEPARATOR)
+        rtnval = len(mirror_uris) > 1 and all(MIRROR_SCHEME_EXP.match(muri.strip()) is not None for muri in mirror_uris)
+        return rtnval
+
+    @classmethod
+    def parse(cls, uri: str, hedge_delay: Optional[float] = None, **source_options) -> Union[None, "HttpMirrorSource"]:
+        """
+            Parses a mirror group uri into a :class:`HttpMirrorSource`.
+
+            :param uri: The mirror uris separated by a '|'.
+            :param hedge_delay: An optional fixed delay before a hedged request is sent, when not provided the
+                                delay is estimated from the p95 latency of the primary mirror.
+            :param source_options: The options used to create the :class:`HttpSource` for each of the mirrors.
+        """
+
+        rtnobj = None
+
+        if not cls.is_mirror_group(uri):
+            return None
+
+        mirrors = []
+        for mirror_uri in uri.split(MIRROR_SEPARATOR):
+            mirror = HttpSource.parse(mirror_uri.strip(), fallback_on_timeout=False, **source_options)
+            if mirror is None:
+                break
+            mirrors.append(mirror)
+        else:
+            if len(mirrors) > 0:
+                rtnobj = HttpMirrorSource(uri, mirrors, hedge_delay=hedge_delay)
+
+        return rtnobj
+
+    def get_hedge_delay(self, mirror: HttpSource) -> float:
+        """
+            Gets the time to wait on a mirror before sending a hedged request to the next mirror.
+        """
+
+        hedge_delay = self._hedge_delay
+        if hedge_delay is None:
+            hedge_delay = MIRROR_LATENCY_STATS.percentile(mirror.uri)
+            if hedge_delay is None:
+                hedge_delay = DEFAULT_HEDGE_DELAY
+
+        return hedge_delay
+
+    def try_load_configuration(self, config_name: str, credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+                               deadline: Optional[Deadline] = None) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
+
+        pending: Dict[Future, HttpSource] = {}
+        last_error = None
+        not_found = False
+
+        next_mirror = 0
+
+        while True:
+            if next_mirror < len(self._mirrors) and len(pending) == 0:
+                # Nothing is in flight, because this is the first request or the requests in flight failed
+                mirror = self._mirrors[next_mirror]
+                next_mirror += 1
+                pending[self._submit(mirror, config_name, credentials, deadline)] = mirror
+
+            if len(pending) == 0:
+                break
+
+            timeout = None
+            if next_mirror < len(self._mirrors):
+                last_mirror = self._mirrors[next_mirror - 1]
+                timeout = self.get_hedge_delay(last_mirror)
+            if deadline is not None:
+                timeout = deadline.clamp_timeout(timeout)
+
+            done, _ = wait(list(pending.keys()), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            failed = False
+
+            for fut in done:
+                mirror = pending.pop(fut)
+                try:
+                    config_format, config_info = fut.result()
+                except Exception as xcpt:
+                    logger.warning(f"Mirror uri={mirror.uri} failed to answer, {xcpt}")
+                    last_error = xcpt
+                    failed = True
+                    continue
+
+                if config_info is None:
+                    # The mirror answered but does not have the configuration, it may not be up to date, so
+                    # only give up on the configuration once the other mirrors have answered as well
+                    not_found = True
+                    failed = True
+                    continue
+
+                for other in pending.keys():
+                    other.cancel()
+
+                return config_format, config_info
+
+            if deadline is not None and deadline.expired:
+                break
+
+            if len(pending) > 0 and (len(done) == 0 or failed) and next_mirror < len(self._mirrors):
+                # The mirrors in flight are slow or one of them failed, send a hedged request to the next mirror
+                mirror = self._mirrors[next_mirror]
+                next_mirror += 1
+                pending[self._submit(mirror, config_name, credentials, deadline)] = mirror
+
+        # Only fail if every mirror that was asked failed, a mirror that answered that it does not have
+        # the configuration is a valid answer
+        if last_error is not None and not not_found and (deadline is None or not deadline.expired):
+            raise last_error
+
+        return None, None
+
+    def _submit(self, mirror: HttpSource, config_name: str, credentials: Optional[Dict[str, Tuple[str, str]]],
+                deadline: Optional[Deadline]) -> Future:
+
+        started = time.monotonic()
+
+        def record_latency(fut: Future):
+            # Record the latency of every mirror that answers, even the ones that lost the race, so
+            # the statistics are not skewed towards the fast answers.
+            if not fut.cancelled() and fut.exception() is None:
+                MIRROR_LATENCY_STATS.record(mirror.uri, time.monotonic() - started)
+            return
+
+        fut = get_hedge_executor().submit(mirror.try_load_configuration, config_name, credentials, deadline=deadline)
+        fut.add_done_callback(record_latency)
+
+        return fut
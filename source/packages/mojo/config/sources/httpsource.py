@@ -6,24 +6,128 @@ __credits__ = []
 from typing import Dict, Optional, Tuple, Union
 
 import http
+import logging
 import re
 import json
-import yaml
+import threading
+import time
+
+from urllib.parse import urlparse
 
 import requests
 
+from requests.adapters import HTTPAdapter
+
 from mojo.errors.exceptions import ConfigurationError
+from mojo.config.diskcache import DiskCache
 from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.configurationparsers import load_configuration_content
+from mojo.config.deadline import Deadline
+from mojo.config.sourcemanifest import MANIFEST_FILENAME, is_source_manifest, lookup_manifest_entry
 from mojo.config.sources.configurationsourcebase import (
     ConfigurationSourceBase
 )
 
+logger = logging.getLogger()
+
 EXTENSION_TO_CONFIG_FORMAT = {
     "yml": ConfigurationFormat.YAML,
     "yaml": ConfigurationFormat.YAML,
     "json": ConfigurationFormat.JSON
 }
 
+DEFAULT_POOL_SIZE = 10
+
+DEFAULT_MANIFEST_TTL = 300
+
+SESSION_LOCK = threading.Lock()
+SESSION_TABLE: Dict[str, requests.Session] = {}
+
+MANIFEST_LOCK = threading.Lock()
+MANIFEST_TABLE: Dict[str, Tuple[float, Optional[dict]]] = {}
+
+RESPONSE_CACHE_LOCK = threading.Lock()
+RESPONSE_CACHE_TABLE: Dict[str, DiskCache] = {}
+
+
+def get_http_session(url: str, pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """
+        Gets the shared, pooled :class:`requests.Session` for the scheme, host and pool size provided.  The
+        session is created on first use and keeps its connections alive so subsequent requests to the same
+        host re-use the connections instead of paying for a new TCP connection and TLS handshake.  Sources
+        that ask for a different pool size get their own session, so the pool always has the size requested.
+
+        :param url: The url that the session will be used to make requests to.
+        :param pool_size: The maximum number of connections to keep in the pool for the host.
+
+        :returns: The shared session for the host.
+    """
+
+    urlinfo = urlparse(url)
+    session_key = f"{urlinfo.scheme}://{urlinfo.netloc}#pool_size={pool_size}"
+
+    session = SESSION_TABLE.get(session_key)
+    if session is None:
+        SESSION_LOCK.acquire()
+        try:
+            session = SESSION_TABLE.get(session_key)
+            if session is None:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+
+                session = requests.Session()
+                session.mount(f"{urlinfo.scheme}://", adapter)
+
+                SESSION_TABLE[session_key] = session
+        finally:
+            SESSION_LOCK.release()
+
+    return session
+
+
+def get_http_response_cache(cache_dir: str, max_bytes: int) -> DiskCache:
+    """
+        Gets the shared HTTP response cache for the cache directory provided.  The response cache stores the
+        validators and the parsed content of configuration documents so unchanged documents can be served
+        from the cache after a conditional GET returns '304 Not Modified'.
+
+        :param cache_dir: The directory where the cached responses are stored.
+        :param max_bytes: The size bound of the cache in bytes.
+
+        :returns: The response cache for the directory.
+    """
+
+    RESPONSE_CACHE_LOCK.acquire()
+    try:
+        cache = RESPONSE_CACHE_TABLE.get(cache_dir)
+        if cache is None:
+            cache = DiskCache(cache_dir, max_bytes)
+            RESPONSE_CACHE_TABLE[cache_dir] = cache
+    finally:
+        RESPONSE_CACHE_LOCK.release()
+
+    return cache
+
+
+def purge_http_response_cache(cache_dir: Optional[str] = None):
+    """
+        Purges the cached responses from the response cache for the directory provided or from all of the
+        response caches if no directory is provided.
+    """
+
+    RESPONSE_CACHE_LOCK.acquire()
+    try:
+        if cache_dir is not None:
+            caches = [RESPONSE_CACHE_TABLE.get(cache_dir, DiskCache(cache_dir, 0))]
+        else:
+            caches = list(RESPONSE_CACHE_TABLE.values())
+    finally:
+        RESPONSE_CACHE_LOCK.release()
+
+    for cache in caches:
+        cache.purge()
+
+    return
+
 
 class HttpSource(ConfigurationSourceBase):
 
@@ -33,46 +137,263 @@ class HttpSource(ConfigurationSourceBase):
     parse_http_exp = re.compile(r"http://(?P<baseurl>[\S]+)")
     parse_https_exp = re.compile(r"https://(?P<baseurl>[\S]+)")
 
-    def __init__(self, uri: str):
-        super().__init__(uri)
+    def __init__(self, uri: str, pool_size: int = DEFAULT_POOL_SIZE, preconnect: bool = False, cache: Optional[DiskCache] = None,
+                 use_manifest: bool = False, manifest_ttl: float = DEFAULT_MANIFEST_TTL, connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None, fallback_on_timeout: bool = True):
+        super().__init__(uri, connect_timeout=connect_timeout, read_timeout=read_timeout)
+        self._pool_size = pool_size
+        self._session = get_http_session(uri, pool_size=pool_size)
+        self._cache = cache
+        self._use_manifest = use_manifest
+        self._manifest_ttl = manifest_ttl
+        self._fallback_on_timeout = fallback_on_timeout
+
+        if preconnect:
+            self.preconnect()
         return
 
+    @property
+    def cache(self) -> Optional[DiskCache]:
+        return self._cache
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    @property
+    def session(self) -> requests.Session:
+        return self._session
+
     @classmethod
-    def parse(cls, uri: str) -> Union[None, "HttpSource"]:
+    def parse(cls, uri: str, pool_size: int = DEFAULT_POOL_SIZE, preconnect: bool = False, cache: Optional[DiskCache] = None,
+              use_manifest: bool = False, manifest_ttl: float = DEFAULT_MANIFEST_TTL, connect_timeout: Optional[float] = None,
+              read_timeout: Optional[float] = None, fallback_on_timeout: bool = True) -> Union[None, "HttpSource"]:
 
         rtnobj = None
 
         mobj = cls.parse_http_exp.match(uri)
         if mobj is not None:
-            rtnobj = HttpSource(uri)
+            rtnobj = HttpSource(uri, pool_size=pool_size, preconnect=preconnect, cache=cache, use_manifest=use_manifest,
+                                manifest_ttl=manifest_ttl, connect_timeout=connect_timeout, read_timeout=read_timeout, fallback_on_timeout=fallback_on_timeout)
         
         mobj = cls.parse_https_exp.match(uri)
         if mobj is not None:
-            rtnobj = HttpSource(uri)
+            rtnobj = HttpSource(uri, pool_size=pool_size, preconnect=preconnect, cache=cache, use_manifest=use_manifest,
+                                manifest_ttl=manifest_ttl, connect_timeout=connect_timeout, read_timeout=read_timeout, fallback_on_timeout=fallback_on_timeout)
 
         return rtnobj
+
+    def get_manifest(self, deadline: Optional[Deadline] = None) -> Optional[dict]:
+        """
+            Gets the source manifest for the source if the server has one.  The manifest is kept for the
+            manifest time to live and then requested again, so a manifest that changes on the server is
+            picked up.  A response that is not a source manifest is ignored.
+        """
+
+        baseurl = self._uri.rstrip("/")
+
+        cached = MANIFEST_TABLE.get(baseurl)
+
+        if cached is not None and time.monotonic() - cached[0] < self._manifest_ttl:
+            manifest = cached[1]
+
+        elif deadline is not None and deadline.expired:
+            # There is no time left to fetch the manifest, fall back to probing
+            manifest = None
+
+        else:
+            manifest = None
+
+            manifest_url = f"{baseurl}/{MANIFEST_FILENAME}"
+
+            try:
+                resp = self._session.get(manifest_url, timeout=self.get_timeouts(deadline))
+            except requests.Timeout:
+                logger.warning(f"Timed out requesting the source manifest url={manifest_url}")
+                return None
+            except requests.RequestException as rerr:
+                # The manifest is only an optimization, so a failed request is treated like a missing manifest
+                logger.warning(f"Unable to request the source manifest url={manifest_url} error={rerr}")
+                return None
+
+            if resp.status_code == http.HTTPStatus.OK:
+                try:
+                    manifest = json.loads(resp.content)
+                except ValueError:
+                    logger.warning(f"Unable to parse the source manifest url={manifest_url}")
+
+                if not is_source_manifest(manifest):
+                    manifest = None
+
+            MANIFEST_LOCK.acquire()
+            try:
+                MANIFEST_TABLE[baseurl] = (time.monotonic(), manifest)
+            finally:
+                MANIFEST_LOCK.release()
+
+        return manifest
+
+    def preconnect(self):
+        """
+            Starts a background thread that opens a connection to the source host so the connection
+            and TLS handshake are already established by the time the first configuration is requested.
+        """
+        sgthread = threading.Thread(target=self._preconnect_worker, name="mojo-config-preconnect", daemon=True)
+        sgthread.start()
+        return
     
-    def try_load_configuration(self, config_name: str, credentials: Optional[Dict[str, Tuple[str, str]]] = None) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
+    def try_load_configuration(self, config_name: str, credentials: Optional[Dict[str, Tuple[str, str]]] = None,
+                               deadline: Optional[Deadline] = None) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
         
         config_info = None
         config_format = None
 
         baseurl = self._uri.rstrip("/")
 
-        for ext in ["yaml", "yml", "json"]:
-            checkurl = f"{baseurl}/{config_name}.{ext}"
-            resp = requests.get(checkurl)
+        manifest = None
+        if self._use_manifest:
+            manifest = self.get_manifest(deadline=deadline)
 
-            if resp.status_code == http.HTTPStatus.OK:
-                config_format = EXTENSION_TO_CONFIG_FORMAT[ext]
+        candidates = [
+            (f"{config_name}.{ext}", EXTENSION_TO_CONFIG_FORMAT[ext]) for ext in ["yaml", "yml", "json"]
+        ]
+
+        if manifest is not None:
+            # The manifest tells us which document to request first, but the manifest can be stale, so
+            # if the name is not listed or the document is gone we fall back to probing for it
+            entry = lookup_manifest_entry(manifest, config_name)
+            if entry is not None:
+                manifest_candidate = (entry["file"], ConfigurationFormat(entry["format"]))
+                candidates = [manifest_candidate] + [cand for cand in candidates if cand != manifest_candidate]
+
+        timed_out = False
+
+        for filename, cand_format in candidates:
+            checkurl = f"{baseurl}/{filename}"
+
+            cache_entry = None
+            headers = {}
+
+            if self._cache is not None:
+                cache_entry = self._get_cache_entry(checkurl)
+                if cache_entry is not None:
+                    if cache_entry["etag"] is not None:
+                        headers["If-None-Match"] = cache_entry["etag"]
+                    if cache_entry["last_modified"] is not None:
+                        headers["If-Modified-Since"] = cache_entry["last_modified"]
+
+            if deadline is not None and deadline.expired:
+                if cache_entry is not None:
+                    logger.warning(f"Deadline expired, using the cached copy of url={checkurl}")
+                    config_format = ConfigurationFormat(cache_entry["config_format"])
+                    config_info = cache_entry["config_info"]
+                    break
+                continue
+
+            try:
+                resp = self._session.get(checkurl, headers=headers, timeout=self.get_timeouts(deadline))
+            except requests.Timeout:
+                if not self._fallback_on_timeout:
+                    raise
+
+                if cache_entry is not None:
+                    logger.warning(f"Timed out requesting url={checkurl}, using the cached copy.")
+                    config_format = ConfigurationFormat(cache_entry["config_format"])
+                    config_info = cache_entry["config_info"]
+                else:
+                    # Treat the source as unavailable so the loader can fall back to the next source
+                    logger.warning(f"Timed out requesting url={checkurl}")
+                    timed_out = True
+                break
+
+            if resp.status_code == http.HTTPStatus.NOT_MODIFIED and cache_entry is not None:
+                # The document has not changed, so we can use the parsed content from the cache
+                config_format = ConfigurationFormat(cache_entry["config_format"])
+                config_info = cache_entry["config_info"]
+                break
+
+            elif resp.status_code == http.HTTPStatus.OK:
+                config_format = cand_format
                 config_content = resp.content
-                if config_format == ConfigurationFormat.YAML:
-                    config_info = yaml.safe_load(config_content)
-                elif config_format == ConfigurationFormat.JSON:
-                    config_info = json.loads(config_content)
+                if config_format in [ConfigurationFormat.YAML, ConfigurationFormat.JSON]:
+                    config_info = load_configuration_content(config_format, config_content)
+
+                if self._cache is not None:
+                    self._update_cache(checkurl, resp, config_format, config_info)
+
                 break
 
+        self.record_timeout(config_name, timed_out)
+
         if config_info is not None:
             config_format = None
 
         return config_format, config_info
+
+    def purge_cache(self):
+        """
+            Purges all of the cached responses from the response cache used by this source.
+        """
+        if self._cache is not None:
+            self._cache.purge()
+        return
+
+    def _preconnect_worker(self):
+
+        try:
+            self._session.head(self._uri, timeout=self.get_timeouts())
+        except requests.RequestException:
+            # The pre-connect is only an optimization, any real connectivity problem
+            # will be reported when a configuration is loaded.
+            pass
+
+        return
+
+    def _get_cache_entry(self, checkurl: str) -> Optional[dict]:
+
+        try:
+            cache_entry = self._cache.get(checkurl)
+        except OSError as oserr:
+            # The response cache is only an optimization, treat a cache that cannot be read as a miss
+            logger.warning(f"Unable to read the response cache entry for url={checkurl}, {oserr}")
+            cache_entry = None
+
+        if cache_entry is not None and not (isinstance(cache_entry, dict) and
+            {"etag", "last_modified", "config_format", "config_info"}.issubset(cache_entry)):
+            cache_entry = None
+
+        return cache_entry
+
+    def _update_cache(self, checkurl: str, resp: requests.Response, config_format: ConfigurationFormat, config_info: dict):
+
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+
+        try:
+            if etag is not None or last_modified is not None:
+                cache_entry = {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "config_format": config_format.value,
+                    "config_info": config_info
+                }
+                self._cache.put(checkurl, cache_entry)
+            else:
+                # Without a validator the response cannot be re-validated so don't keep a stale copy
+                self._cache.remove(checkurl)
+        except TypeError:
+            # The content cannot be stored as JSON, so don't keep a stale copy of an older version
+            self._remove_cache_entry(checkurl)
+        except OSError as oserr:
+            logger.warning(f"Unable to update the response cache entry for url={checkurl}, {oserr}")
+
+        return
+
+    def _remove_cache_entry(self, checkurl: str):
+
+        try:
+            self._cache.remove(checkurl)
+        except OSError as oserr:
+            logger.warning(f"Unable to remove the response cache entry for url={checkurl}, {oserr}")
+
+        return
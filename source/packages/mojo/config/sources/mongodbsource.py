@@ -3,7 +3,7 @@ __author__ = "Myron Walker"
 __copyright__ = "Copyright 2020, Myron W Walker"
 __credits__ = []
 
-from typing import Dict, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import logging
 import os
@@ -13,19 +13,25 @@ from urllib.parse import quote_plus
 
 from mojo.errors.exceptions import ConfigurationError
 from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.deadline import Deadline
 from mojo.config.sources.configurationsourcebase import (
     ConfigurationSourceBase
 )
+from mojo.config.sources.changewatcher import ChangeCallback, ConfigurationChangeWatcher
+from mojo.config.sources.clientregistry import CLIENT_REGISTRY, credential_fingerprint
 
 logger = logging.getLogger()
 
 class MongoDBSource(ConfigurationSourceBase):
 
     scheme = "mongodb"
+    supports_batch_load = True
+    supports_change_feed = True
     parse_exp = re.compile(r"mongodb://(?P<host>[a-zA-Z\.0-9\-]+)/(?P<database>[a-zA-Z\.0-9\-]+)/(?P<collection>[a-zA-Z\.0-9\-]+)")
 
-    def __init__(self, uri: str, host: str, database: str, collection: str, verify_certificate: bool = True):
-        super().__init__(uri)
+    def __init__(self, uri: str, host: str, database: str, collection: str, verify_certificate: bool = True,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None):
+        super().__init__(uri, connect_timeout=connect_timeout, read_timeout=read_timeout)
         self._host = host
         self._database = database
         self._collection = collection
@@ -49,7 +55,8 @@ class MongoDBSource(ConfigurationSourceBase):
         return self._port
 
     @classmethod
-    def parse(cls, uri: str, verify_certificate: bool = True) -> Union[None, "MongoDBSource"]:
+    def parse(cls, uri: str, verify_certificate: bool = True, connect_timeout: Optional[float] = None,
+              read_timeout: Optional[float] = None) -> Union[None, "MongoDBSource"]:
 
         rtnobj = None
 
@@ -65,33 +72,56 @@ class MongoDBSource(ConfigurationSourceBase):
             host = matchinfo["host"]
             database = matchinfo["database"]
             collection = matchinfo["collection"]
-            rtnobj = MongoDBSource(uri, host, database, collection, verify_certificate=verify_certificate)
+            rtnobj = MongoDBSource(uri, host, database, collection, verify_certificate=verify_certificate,
+                                   connect_timeout=connect_timeout, read_timeout=read_timeout)
 
         return rtnobj
 
-    def try_load_configuration(self, config_name: str, credentials: Dict[str, Tuple[str, str]]) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
+    def create_change_watcher(self, config_names: List[str], on_change: ChangeCallback,
+                              credentials: Optional[Dict[str, Tuple[str, str]]] = None) -> "MongoDBChangeWatcher":
+        watcher = MongoDBChangeWatcher(self, config_names, on_change, credentials)
+        return watcher
+
+    def get_collection(self, credentials: Dict[str, Tuple[str, str]]):
+        """
+            Gets the collection that holds the configurations using the pooled client for the host.
+        """
+        username, password = credentials[self._host]
+
+        client = self._get_client(username, password)
+
+        collection = client[self._database][self._collection]
+
+        return collection
+
+    def try_load_configuration(self, config_name: str, credentials: Dict[str, Tuple[str, str]],
+                               deadline: Optional[Deadline] = None) -> Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]:
 
         config_info = None
         config_format = None
 
-        try:
-            username, password = credentials[self._host]
-            dburi = f"mongodb+srv://{username}:{quote_plus(password)}@{self._host}/?retryWrites=true&w=majority"
+        if deadline is not None and deadline.expired:
+            return config_format, config_info
 
+        try:
             import pymongo
 
-            client = pymongo.MongoClient(dburi, connect=False)
-
-            try:
-                db = client[self._database]
+            collection = self.get_collection(credentials)
 
-                collection = db[self._collection]
+            # The operation time of the session is recorded so a change stream started later for the
+            # configuration does not miss the changes made after it was read
+            with collection.database.client.start_session() as session:
+                if deadline is not None and hasattr(pymongo, "timeout"):
+                    # The client is shared so we use a client side operation timeout to limit
+                    # the query to the time remaining before the deadline
+                    with pymongo.timeout(deadline.remaining):
+                        config_info = collection.find_one({"_id": config_name}, session=session)
+                else:
+                    config_info = collection.find_one({"_id": config_name}, session=session)
 
-                config_info = collection.find_one({"_id": config_name})
-                config_format = ConfigurationFormat.JSON
+                self.record_change_position([config_name], session.operation_time)
 
-            finally:
-                client.close()
+            config_format = ConfigurationFormat.JSON
 
         except Exception as xcpt:
             import traceback
@@ -101,3 +131,127 @@ class MongoDBSource(ConfigurationSourceBase):
 
 
         return config_format, config_info
+
+    def try_load_configurations(self, config_names: List[str], credentials: Dict[str, Tuple[str, str]],
+                                deadline: Optional[Deadline] = None) -> Dict[str, Union[Tuple[ConfigurationFormat, dict], Tuple[None, None]]]:
+        """
+            Loads a set of configurations from the collection with a single query.
+        """
+
+        results = { cname: (None, None) for cname in config_names }
+
+        if deadline is not None and deadline.expired:
+            return results
+
+        try:
+            import pymongo
+
+            collection = self.get_collection(credentials)
+
+            query = {"_id": {"$in": list(config_names)}}
+
+            with collection.database.client.start_session() as session:
+                if deadline is not None and hasattr(pymongo, "timeout"):
+                    with pymongo.timeout(deadline.remaining):
+                        found = list(collection.find(query, session=session))
+                else:
+                    found = list(collection.find(query, session=session))
+
+                self.record_change_position(config_names, session.operation_time)
+
+            for config_info in found:
+                cname = config_info["_id"]
+                if cname in results:
+                    results[cname] = (ConfigurationFormat.JSON, config_info)
+
+        except Exception as xcpt:
+            import traceback
+            errmsg = traceback.format_exc()
+            logger.error(errmsg)
+
+        return results
+
+    def _get_client(self, username: str, password: str):
+        """
+            Gets the pooled client for the host and credentials from the client registry.
+        """
+
+        registry_key = (self.scheme, self._host, credential_fingerprint(username, password), self._verify_certificate,
+                        self._connect_timeout, self._read_timeout)
+
+        def create_client():
+            import pymongo
+
+            dburi = f"mongodb+srv://{username}:{quote_plus(password)}@{self._host}/?retryWrites=true&w=majority"
+
+            client_options = {}
+
+            if self._connect_timeout is not None:
+                client_options["connectTimeoutMS"] = int(self._connect_timeout * 1000)
+                client_options["serverSelectionTimeoutMS"] = int(self._connect_timeout * 1000)
+            if self._read_timeout is not None:
+                client_options["socketTimeoutMS"] = int(self._read_timeout * 1000)
+
+            client = pymongo.MongoClient(dburi, connect=False, **client_options)
+            return client
+
+        client = CLIENT_REGISTRY.get_client(registry_key, create_client, closer=lambda client: client.close())
+
+        return client
+
+
+class MongoDBChangeWatcher(ConfigurationChangeWatcher):
+    """
+        Watches a MongoDB collection for changes to a set of configuration documents using a change
+        stream.  The stream starts at the operation time recorded when the documents were loaded and the
+        resume token of the last change seen is kept so the stream can be resumed without missing changes
+        if the connection is lost.
+    """
+
+    def __init__(self, source: MongoDBSource, config_names: List[str], on_change: ChangeCallback,
+                 credentials: Dict[str, Tuple[str, str]], max_await: float = 1.0):
+        super().__init__(source.uri, config_names, on_change)
+        self._source = source
+        self._credentials = credentials
+        self._max_await = max_await
+        self._start_at_operation_time = source.get_change_position(config_names)
+        self._resume_token = None
+        return
+
+    @property
+    def start_at_operation_time(self):
+        return self._start_at_operation_time
+
+    def watch_changes(self):
+
+        collection = self._source.get_collection(self._credentials)
+
+        pipeline = [
+            {"$match": {
+                "operationType": {"$in": ["insert", "update", "replace"]},
+                "documentKey._id": {"$in": self._config_names}
+            }}
+        ]
+
+        # Resume after the last change that was seen, or start from when the documents were loaded
+        start_options = {}
+        if self._resume_token is not None:
+            start_options["resume_after"] = self._resume_token
+        elif self._start_at_operation_time is not None:
+            start_options["start_at_operation_time"] = self._start_at_operation_time
+
+        # The 'updateLookup' option has the server send the current version of only the document that changed
+        with collection.watch(pipeline, full_document="updateLookup", max_await_time_ms=int(self._max_await * 1000),
+                              **start_options) as stream:
+            while not self.stopped and stream.alive:
+                change = stream.try_next()
+
+                if stream.resume_token is not None:
+                    self._resume_token = stream.resume_token
+
+                if change is not None:
+                    config_info = change.get("fullDocument")
+                    if config_info is not None:
+                        self.notify_change(config_info["_id"], ConfigurationFormat.JSON, config_info)
+
+        return
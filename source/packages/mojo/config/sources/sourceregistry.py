@@ -0,0 +1,61 @@
+"""
+.. module:: sourceregistry
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the process wide registry of configuration sources.  Sources are shared
+               by key, so a source that is listed for more than one configuration category is only created once.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Callable, Dict, Hashable
+
+import threading
+
+from mojo.config.sources.configurationsourcebase import ConfigurationSourceBase
+
+SOURCE_REGISTRY_LOCK = threading.Lock()
+SOURCE_REGISTRY_TABLE: Dict[Hashable, ConfigurationSourceBase] = {}
+
+
+def get_registered_source(key: Hashable, factory: Callable[[], ConfigurationSourceBase]) -> ConfigurationSourceBase:
+    """
+        Gets the configuration source registered for a key or creates and registers a new source.  The sources
+        are shared by all of the configuration loaders in the process, so sources that are listed for more than
+        one configuration category are only parsed and connected once.
+
+        :param key: The key of the source, the normalized source uri and the settings the source was created with.
+        :param factory: A callable that creates the source.
+
+        :returns: The source for the key.
+    """
+
+    src = SOURCE_REGISTRY_TABLE.get(key)
+    if src is None:
+        SOURCE_REGISTRY_LOCK.acquire()
+        try:
+            src = SOURCE_REGISTRY_TABLE.get(key)
+            if src is None:
+                src = factory()
+                SOURCE_REGISTRY_TABLE[key] = src
+        finally:
+            SOURCE_REGISTRY_LOCK.release()
+
+    return src
+
+
+def clear_registered_sources():
+    """
+        Clears the registered sources so new sources are created the next time they are requested.
+    """
+
+    SOURCE_REGISTRY_LOCK.acquire()
+    try:
+        SOURCE_REGISTRY_TABLE.clear()
+    finally:
+        SOURCE_REGISTRY_LOCK.release()
+
+    return
@@ -0,0 +1,235 @@
+"""
+.. module:: sourceschemes
+    :platform: Darwin, Linux, Unix, Windows
+    :synopsis: Module that contains the table of source schemes that map configuration source uris to the
+               factories that create the sources.  Additional schemes can be registered by other packages
+               with the 'mojo.config.sources' entry point group.
+
+.. moduleauthor:: Myron Walker <myron.walker@gmail.com>
+"""
+
+__author__ = "Myron Walker"
+__copyright__ = "Copyright 2020, Myron W Walker"
+__credits__ = []
+
+from typing import Callable, Dict, List, Optional
+
+import os
+import threading
+
+from mojo.errors.exceptions import ConfigurationError
+
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+from mojo.config.configurationvariables import MOJO_CONFIG_VARIABLES
+from mojo.config.sources.configurationsourcebase import ConfigurationSourceBase
+
+SOURCE_SCHEME_ENTRY_POINT_GROUP = "mojo.config.sources"
+
+SourceFactory = Callable[[str, Dict[str, str], float, float, bool], ConfigurationSourceBase]
+
+
+class SourceScheme:
+    """
+        A :class:`SourceScheme` pairs the function that recognizes the uris of a kind of configuration source
+        with the factory that creates the source.  The factory imports the module of the source when it is
+        called, so the dependencies of a source backend are only loaded when a uri for the backend is used.
+    """
+
+    def __init__(self, name: str, matches: Callable[[str], bool], create: SourceFactory):
+        """
+            Creates a source scheme.
+
+            :param name: The name of the scheme.
+            :param matches: A function that returns True for the source uris handled by the scheme.
+            :param create: A function that creates the source for a uri, it is called with the uri, the
+                           options of the uri, the connect and read timeouts and the verify certificate flag.
+        """
+        self.name = name
+        self.matches = matches
+        self.create = create
+        return
+
+
+SOURCE_SCHEME_LOCK = threading.Lock()
+SOURCE_SCHEMES: List[SourceScheme] = []
+DEFAULT_SOURCE_SCHEME: Optional[SourceScheme] = None
+
+ENTRY_POINTS_LOADED = False
+
+
+def register_source_scheme(scheme: SourceScheme, prefer: bool = False):
+    """
+        Registers a source scheme.  The schemes are checked in the order they are registered unless 'prefer'
+        is set, in which case the scheme is checked before the schemes that are already registered.  A scheme
+        registered with the same name as an existing scheme replaces it.
+    """
+
+    SOURCE_SCHEME_LOCK.acquire()
+    try:
+        for index, registered in enumerate(SOURCE_SCHEMES):
+            if registered.name == scheme.name:
+                del SOURCE_SCHEMES[index]
+                break
+
+        if prefer:
+            SOURCE_SCHEMES.insert(0, scheme)
+        else:
+            SOURCE_SCHEMES.append(scheme)
+    finally:
+        SOURCE_SCHEME_LOCK.release()
+
+    return
+
+
+def find_source_scheme(uri: str) -> SourceScheme:
+    """
+        Finds the source scheme for a source uri.  The schemes provided by installed packages through the
+        'mojo.config.sources' entry point group are loaded the first time a scheme is looked up.  The
+        directory scheme is used for uris that no other scheme matches.
+    """
+
+    if not ENTRY_POINTS_LOADED:
+        _load_entry_point_schemes()
+
+    found = DEFAULT_SOURCE_SCHEME
+
+    SOURCE_SCHEME_LOCK.acquire()
+    try:
+        for scheme in SOURCE_SCHEMES:
+            if scheme.matches(uri):
+                found = scheme
+                break
+    finally:
+        SOURCE_SCHEME_LOCK.release()
+
+    return found
+
+
+def _load_entry_point_schemes():
+    global ENTRY_POINTS_LOADED
+
+    SOURCE_SCHEME_LOCK.acquire()
+    try:
+        loaded = ENTRY_POINTS_LOADED
+        ENTRY_POINTS_LOADED = True
+    finally:
+        SOURCE_SCHEME_LOCK.release()
+
+    if not loaded:
+        from importlib.metadata import entry_points
+
+        try:
+            eps = entry_points(group=SOURCE_SCHEME_ENTRY_POINT_GROUP)
+        except TypeError:
+            # Python 3.8 and 3.9 return a dictionary of the entry points by group
+            eps = entry_points().get(SOURCE_SCHEME_ENTRY_POINT_GROUP, [])
+
+        for ep in eps:
+            scheme = ep.load()
+            if not isinstance(scheme, SourceScheme):
+                errmsg = f"The '{SOURCE_SCHEME_ENTRY_POINT_GROUP}' entry point '{ep.name}' must reference a SourceScheme."
+                raise ConfigurationError(errmsg)
+            register_source_scheme(scheme, prefer=True)
+
+    return
+
+
+def _check_source(src: Optional[ConfigurationSourceBase], source_type: str, uri: str) -> ConfigurationSourceBase:
+    if src is None:
+        errmsg = f"{source_type} encountered an error parsing configuration source uri='{uri}'"
+        raise ConfigurationError(errmsg)
+    return src
+
+
+def _is_http_mirror_group(uri: str) -> bool:
+    mirror_uris = uri.split("|")
+    is_group = len(mirror_uris) > 1 and all(muri.strip().startswith(("http://", "https://")) for muri in mirror_uris)
+    return is_group
+
+
+def _get_http_response_cache():
+
+    cache = None
+
+    # The response cache is opt-in, it stores the content of the documents that were loaded on disk
+    max_bytes = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_CACHE_SIZE
+    if MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_HTTP_CACHE and max_bytes > 0 and \
+        MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY is not None:
+        from mojo.config.sources.httpsource import get_http_response_cache
+
+        cache_dir = os.path.join(MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY, "cache", "http")
+        cache = get_http_response_cache(cache_dir, max_bytes)
+
+    return cache
+
+
+def _create_couchdb_source(uri: str, options: Dict[str, str], connect_timeout: float, read_timeout: float,
+                           verify_certificate: bool) -> ConfigurationSourceBase:
+    from mojo.config.sources.couchdbsource import CouchDBSource
+
+    src = CouchDBSource.parse(uri, connect_timeout=connect_timeout, read_timeout=read_timeout)
+
+    return _check_source(src, "CouchDBSource", uri)
+
+
+def _create_mongodb_source(uri: str, options: Dict[str, str], connect_timeout: float, read_timeout: float,
+                           verify_certificate: bool) -> ConfigurationSourceBase:
+    from mojo.config.sources.mongodbsource import MongoDBSource
+
+    src = MongoDBSource.parse(uri, verify_certificate=verify_certificate,
+                              connect_timeout=connect_timeout, read_timeout=read_timeout)
+
+    return _check_source(src, "MongoDBSource", uri)
+
+
+def _create_http_mirror_source(uri: str, options: Dict[str, str], connect_timeout: float, read_timeout: float,
+                               verify_certificate: bool) -> ConfigurationSourceBase:
+    from mojo.config.sources.httpmirrorsource import HttpMirrorSource
+
+    hedge_delay = options.get("hedge_delay", MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_HEDGE_DELAY)
+    if hedge_delay is not None:
+        hedge_delay = float(hedge_delay)
+
+    src = HttpMirrorSource.parse(uri, hedge_delay=hedge_delay, pool_size=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_POOL_SIZE,
+                                 preconnect=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_PRECONNECT,
+                                 cache=_get_http_response_cache(),
+                                 use_manifest=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_SOURCE_MANIFESTS,
+                                 manifest_ttl=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_SOURCE_MANIFEST_TTL,
+                                 connect_timeout=connect_timeout, read_timeout=read_timeout)
+
+    return _check_source(src, "HttpMirrorSource", uri)
+
+
+def _create_http_source(uri: str, options: Dict[str, str], connect_timeout: float, read_timeout: float,
+                        verify_certificate: bool) -> ConfigurationSourceBase:
+    from mojo.config.sources.httpsource import HttpSource
+
+    src = HttpSource.parse(uri, pool_size=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_POOL_SIZE,
+                           preconnect=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_HTTP_PRECONNECT,
+                           cache=_get_http_response_cache(),
+                           use_manifest=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_SOURCE_MANIFESTS,
+                           manifest_ttl=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_SOURCE_MANIFEST_TTL,
+                           connect_timeout=connect_timeout, read_timeout=read_timeout)
+
+    return _check_source(src, "HttpSource", uri)
+
+
+def _create_directory_source(uri: str, options: Dict[str, str], connect_timeout: float, read_timeout: float,
+                             verify_certificate: bool) -> ConfigurationSourceBase:
+    from mojo.config.sources.directorysource import DirectorySource
+
+    src = DirectorySource.parse(uri, use_manifest=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_SOURCE_MANIFESTS,
+                                use_index=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_DIRECTORY_INDEX,
+                                live_reload=MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LIVE_RELOAD)
+
+    return _check_source(src, "DirectorySource", uri)
+
+
+# The uri checks match the 'scheme' and 'secure_scheme' attributes of the source classes, they are repeated
+# here so the source modules and their dependencies are not imported until a source is created
+register_source_scheme(SourceScheme("couchdb", lambda uri: uri.startswith("couchdb"), _create_couchdb_source))
+register_source_scheme(SourceScheme("mongodb", lambda uri: uri.startswith("mongodb"), _create_mongodb_source))
+register_source_scheme(SourceScheme("httpmirror", _is_http_mirror_group, _create_http_mirror_source))
+register_source_scheme(SourceScheme("http", lambda uri: uri.startswith("http"), _create_http_source))
+
+DEFAULT_SOURCE_SCHEME = SourceScheme("dir", lambda uri: True, _create_directory_source)
@@ -11,8 +11,7 @@ from abc import abstractmethod, ABC
 
 import os
 
-import json
-import yaml
+from mojo.config.configurationparsers import dump_configuration_content, load_configuration_content
 
 
 class ConfigSynchronizerBase(ABC):
@@ -109,13 +108,13 @@ class ConfigSynchronizerBase(ABC):
         if os.path.exists(config_file_cand):
             config_file_found = config_file_cand
             with open(config_file_cand, 'r') as cf:
-                config_info = yaml.safe_load(cf)
+                config_info = load_configuration_content("yaml", cf)
                 config_format = "yaml"
         
         if config_file_found is not None:
             config_file_cand = os.path.join(local_store, config_class, f"{config_name}.json")
             with open(config_file_cand, 'r') as cf:
-                config_info = json.load(cf)
+                config_info = load_configuration_content("json", cf)
                 config_format = "json"
 
         return config_format, config_info
@@ -140,9 +139,9 @@ class ConfigSynchronizerBase(ABC):
         local_config_file = os.path.join(local_config_dir, f"{config_name}.{config_format}")
         with open(local_config_file, "w+") as cf:
             if config_format == "json":
-                json.dump(config_info, cf, indent=4)
+                dump_configuration_content("json", config_info, cf, indent=4)
             elif config_format == "yaml":
-                yaml.dump(config_info, cf, indent=4)
+                dump_configuration_content("yaml", config_info, cf, indent=4, safe=False)
             else:
                 errmsg = f"Unknown configuration format config_format={config_format}"
                 raise ValueError(errmsg)
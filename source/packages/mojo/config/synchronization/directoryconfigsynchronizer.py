@@ -6,11 +6,10 @@ __credits__ = []
 
 from typing import Tuple, Union
 
-import json
 import os
 import re
-import yaml
 
+from mojo.config.configurationparsers import dump_configuration_content, load_configuration_content
 from mojo.config.synchronization.configsynchronizerbase import ConfigSynchronizerBase
 
 class DirectoryConfigSynchronizer(ConfigSynchronizerBase):
@@ -37,13 +36,13 @@ class DirectoryConfigSynchronizer(ConfigSynchronizerBase):
             config_cand = os.path.join(storage_dir, f"{config_name}.json")
             if os.path.exists(config_cand):
                 with open(config_cand, 'r') as cf:
-                    config_info = json.load(cf)
+                    config_info = load_configuration_content("json", cf)
                     config_format = "json"
 
             config_cand = os.path.join(storage_dir, f"{config_name}.yaml")
             if os.path.exists(config_cand):
                 with open(config_cand, 'r') as cf:
-                    config_info = yaml.safe_load(cf)
+                    config_info = load_configuration_content("yaml", cf)
                     config_format = "yaml"
 
         return config_format, config_info
@@ -58,9 +57,9 @@ class DirectoryConfigSynchronizer(ConfigSynchronizerBase):
         dest_file = os.path.join(storage_dir, f"{config_name}.{config_format}")
         with open(dest_file, 'w+') as cf:
             if config_format == "json":
-                json.dump(config_info, cf, indent=4)
+                dump_configuration_content("json", config_info, cf, indent=4)
             elif config_format == "yaml":
-                yaml.dump(config_info, cf, indent=4)
+                dump_configuration_content("yaml", config_info, cf, indent=4, safe=False)
             else:
                 errmsg = f"Unknown configuration format config_format={config_format}"
                 raise ValueError(errmsg)
@@ -9,15 +9,14 @@ from typing import Dict, Tuple, Union
 import re
 
 import base64
-import json
 import io
-import yaml
 import requests
 
 from http import HTTPStatus
 
 from mojo.errors.exceptions import ConfigurationError, PublishError
 
+from mojo.config.configurationparsers import dump_configuration_content, load_configuration_content
 from mojo.config.synchronization.configsynchronizerbase import ConfigSynchronizerBase
 
 GITHUB_API_VERSION = "2022-11-28"
@@ -103,9 +102,9 @@ class GithubConfigSynchronizer(ConfigSynchronizerBase):
         # Step 3 - Post a blob of the commit to github
         commit_content_buffer = io.StringIO()
         if config_format == "yaml":
-            yaml.safe_dump(config_info, commit_content_buffer, indent=4)
+            dump_configuration_content("yaml", config_info, commit_content_buffer, indent=4)
         elif config_format == "json":
-            json.dump(config_info, commit_content_buffer, indent=4)
+            dump_configuration_content("json", config_info, commit_content_buffer, indent=4)
         else:
             errmsg = f"Error publishing config '{config_name}' due to unsupported format. config_format={config_format}"
             raise PublishError(errmsg)
@@ -207,7 +206,7 @@ class GithubConfigSynchronizer(ConfigSynchronizerBase):
         resp: requests.Response = requests.get(retrieve_url, headers=headers)
         if resp.status_code == HTTPStatus.OK:
             config_buffer = io.StringIO(resp.content)
-            config_info = yaml.safe_load(config_buffer)
+            config_info = load_configuration_content("yaml", config_buffer)
             config_format = "yaml"
 
         if config_info is None:
@@ -216,7 +215,7 @@ class GithubConfigSynchronizer(ConfigSynchronizerBase):
             resp: requests.Response = requests.get(retrieve_url, headers=headers)
             if resp.status_code == HTTPStatus.OK:
                 config_buffer = io.StringIO(resp.content)
-                config_info = json.load(config_buffer)
+                config_info = load_configuration_content("json", config_buffer)
                 config_format = "json"
 
         return config_format, config_info
@@ -0,0 +1,118 @@
+
+
+
+import unittest
+
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+from mojo.config.sources.couchdbsource import CouchDBSource
+from mojo.config.sources.mongodbsource import MongoDBSource
+
+
+class FakeCouchDatabase:
+
+    def __init__(self, update_seq):
+        self.update_seq = update_seq
+        self.changes_calls = []
+        self.watcher = None
+        return
+
+    def info(self):
+        return {"update_seq": self.update_seq}
+
+    def get(self, doc_id):
+        return {"_id": doc_id, "origin": "couchdb"}
+
+    def changes(self, **kwargs):
+        self.changes_calls.append(kwargs)
+        self.watcher.stop()
+        return {"results": [], "last_seq": "next-seq"}
+
+
+class FakeChangeStream:
+
+    alive = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeMongoCollection:
+
+    def __init__(self):
+        self.watch_calls = []
+        return
+
+    def watch(self, pipeline, **kwargs):
+        self.watch_calls.append(kwargs)
+        return FakeChangeStream()
+
+
+class TestChangeFeedStartPosition(unittest.TestCase):
+
+    def setUp(self):
+        self._live_reload = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LIVE_RELOAD
+        return
+
+    def tearDown(self):
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LIVE_RELOAD = self._live_reload
+        return
+
+    def test_couchdb_feed_starts_at_load_sequence(self):
+
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_LIVE_RELOAD = True
+
+        source = CouchDBSource("couchdb://http+somehost/configs", "http", "somehost", "configs", None)
+
+        fake_db = FakeCouchDatabase("42-loaded")
+        source._get_database = lambda credentials: fake_db
+
+        _, config_info = source.try_load_configuration("runtime", None)
+        assert config_info["origin"] == "couchdb", f"Unexpected config_info={config_info}"
+
+        # A change made after the load moves the update sequence on, the feed must still start at the load
+        fake_db.update_seq = "43-changed"
+
+        watcher = source.create_change_watcher(["runtime"], lambda *args: None)
+        fake_db.watcher = watcher
+        self.assertEqual(watcher.since, "42-loaded")
+
+        watcher.watch_changes()
+        self.assertEqual(fake_db.changes_calls[0]["since"], "42-loaded")
+        self.assertEqual(watcher.since, "next-seq")
+
+        return
+
+    def test_couchdb_feed_without_load_sequence_starts_now(self):
+
+        source = CouchDBSource("couchdb://http+somehost/configs", "http", "somehost", "configs", None)
+
+        watcher = source.create_change_watcher(["runtime"], lambda *args: None)
+        self.assertEqual(watcher.since, "now")
+
+        return
+
+    def test_mongodb_stream_starts_at_load_operation_time(self):
+
+        source = MongoDBSource("mongodb://somehost/configs/runtimes", "somehost", "configs", "runtimes")
+
+        source.record_change_position(["runtime"], "operation-time-1")
+        source.record_change_position(["other"], "operation-time-2")
+
+        fake_collection = FakeMongoCollection()
+        source.get_collection = lambda credentials: fake_collection
+
+        watcher = source.create_change_watcher(["runtime", "other"], lambda *args: None, credentials={})
+        self.assertEqual(watcher.start_at_operation_time, "operation-time-1", "The earliest load position should have been used.")
+
+        watcher.watch_changes()
+        self.assertEqual(fake_collection.watch_calls[0]["start_at_operation_time"], "operation-time-1")
+        self.assertNotIn("resume_after", fake_collection.watch_calls[0])
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+
+import os
+import unittest
+
+from mojo.config.sources.clientregistry import ClientRegistry, credential_fingerprint
+
+
+class TestClientRegistry(unittest.TestCase):
+
+    def test_client_reuse_and_close(self):
+
+        registry = ClientRegistry()
+        closed = []
+
+        first = registry.get_client(("db", "host"), lambda: object(), closer=closed.append)
+        second = registry.get_client(("db", "host"), lambda: object(), closer=closed.append)
+        other = registry.get_client(("db", "other"), lambda: object(), closer=closed.append)
+
+        assert first is second, "The client for the same key should have been re-used."
+        assert first is not other, "A different key should have created a different client."
+
+        registry.close_all()
+        assert len(closed) == 2, "Both registered clients should have been closed."
+
+        third = registry.get_client(("db", "host"), lambda: object())
+        assert third is not first, "A new client should have been created after closing the registry."
+
+        return
+
+    def test_reset_after_fork(self):
+
+        registry = ClientRegistry()
+        closed = []
+
+        first = registry.get_client(("db", "host"), lambda: object(), closer=closed.append)
+
+        # Simulate being in a forked child process
+        registry._pid = os.getpid() + 1
+
+        second = registry.get_client(("db", "host"), lambda: object(), closer=closed.append)
+        assert first is not second, "The child process should not have re-used the inherited client."
+        assert len(closed) == 0, "The inherited client should not have been closed by the child."
+
+        return
+
+    def test_credential_fingerprint(self):
+
+        assert credential_fingerprint(None, None) is None
+        assert credential_fingerprint("user", "secret") == credential_fingerprint("user", "secret")
+        assert credential_fingerprint("user", "secret") != credential_fingerprint("user", "other")
+        assert "secret" not in credential_fingerprint("user", "secret")
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+
+
+
+import gc
+import random
+import unittest
+import weakref
+
+from collections.abc import Mapping
+
+from mojo.collections.mergemap import MergeMap
+
+from mojo.config.compiledmaps import CompiledConfigurationView, compile_configuration_map, format_path
+
+
+def lookup_through_map(config_map, pkey):
+    value = config_map
+    for key in pkey:
+        value = value[key]
+    return value
+
+
+def map_paths(node, prefix=()):
+    paths = set()
+    for key in node.keys():
+        pkey = prefix + (key,)
+        paths.add(pkey)
+        value = node[key]
+        if isinstance(value, Mapping):
+            paths.update(map_paths(value, pkey))
+    return paths
+
+
+def random_layer(rand: random.Random, depth: int = 0):
+    layer = {}
+    for _ in range(rand.randint(1, 4)):
+        key = rand.choice(["a", "b", "c", "d"])
+        if depth < 3 and rand.random() < 0.5:
+            layer[key] = random_layer(rand, depth + 1)
+        else:
+            layer[key] = rand.randint(0, 9)
+    return layer
+
+
+class TestCompiledConfigurationView(unittest.TestCase):
+
+    def test_lookup_by_path(self):
+
+        config_map = MergeMap({
+            "logging": {
+                "levels": {
+                    "console": "INFO",
+                    "logfile": "DEBUG"
+                }
+            }
+        })
+        view = CompiledConfigurationView(config_map)
+
+        self.assertEqual(view["logging.levels.console"], "INFO")
+
+        config_map.maps.insert(0, { "logging": { "levels": { "console": "WARNING" } } })
+
+        self.assertEqual(view["logging.levels.console"], "WARNING")
+        self.assertEqual(view["logging.levels.logfile"], "DEBUG")
+        self.assertEqual(view["logging.levels"], {"console": "WARNING", "logfile": "DEBUG"})
+        self.assertNotIn("logging.levels.syslog", view)
+
+        with self.assertRaises(TypeError):
+            view["logging.levels"]["console"] = "ERROR"
+
+        return
+
+    def test_incremental_updates_match_full_merge(self):
+
+        # The view is checked against lookups through the map itself, key by key
+        rand = random.Random(24)
+
+        config_map = MergeMap()
+        view = compile_configuration_map(config_map)
+        self.assertIs(compile_configuration_map(config_map), view)
+
+        for _ in range(200):
+            operation = rand.random()
+            if operation < 0.5 or len(config_map.maps) < 2:
+                config_map.maps.insert(0, random_layer(rand))
+            elif operation < 0.8:
+                config_map.maps[rand.randrange(len(config_map.maps))] = random_layer(rand)
+            else:
+                del config_map.maps[rand.randrange(len(config_map.maps))]
+
+            expected_paths = map_paths(config_map)
+            self.assertEqual(set(view.paths()), { format_path(*pkey) for pkey in expected_paths })
+
+            for pkey in expected_paths:
+                self.assertEqual(view[format_path(*pkey)], lookup_through_map(config_map, pkey), msg=f"Mismatch for path={pkey}")
+
+        return
+
+    def test_keys_with_separators_do_not_collide(self):
+
+        config_map = MergeMap({
+            "hosts": {
+                "example.com": {"port": 443},
+                "example": {"com": {"port": 80}},
+                "back\\slash": 1
+            }
+        })
+        view = CompiledConfigurationView(config_map)
+
+        self.assertEqual(view["hosts.example\\.com.port"], 443)
+        self.assertEqual(view["hosts.example.com.port"], 80)
+        self.assertEqual(view[format_path("hosts", "back\\slash")], 1)
+        self.assertEqual(len(view.paths()), len(set(view.paths())))
+
+        return
+
+    def test_compiled_views_are_not_kept_alive(self):
+
+        config_map = MergeMap({"name": "runtime"})
+
+        view = compile_configuration_map(config_map)
+        view_ref = weakref.ref(view)
+        del view
+        gc.collect()
+
+        self.assertIsNone(view_ref(), msg="A view that is no longer used should not be kept by the table.")
+
+        return
+
+    def test_invalidate_picks_up_changes_inside_a_layer(self):
+
+        layer = {"name": "runtime"}
+        view = CompiledConfigurationView(MergeMap(layer))
+        self.assertEqual(view.get("name"), "runtime")
+
+        layer["name"] = "changed"
+        view.invalidate()
+
+        self.assertEqual(view.get("name"), "changed")
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,30 @@
 
 
 import json
+import os
+import tempfile
 import unittest
 
+import yaml
 
+from cryptography.fernet import Fernet
+
+from mojo.config.configurationloader import ConfigurationLoader
 from mojo.config.cryptography import (
+    ConfigurationKey,
+    DERIVED_KEY_TABLE,
     create_encrypted_configuration,
+    create_encrypted_configuration_with_keyphrase,
+    create_kdf_info,
     decrypt_content,
-    generate_fernet_key
+    derive_fernet_key,
+    encrypt_content_chunks,
+    generate_fernet_key,
+    open_decrypted_content
 )
 
+from mojo.errors.exceptions import ConfigurationError
+
 CREDENTIAL_CONTENT = """
 credentials:
     -   identifier: adminuser
@@ -47,5 +62,132 @@ class TestConfigurationEncryption(unittest.TestCase):
 
         return
 
+    def test_kdf_encrypted_configuration(self):
+
+        econf_info = create_encrypted_configuration_with_keyphrase("BlahBlah!!", CREDENTIAL_CONTENT, format="yaml")
+
+        self.assertEqual(econf_info["version"], "1.1")
+        self.assertEqual(econf_info["kdf"]["name"], "scrypt")
+
+        key = ConfigurationKey(keyphrase="BlahBlah!!").get_key(econf_info)
+        plain_content = decrypt_content(key, econf_info["encrypted_content"])
+        self.assertEqual(plain_content, CREDENTIAL_CONTENT)
+
+        other_info = create_encrypted_configuration_with_keyphrase("BlahBlah!!", CREDENTIAL_CONTENT)
+        self.assertNotEqual(econf_info["kdf"]["salt"], other_info["kdf"]["salt"], msg="Each document should get its own salt.")
+
+        return
+
+    def test_derived_keys_are_memoized(self):
+
+        kdf_info = create_kdf_info("pbkdf2-sha256")
+        kdf_info["iterations"] = 1000
+
+        first_key = derive_fernet_key("BlahBlah!!", kdf_info)
+        second_key = derive_fernet_key("BlahBlah!!", kdf_info)
+        self.assertIs(first_key, second_key)
+
+        other_key = derive_fernet_key("Other!!", kdf_info)
+        self.assertNotEqual(first_key, other_key)
+
+        for memo_key in DERIVED_KEY_TABLE:
+            self.assertNotIn("BlahBlah!!", repr(memo_key), msg="The keyphrase should not be kept in the memo table.")
+
+        return
+
+    def test_kdf_parameters_are_limited(self):
+
+        kdf_info = create_kdf_info("scrypt")
+        kdf_info["n"] = 2 ** 30
+        with self.assertRaises(ConfigurationError):
+            derive_fernet_key("BlahBlah!!", kdf_info)
+
+        kdf_info = create_kdf_info("scrypt")
+        kdf_info["n"] = 3
+        with self.assertRaises(ConfigurationError):
+            derive_fernet_key("BlahBlah!!", kdf_info)
+
+        kdf_info = create_kdf_info("pbkdf2-sha256")
+        kdf_info["iterations"] = 10 ** 12
+        with self.assertRaises(ConfigurationError):
+            derive_fernet_key("BlahBlah!!", kdf_info)
+
+        kdf_info["iterations"] = "1000"
+        with self.assertRaises(ConfigurationError):
+            derive_fernet_key("BlahBlah!!", kdf_info)
+
+        return
+
+    def test_legacy_documents_still_load(self):
+
+        legacy_info = create_encrypted_configuration(generate_fernet_key("BlahBlah!!"), CREDENTIAL_CONTENT, format="yaml")
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            legacy_file = os.path.join(tempdir, "legacy.yaml")
+            with open(legacy_file, 'w') as lf:
+                yaml.safe_dump(legacy_info, lf)
+
+            kdf_info = create_encrypted_configuration_with_keyphrase("BlahBlah!!", CREDENTIAL_CONTENT, format="yaml")
+            kdf_file = os.path.join(tempdir, "kdf.yaml")
+            with open(kdf_file, 'w') as kf:
+                yaml.safe_dump(kdf_info, kf)
+
+            loader = ConfigurationLoader([])
+
+            legacy_config = loader.load_configuration_from_file(legacy_file, keyphrase="BlahBlah!!")
+            kdf_config = loader.load_configuration_from_file(kdf_file, keyphrase="BlahBlah!!")
+
+        self.assertEqual(legacy_config, kdf_config)
+        self.assertEqual(kdf_config["credentials"][0]["identifier"], "adminuser")
+
+        return
+
+    def test_chunked_encrypted_configuration(self):
+
+        key = generate_fernet_key("BlahBlah!!")
+
+        econf_info = create_encrypted_configuration(key, CREDENTIAL_CONTENT, format="yaml", version="2.0", chunk_size=64)
+        self.assertEqual(econf_info["version"], "2.0")
+        self.assertGreater(len(econf_info["encrypted_content"]), 1)
+
+        with open_decrypted_content(key, econf_info) as plain_stream:
+            self.assertEqual(plain_stream.read().decode("utf-8"), CREDENTIAL_CONTENT)
+
+        self.assertEqual(decrypt_content(key, econf_info["encrypted_content"]), CREDENTIAL_CONTENT)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            chunked_file = os.path.join(tempdir, "chunked.yaml")
+            with open(chunked_file, 'w') as cf:
+                yaml.safe_dump(econf_info, cf)
+
+            loader = ConfigurationLoader([])
+            config = loader.load_configuration_from_file(chunked_file, keyphrase="BlahBlah!!")
+
+        self.assertEqual(config, yaml.safe_load(CREDENTIAL_CONTENT))
+
+        return
+
+    def test_chunked_content_tampering_is_detected(self):
+
+        key = generate_fernet_key("BlahBlah!!")
+
+        chunks = encrypt_content_chunks(key, CREDENTIAL_CONTENT, chunk_size=64)
+        other_chunks = encrypt_content_chunks(key, CREDENTIAL_CONTENT, chunk_size=64)
+
+        tampered = {
+            "truncated": chunks[:-1],
+            "reordered": [chunks[1], chunks[0]] + chunks[2:],
+            "mixed": [chunks[0], other_chunks[1]] + chunks[2:],
+            "extended": chunks + [chunks[-1]],
+            "headerless": [Fernet(key).encrypt(b"short").decode("utf-8")]
+        }
+
+        for name, tampered_chunks in tampered.items():
+            with self.assertRaises(ConfigurationError, msg=f"The {name} content should be rejected."):
+                decrypt_content(key, tampered_chunks)
+
+        return
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,217 @@
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+import yaml
+
+from mojo.errors.exceptions import ConfigurationError
+
+from mojo.config.configurationloader import ConfigurationLoader
+from mojo.config.cryptography import create_encrypted_configuration_with_keyphrase
+from mojo.config.deadline import Deadline
+from mojo.config.resolutionmemo import ResolutionMemo
+from mojo.config.sources.directorysource import DirectorySource
+
+
+class BatchDirectorySource(DirectorySource):
+
+    supports_batch_load = True
+
+    def __init__(self, uri: str, directory: str):
+        super().__init__(uri, directory)
+        self.batches = []
+        return
+
+    def try_load_configurations(self, config_names, credentials=None, deadline=None):
+        self.batches.append(list(config_names))
+        return super().try_load_configurations(config_names, credentials, deadline=deadline)
+
+
+class TestConfigurationLoader(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+
+        self._high_dir = os.path.join(self._tempdir.name, "high")
+        self._low_dir = os.path.join(self._tempdir.name, "low")
+        os.makedirs(self._high_dir)
+        os.makedirs(self._low_dir)
+
+        self._write_config(self._high_dir, "shared", {"origin": "high"})
+        self._write_config(self._low_dir, "shared", {"origin": "low"})
+        self._write_config(self._low_dir, "lowonly", {"origin": "low"})
+        return
+
+    def tearDown(self):
+        self._tempdir.cleanup()
+        return
+
+    def _write_config(self, directory: str, name: str, content: dict):
+        with open(os.path.join(directory, f"{name}.yaml"), 'w') as cf:
+            yaml.safe_dump(content, cf)
+        return
+
+    def test_load_by_name_first_source_wins(self):
+
+        loader = ConfigurationLoader([self._high_dir, self._low_dir])
+
+        config_uri, config_info = loader.load_configuration_by_name("shared")
+
+        assert config_uri == f"{self._high_dir}/shared", f"Unexpected config_uri={config_uri}"
+        assert config_info["origin"] == "high", "The highest priority source should have won."
+
+        return
+
+    def test_load_by_name_concurrent_first_source_wins(self):
+
+        loader = ConfigurationLoader([self._high_dir, self._low_dir], concurrent=True, max_workers=2)
+
+        config_uri, config_info = loader.load_configuration_by_name("shared")
+        assert config_info["origin"] == "high", "The highest priority source should have won."
+
+        config_uri, config_info = loader.load_configuration_by_name("lowonly")
+        assert config_uri == f"{self._low_dir}/lowonly", f"Unexpected config_uri={config_uri}"
+
+        return
+
+    def test_load_by_names_preserves_order(self):
+
+        loader = ConfigurationLoader([self._high_dir, self._low_dir])
+
+        config_list = loader.load_configurations_by_names(["lowonly", "shared"])
+
+        expected_uris = [f"{self._low_dir}/lowonly", f"{self._high_dir}/shared"]
+        config_uris = [config_uri for config_uri, _ in config_list]
+        assert config_uris == expected_uris, f"Unexpected config uris={config_uris}"
+
+        return
+
+    def test_load_by_names_keeps_repeated_names(self):
+
+        loader = ConfigurationLoader([self._high_dir, self._low_dir])
+
+        config_list = loader.load_configurations_by_names(["shared", "lowonly", "shared"])
+
+        expected_uris = [f"{self._high_dir}/shared", f"{self._low_dir}/lowonly", f"{self._high_dir}/shared"]
+        config_uris = [config_uri for config_uri, _ in config_list]
+        assert config_uris == expected_uris, f"Unexpected config uris={config_uris}"
+
+        # The batched lookup should produce the same entries as loading the names one at a time
+        loader.sources[0] = BatchDirectorySource(self._high_dir, self._high_dir)
+
+        config_list = loader.load_configurations_by_names(["shared", "lowonly", "shared"])
+
+        config_uris = [config_uri for config_uri, _ in config_list]
+        assert config_uris == expected_uris, f"Unexpected batched config uris={config_uris}"
+
+        return
+
+    def test_load_by_names_batched(self):
+
+        loader = ConfigurationLoader([self._high_dir, self._low_dir])
+
+        high_src = BatchDirectorySource(self._high_dir, self._high_dir)
+        loader.sources[0] = high_src
+
+        config_list = loader.load_configurations_by_names(["lowonly", "shared"])
+
+        expected_uris = [f"{self._low_dir}/lowonly", f"{self._high_dir}/shared"]
+        config_uris = [config_uri for config_uri, _ in config_list]
+        assert config_uris == expected_uris, f"Unexpected config uris={config_uris}"
+        assert config_list[1][1]["origin"] == "high", "The highest priority source should have won."
+        assert high_src.batches == [["lowonly", "shared"]], f"Expected a single batch lookup, batches={high_src.batches}"
+
+        with self.assertRaises(ConfigurationError):
+            loader.load_configurations_by_names(["shared", "missing"])
+
+        return
+
+    def test_aload_by_name_first_source_wins(self):
+
+        loader = ConfigurationLoader([self._high_dir, self._low_dir])
+
+        config_uri, config_info = asyncio.run(loader.aload_configuration_by_name("shared"))
+        assert config_info["origin"] == "high", "The highest priority source should have won."
+
+        config_list = asyncio.run(loader.aload_configurations_by_names(["shared", "lowonly"]))
+        expected_uris = [f"{self._high_dir}/shared", f"{self._low_dir}/lowonly"]
+        config_uris = [config_uri for config_uri, _ in config_list]
+        assert config_uris == expected_uris, f"Unexpected config uris={config_uris}"
+
+        return
+
+    def test_aload_encrypted_configuration(self):
+
+        econf_info = create_encrypted_configuration_with_keyphrase("BlahBlah!!", '{"origin": "encrypted"}', format="json",
+                                                                  kdf="pbkdf2-sha256")
+        with open(os.path.join(self._high_dir, "secured.json"), 'w') as cf:
+            json.dump(econf_info, cf)
+
+        loader = ConfigurationLoader([self._high_dir, self._low_dir])
+
+        config_uri, config_info = asyncio.run(loader.aload_configuration_by_name("secured", keyphrase="BlahBlah!!"))
+        assert config_uri == f"{self._high_dir}/secured", f"Unexpected config_uri={config_uri}"
+        assert config_info == {"origin": "encrypted"}, f"Unexpected config_info={config_info}"
+
+        return
+
+    def test_load_by_name_expired_deadline(self):
+
+        loader = ConfigurationLoader([self._high_dir, self._low_dir])
+
+        with self.assertRaises(ConfigurationError) as xcpt:
+            loader.load_configuration_by_name("missing", deadline=Deadline(0))
+
+        assert "deadline" in str(xcpt.exception), f"The error should report the deadline expired, error={xcpt.exception}"
+
+        return
+
+    def test_bad_source_option_is_reported(self):
+
+        for option in ["read_timeout", "ttl", "hedge_delay"]:
+            with self.assertRaises(ConfigurationError) as xcpt:
+                ConfigurationLoader([f"https://somehost.com/configs#{option}=soon"])
+
+            assert option in str(xcpt.exception), f"The error should name the option, error={xcpt.exception}"
+
+        return
+
+    def test_sources_are_shared_between_loaders(self):
+
+        first_loader = ConfigurationLoader([self._high_dir, self._low_dir])
+        second_loader = ConfigurationLoader([self._low_dir + "/", self._high_dir])
+
+        self.assertIs(first_loader.sources[0], second_loader.sources[1])
+        self.assertIs(first_loader.sources[1], second_loader.sources[0])
+
+        return
+
+    def test_loads_are_shared_within_a_resolution(self):
+
+        memo = ResolutionMemo()
+
+        first_loader = ConfigurationLoader([self._high_dir, self._low_dir], memo=memo)
+        second_loader = ConfigurationLoader([self._low_dir], memo=memo)
+
+        batch_src = BatchDirectorySource(self._low_dir, self._low_dir)
+        first_loader.sources[1] = batch_src
+        second_loader.sources[0] = batch_src
+
+        first_table = dict(first_loader.load_configurations_by_names(["shared", "lowonly"]))
+        second_table = dict(second_loader.load_configurations_by_names(["lowonly", "shared"]))
+
+        lowonly_uri = f"{self._low_dir}/lowonly"
+        self.assertIs(first_table[lowonly_uri], second_table[lowonly_uri])
+        self.assertEqual(batch_src.batches, [["lowonly"], ["shared"]], msg="Each name should only be fetched once.")
+
+        config_file = os.path.join(self._low_dir, "shared.yaml")
+        self.assertIs(first_loader.load_configuration_from_file(config_file), second_loader.load_configuration_from_file(config_file))
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,270 @@
+
+import os
+import tempfile
+import threading
+import unittest
+
+from collections import OrderedDict
+
+import yaml
+
+from mojo.config import configurationmaps
+from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.configurationloader import ConfigurationLoader
+from mojo.config.configurationvariables import CONFIGURATION_MAPS
+from mojo.config.sources.changewatcher import ConfigurationChangeWatcher
+from mojo.config.sources.directorysource import DirectorySource
+from mojo.config.sources.filewatcher import FileChangeWatcher
+
+
+class OneShotChangeWatcher(ConfigurationChangeWatcher):
+
+    def watch_changes(self):
+        for cname in self.config_names:
+            self.notify_change(cname, ConfigurationFormat.JSON, {"origin": "changed"})
+        self._stop_event.set()
+        return
+
+
+class WatchedDirectorySource(DirectorySource):
+
+    supports_change_feed = True
+
+    def create_change_watcher(self, config_names, on_change, credentials=None):
+        watcher = OneShotChangeWatcher(self.uri, config_names, on_change)
+        return watcher
+
+
+class TestConfigurationReload(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+
+        with open(os.path.join(self._tempdir.name, "watched.yaml"), 'w') as cf:
+            yaml.safe_dump({"origin": "original"}, cf)
+
+        return
+
+    def tearDown(self):
+        self._tempdir.cleanup()
+        return
+
+    def test_watch_configurations(self):
+
+        loader = ConfigurationLoader([self._tempdir.name])
+        loader.sources[0] = WatchedDirectorySource(self._tempdir.name, self._tempdir.name)
+
+        config_list = loader.load_configurations_by_names(["watched"])
+
+        changes = []
+        changed = threading.Event()
+
+        def on_change(config_uri, config_info):
+            changes.append((config_uri, config_info))
+            changed.set()
+            return
+
+        watchers = loader.watch_configurations([config_uri for config_uri, _ in config_list], on_change)
+        assert len(watchers) == 1, "A watcher should have been started for the source with a change feed."
+
+        assert changed.wait(5), "The change callback should have been called."
+        for watcher in watchers:
+            watcher.stop()
+
+        assert changes == [(f"{self._tempdir.name}/watched", {"origin": "changed"})], f"Unexpected changes={changes}"
+
+        return
+
+    def _check_file_watcher(self, use_inotify: bool):
+
+        config_file = os.path.join(self._tempdir.name, "watched.yaml")
+
+        changes = []
+        changed = threading.Event()
+
+        def load_file(filename):
+            with open(filename, 'r') as cf:
+                return ConfigurationFormat.YAML, yaml.safe_load(cf)
+
+        def on_change(name, config_format, config_info):
+            changes.append((name, config_info))
+            changed.set()
+            return
+
+        watcher = FileChangeWatcher(self._tempdir.name, {"watched": config_file}, load_file, on_change,
+                                    debounce=0.05, poll_interval=0.05, use_inotify=use_inotify)
+        watcher.start()
+        try:
+            # Deploy the new version with an atomic rename like most deployment tools do
+            staged_file = os.path.join(self._tempdir.name, ".watched.yaml.tmp")
+            with open(staged_file, 'w') as cf:
+                yaml.safe_dump({"origin": "renamed"}, cf)
+            os.replace(staged_file, config_file)
+
+            assert changed.wait(5), "The change callback should have been called."
+        finally:
+            watcher.stop()
+
+        assert changes == [("watched", {"origin": "renamed"})], f"Unexpected changes={changes}"
+
+        return
+
+    def test_file_watcher_inotify(self):
+        self._check_file_watcher(use_inotify=True)
+        return
+
+    def test_file_watcher_polling(self):
+        self._check_file_watcher(use_inotify=False)
+        return
+
+    def test_file_watcher_symlink_swap(self):
+
+        # Lay the files out the way a Kubernetes ConfigMap volume does
+        first_dir = os.path.join(self._tempdir.name, "..first")
+        second_dir = os.path.join(self._tempdir.name, "..second")
+        os.makedirs(first_dir)
+        os.makedirs(second_dir)
+
+        with open(os.path.join(first_dir, "app.yaml"), 'w') as cf:
+            yaml.safe_dump({"origin": "first"}, cf)
+        with open(os.path.join(second_dir, "app.yaml"), 'w') as cf:
+            yaml.safe_dump({"origin": "second"}, cf)
+
+        data_link = os.path.join(self._tempdir.name, "..data")
+        os.symlink("..first", data_link)
+
+        config_file = os.path.join(self._tempdir.name, "app.yaml")
+        os.symlink(os.path.join("..data", "app.yaml"), config_file)
+
+        changes = []
+        changed = threading.Event()
+
+        def load_file(filename):
+            with open(filename, 'r') as cf:
+                return ConfigurationFormat.YAML, yaml.safe_load(cf)
+
+        def on_change(name, config_format, config_info):
+            changes.append((name, config_info))
+            changed.set()
+            return
+
+        watcher = FileChangeWatcher(self._tempdir.name, {"app": config_file}, load_file, on_change, debounce=0.05)
+        watcher.start()
+        try:
+            staged_link = os.path.join(self._tempdir.name, "..data_tmp")
+            os.symlink("..second", staged_link)
+            os.replace(staged_link, data_link)
+
+            assert changed.wait(5), "The change callback should have been called."
+        finally:
+            watcher.stop()
+
+        assert changes == [("app", {"origin": "second"})], f"Unexpected changes={changes}"
+
+        return
+
+    def test_file_watcher_falls_back_to_polling(self):
+
+        # The directory does not exist yet, so inotify cannot watch it and the watcher has to poll
+        config_dir = os.path.join(self._tempdir.name, "later")
+        config_file = os.path.join(config_dir, "app.yaml")
+
+        changed = threading.Event()
+
+        def load_file(filename):
+            with open(filename, 'r') as cf:
+                return ConfigurationFormat.YAML, yaml.safe_load(cf)
+
+        watcher = FileChangeWatcher(self._tempdir.name, {"app": config_file}, load_file,
+                                    lambda name, config_format, config_info: changed.set(), poll_interval=0.05)
+        watcher.start()
+        try:
+            os.makedirs(config_dir)
+            with open(config_file, 'w') as cf:
+                yaml.safe_dump({"origin": "created"}, cf)
+
+            assert changed.wait(5), "The change callback should have been called by the polling fallback."
+        finally:
+            watcher.stop()
+
+        return
+
+    def test_file_watcher_debounce_is_capped(self):
+
+        config_file = os.path.join(self._tempdir.name, "watched.yaml")
+        noisy_file = os.path.join(self._tempdir.name, "noisy.log")
+
+        changed = threading.Event()
+        noisy_done = threading.Event()
+
+        def load_file(filename):
+            with open(filename, 'r') as cf:
+                return ConfigurationFormat.YAML, yaml.safe_load(cf)
+
+        def make_noise():
+            # Keep the directory busy for longer than the watcher is allowed to wait
+            while not noisy_done.wait(0.01):
+                with open(noisy_file, 'a') as nf:
+                    nf.write("x")
+            return
+
+        watcher = FileChangeWatcher(self._tempdir.name, {"watched": config_file}, load_file,
+                                    lambda name, config_format, config_info: changed.set(), debounce=0.1, max_debounce=0.3)
+        noisy_thread = threading.Thread(target=make_noise, daemon=True)
+        watcher.start()
+        noisy_thread.start()
+        try:
+            with open(config_file, 'w') as cf:
+                yaml.safe_dump({"origin": "changed"}, cf)
+
+            assert changed.wait(3), "The change should have been seen while the directory was still busy."
+        finally:
+            noisy_done.set()
+            noisy_thread.join()
+            watcher.stop()
+
+        return
+
+    def test_directory_source_watches_only_with_live_reload(self):
+
+        source = DirectorySource.parse(self._tempdir.name)
+        assert not source.supports_change_feed, "A directory source should only be watched when live reload is enabled."
+
+        source = DirectorySource.parse(self._tempdir.name, live_reload=True)
+        assert source.supports_change_feed, "A directory source should be watched when live reload is enabled."
+
+        return
+
+    def test_replace_configuration_layer(self):
+
+        config_uri = f"{self._tempdir.name}/watched"
+        original = {"reload_test_key": "original"}
+        other = {"reload_test_other": "other"}
+
+        config_map = CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP
+        saved_table = configurationmaps.RUNTIME_TABLE
+        saved_layers = list(config_map.maps)
+
+        try:
+            configurationmaps.RUNTIME_TABLE = OrderedDict([(config_uri, original)])
+            config_map.maps.insert(0, original)
+            config_map.maps.insert(0, other)
+
+            replaced = configurationmaps.replace_configuration_layer(config_uri, {"reload_test_key": "changed"})
+
+            assert replaced, "The layer should have been replaced."
+            assert config_map["reload_test_key"] == "changed", "The map should have returned the changed value."
+            assert config_map.maps[0] is other, "The layer order should have been preserved."
+
+            replaced = configurationmaps.replace_configuration_layer("missing/uri", {})
+            assert not replaced, "An unknown uri should not have replaced a layer."
+
+        finally:
+            configurationmaps.RUNTIME_TABLE = saved_table
+            config_map.maps[:] = saved_layers
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
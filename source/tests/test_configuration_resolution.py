@@ -0,0 +1,74 @@
+
+
+import time
+import unittest
+
+from collections import OrderedDict
+from unittest import mock
+
+from mojo.errors.exceptions import ConfigurationError
+
+from mojo.config import configurationmaps
+
+
+class TestConcurrentCategoryResolution(unittest.TestCase):
+
+    def _create_categories(self, applied, delays):
+
+        categories = []
+        for category, delay in delays.items():
+            def prepare_category(category=category, delay=delay):
+                return [category], delay, None
+
+            def apply_category(ctx, config_table, file_layers, category=category):
+                applied.append((category, config_table))
+                return
+
+            categories.append((category, prepare_category, apply_category))
+
+        return categories
+
+    @staticmethod
+    def _load_configuration_layers(source_uris, config_names, config_files, keyphrase, credentials, deadline, memo=None):
+        time.sleep(config_names)
+        if source_uris[0] == "landscape" and keyphrase == "fail":
+            raise ConfigurationError("Unable to load the landscape configuration.")
+        return [(source_uris[0], {})], []
+
+    def test_categories_resolve_concurrently_and_apply_in_order(self):
+
+        applied = []
+        delays = OrderedDict([("credentials", 0.3), ("landscape", 0.1), ("runtime", 0.2), ("topology", 0.3)])
+        categories = self._create_categories(applied, delays)
+
+        with mock.patch.object(configurationmaps, "_load_configuration_layers", self._load_configuration_layers):
+            start = time.monotonic()
+            configurationmaps._resolve_categories_concurrently(None, categories, None, None, None)
+            elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.8, msg="The categories should have been resolved concurrently.")
+        self.assertEqual([category for category, _ in applied], list(delays.keys()))
+
+        return
+
+    def test_failed_category_is_reported(self):
+
+        applied = []
+        delays = OrderedDict([("credentials", 0.0), ("landscape", 0.0), ("runtime", 0.0)])
+        categories = self._create_categories(applied, delays)
+
+        with mock.patch.object(configurationmaps, "_load_configuration_layers", self._load_configuration_layers):
+            with self.assertRaises(ConfigurationError) as cm:
+                configurationmaps._resolve_categories_concurrently(None, categories, "fail", None, None)
+
+        self.assertEqual(str(cm.exception), "Unable to load the landscape configuration.")
+        if hasattr(cm.exception, "__notes__"):
+            self.assertIn("'landscape'", cm.exception.__notes__[0])
+
+        self.assertEqual([category for category, _ in applied], ["credentials"])
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,8 @@
 import unittest
 
 from mojo.config.normalize import (
-    split_and_normalize_source_list
+    split_and_normalize_source_list,
+    split_source_uri_options
 )
 
 class TestConfigurationEncryption(unittest.TestCase):
@@ -21,5 +22,19 @@ class TestConfigurationEncryption(unittest.TestCase):
         self.assert_(len(paths) == 2, "The length of the paths found should have been 1.")
         return
 
+    def test_split_source_uri_options(self):
+        source_uri, options = split_source_uri_options("https://somehost.com/configs#connect_timeout=2&read_timeout=10")
+
+        assert source_uri == "https://somehost.com/configs", f"Unexpected source_uri={source_uri}"
+        assert options == {"connect_timeout": "2", "read_timeout": "10"}, f"Unexpected options={options}"
+        return
+
+    def test_split_source_uri_options_directory(self):
+        source_uri, options = split_source_uri_options("/home/user/configs#2")
+
+        assert source_uri == "/home/user/configs#2", f"Unexpected source_uri={source_uri}"
+        assert options == {}, f"Unexpected options={options}"
+        return
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,111 @@
+
+import io
+import json
+import math
+import unittest
+
+from mojo.errors.exceptions import ConfigurationError
+
+from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.configurationparsers import (
+    dump_configuration_content,
+    get_parser_backend,
+    load_configuration_content,
+    reset_parser_backend_selection
+)
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+
+
+class TestConfigurationParsers(unittest.TestCase):
+
+    def setUp(self):
+        self._yaml_parser = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_YAML_PARSER
+        self._json_parser = MOJO_CONFIG_DEFAULTS.MJR_CONFIG_JSON_PARSER
+        return
+
+    def tearDown(self):
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_YAML_PARSER = self._yaml_parser
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_JSON_PARSER = self._json_parser
+        reset_parser_backend_selection()
+        return
+
+    def _check_round_trip(self):
+
+        config_info = {"name": "alpha", "values": [1, 2, 3], "nested": {"enabled": True}}
+
+        for config_format in [ConfigurationFormat.YAML, ConfigurationFormat.JSON]:
+            content = dump_configuration_content(config_format, config_info)
+            assert load_configuration_content(config_format, content) == config_info, \
+                f"The {config_format.value} content should have round tripped."
+            assert load_configuration_content(config_format, content.encode("utf-8")) == config_info, \
+                f"The {config_format.value} bytes content should have been parsed."
+
+            stream = io.StringIO()
+            dump_configuration_content(config_format, config_info, stream)
+            stream.seek(0)
+            assert load_configuration_content(config_format, stream) == config_info, \
+                f"The {config_format.value} stream content should have been parsed."
+
+        return
+
+    def test_auto_selected_backends(self):
+        reset_parser_backend_selection()
+        self._check_round_trip()
+        return
+
+    def test_fallback_backends(self):
+
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_YAML_PARSER = "pyyaml"
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_JSON_PARSER = "json"
+        reset_parser_backend_selection()
+
+        assert get_parser_backend(ConfigurationFormat.YAML).name == "pyyaml"
+        assert get_parser_backend("json").name == "json"
+
+        self._check_round_trip()
+
+        return
+
+    def test_json_backends_keep_large_numbers(self):
+
+        for backend_name in ["orjson", "msgspec", "json"]:
+            MOJO_CONFIG_DEFAULTS.MJR_CONFIG_JSON_PARSER = backend_name
+            reset_parser_backend_selection()
+
+            try:
+                get_parser_backend(ConfigurationFormat.JSON)
+            except ConfigurationError:
+                # The backend is not installed
+                continue
+
+            config_info = load_configuration_content("json", '{"big": 123456789012345678901234567890, "ratio": NaN}')
+            assert config_info["big"] == 123456789012345678901234567890, f"The {backend_name} backend lost the large integer."
+            assert math.isnan(config_info["ratio"]), f"The {backend_name} backend should have parsed NaN."
+
+            # Both signs just inside and just outside of the 64 bit limits
+            for value in [-2 ** 63, -2 ** 63 - 1, -9999999999999999999, 2 ** 64 - 1, 2 ** 64]:
+                config_info = load_configuration_content("json", f'{{"value": {value}}}')
+                assert config_info["value"] == value and isinstance(config_info["value"], int), \
+                    f"The {backend_name} backend changed value={value} to {config_info['value']!r}."
+
+                content = dump_configuration_content("json", {"value": value}, indent=None)
+                assert json.loads(content) == {"value": value}, f"Unexpected {backend_name} content={content}"
+
+            content = dump_configuration_content("json", {"big": 2 ** 70, "limit": float("inf")}, indent=None)
+            assert content == '{"big": 1180591620717411303424, "limit": Infinity}', f"Unexpected {backend_name} content={content}"
+
+        return
+
+    def test_unknown_backend(self):
+
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_JSON_PARSER = "missing"
+        reset_parser_backend_selection()
+
+        with self.assertRaises(ConfigurationError):
+            get_parser_backend(ConfigurationFormat.JSON)
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+
+import os
+import tempfile
+import time
+import unittest
+
+from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.sources.directorysource import DirectorySource, get_directory_index
+
+
+class TestDirectorySource(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self._write_file("alpha.json", '{"origin": "json"}')
+        self._write_file("alpha.yaml", "origin: yaml\n")
+        self._write_file("notes.txt", "not a configuration")
+        os.makedirs(os.path.join(self._tempdir.name, "beta.yaml"))
+        return
+
+    def tearDown(self):
+        self._tempdir.cleanup()
+        return
+
+    def _write_file(self, filename: str, content: str):
+        with open(os.path.join(self._tempdir.name, filename), 'w') as cf:
+            cf.write(content)
+        return
+
+    def test_directory_index(self):
+
+        index = get_directory_index(self._tempdir.name)
+
+        assert list(index.keys()) == ["alpha"], f"Only the configuration files should have been indexed, index={index}"
+        assert index["alpha"] == [("alpha.yaml", ConfigurationFormat.YAML), ("alpha.json", ConfigurationFormat.JSON)], \
+            f"The candidates should have been in extension search order, candidates={index['alpha']}"
+
+        assert get_directory_index(os.path.join(self._tempdir.name, "missing")) == {}
+
+        return
+
+    def test_load_with_index(self):
+
+        src = DirectorySource(self._tempdir.name, self._tempdir.name)
+
+        _, config_info = src.try_load_configuration("alpha", None)
+        assert config_info == {"origin": "yaml"}, "The yaml file should have been found first."
+
+        _, config_info = src.try_load_configuration("gamma", None)
+        assert config_info is None, "A missing name should not have been found."
+
+        # Make sure the directory modification time changes so the index is re-built
+        time.sleep(0.01)
+        self._write_file("gamma.yml", "origin: added\n")
+        dir_stat = os.stat(self._tempdir.name)
+        os.utime(self._tempdir.name, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns + 1000000))
+
+        _, config_info = src.try_load_configuration("gamma", None)
+        assert config_info == {"origin": "added"}, "A file added to the directory should have been found."
+
+        return
+
+    def test_load_file_created_after_index(self):
+
+        src = DirectorySource(self._tempdir.name, self._tempdir.name)
+
+        _, config_info = src.try_load_configuration("alpha", None)
+        assert config_info == {"origin": "yaml"}, "The yaml file should have been found first."
+
+        # Put the modification time back so the directory looks like it did when the index was built,
+        # the same as a file created within the same tick of the clock
+        dir_stat = os.stat(self._tempdir.name)
+        self._write_file("delta.json", '{"origin": "created"}')
+        os.utime(self._tempdir.name, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+
+        _, config_info = src.try_load_configuration("delta", None)
+        assert config_info == {"origin": "created"}, "A file created right after the index was built should have been found."
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+
+import os
+import tempfile
+import time
+import unittest
+
+from mojo.config.diskcache import DiskCache
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        return
+
+    def tearDown(self):
+        self._tempdir.cleanup()
+        return
+
+    def test_put_get_remove(self):
+
+        cache = DiskCache(self._tempdir.name, 1024 * 1024)
+
+        cache.put("alpha", {"value": 1})
+        assert cache.get("alpha") == {"value": 1}, "The cached value should have been returned."
+
+        cache.remove("alpha")
+        assert cache.get("alpha") is None, "The removed value should not have been returned."
+
+        return
+
+    def test_evicts_least_recently_used(self):
+
+        cache = DiskCache(self._tempdir.name, 1024 * 1024)
+
+        cache.put("alpha", "a" * 1000)
+        cache.put("beta", "b" * 1000)
+
+        # Make sure the entries have distinct times, then use 'alpha' so 'beta' is the least recently used
+        entry_time = time.time() - 10
+        for entry in os.scandir(self._tempdir.name):
+            os.utime(entry.path, (entry_time, entry_time))
+        cache.get("alpha")
+
+        cache = DiskCache(self._tempdir.name, 2500)
+        cache.put("gamma", "c" * 1000)
+
+        assert cache.get("alpha") is not None, "The recently used entry should have been kept."
+        assert cache.get("beta") is None, "The least recently used entry should have been evicted."
+        assert cache.get("gamma") is not None, "The new entry should have been kept."
+
+        return
+
+    def test_purge(self):
+
+        cache = DiskCache(self._tempdir.name, 1024 * 1024)
+
+        cache.put("alpha", 1)
+        cache.put("beta", 2)
+        cache.purge()
+
+        assert cache.get("alpha") is None and cache.get("beta") is None, "The cache should be empty after a purge."
+
+        return
+
+    def test_entries_are_private_json(self):
+
+        cache_dir = os.path.join(self._tempdir.name, "cache")
+        cache = DiskCache(cache_dir, 1024 * 1024)
+
+        cache.put("alpha", {"value": [1, 2.5, "three", None, True]})
+        assert cache.get("alpha") == {"value": [1, 2.5, "three", None, True]}, "The cached value should have been returned."
+
+        if os.name == "posix":
+            assert os.stat(cache_dir).st_mode & 0o077 == 0, "The cache directory should only be accessible by the owner."
+            for entry in os.scandir(cache_dir):
+                assert entry.stat().st_mode & 0o077 == 0, "The cache entries should only be accessible by the owner."
+
+        for value in [{1: "integer key"}, ("tuple",), float("nan"), object()]:
+            with self.assertRaises(TypeError):
+                cache.put("beta", value)
+        assert cache.get("beta") is None, "A value that cannot be stored as JSON should not have been cached."
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+
+
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+import yaml
+
+from mojo.config.configurationloader import ConfigurationLoader
+from mojo.config.cryptography import create_field_encrypted_configuration, generate_fernet_key
+from mojo.config.encryptedfields import (
+    EncryptedValue,
+    LazyDecryptingDict,
+    encrypt_field_value,
+    wrap_encrypted_fields
+)
+from mojo.config.frozen import FrozenDict, freeze
+
+CREDENTIAL_INFO = {
+    "credentials": [
+        {
+            "identifier": "adminuser",
+            "category": ["basic", "ssh"],
+            "username": "adminuser",
+            "password": "something"
+        },
+        {
+            "identifier": "datauser",
+            "category": "basic",
+            "username": "datauser",
+            "password": "another",
+            "port": 22
+        }
+    ]
+}
+
+
+class TestEncryptedFields(unittest.TestCase):
+
+    def setUp(self):
+        self._key = generate_fernet_key("BlahBlah!!")
+        return
+
+    def test_fields_are_decrypted_when_read(self):
+
+        resolved = []
+        def resolve_key(marker):
+            resolved.append(marker)
+            return self._key
+
+        config_info = {
+            "name": "plain",
+            "secret": encrypt_field_value(self._key, {"nested": [1, 2]}),
+            "other": encrypt_field_value(self._key, "value")
+        }
+
+        wrapped = wrap_encrypted_fields(config_info, resolve_key)
+        self.assertIsInstance(wrapped, LazyDecryptingDict)
+        self.assertIsInstance(dict.__getitem__(wrapped, "secret"), EncryptedValue)
+
+        self.assertEqual(wrapped["name"], "plain")
+        self.assertEqual(len(resolved), 0, msg="Reading a plain field should not decrypt anything.")
+
+        self.assertEqual(wrapped["secret"], {"nested": [1, 2]})
+        self.assertEqual(wrapped["secret"], {"nested": [1, 2]})
+        self.assertEqual(len(resolved), 1, msg="The decrypted value should be memoized.")
+
+        self.assertFalse(dict.__getitem__(wrapped, "other").decrypted)
+
+        return
+
+    def test_copies_are_decrypted(self):
+
+        config_info = {
+            "name": "plain",
+            "secret": encrypt_field_value(self._key, "value"),
+            "items": [encrypt_field_value(self._key, 1), 2]
+        }
+        expected = {"name": "plain", "secret": "value", "items": [1, 2]}
+
+        wrapped = wrap_encrypted_fields(config_info, lambda marker: self._key)
+
+        self.assertEqual(dict(wrapped)["secret"], "value")
+        self.assertEqual({**wrapped}["secret"], "value")
+        self.assertEqual(list(wrapped["items"]), [1, 2])
+        self.assertEqual(yaml.safe_load(yaml.safe_dump(wrapped)), expected)
+        self.assertEqual(json.loads(json.dumps(wrapped)), expected)
+
+        return
+
+    def test_frozen_configuration_stays_read_only(self):
+
+        config_info = freeze({"name": "plain", "secret": encrypt_field_value(self._key, "value")})
+
+        wrapped = wrap_encrypted_fields(config_info, lambda marker: self._key)
+        self.assertIsInstance(wrapped, FrozenDict)
+        self.assertEqual(wrapped["secret"], "value")
+
+        with self.assertRaises(TypeError):
+            wrapped["secret"] = "changed"
+
+        return
+
+    def test_yaml_tag_is_not_registered_globally(self):
+
+        content = create_field_encrypted_configuration(self._key, CREDENTIAL_INFO, ["password"], format="yaml")
+
+        with self.assertRaises(yaml.YAMLError):
+            yaml.safe_load(content)
+
+        return
+
+    def test_unencrypted_configuration_is_not_copied(self):
+
+        config_info = json.loads(json.dumps(CREDENTIAL_INFO))
+
+        wrapped = wrap_encrypted_fields(config_info, lambda marker: self._key)
+        self.assertIs(wrapped, config_info)
+
+        return
+
+    def test_load_field_encrypted_files(self):
+
+        loader = ConfigurationLoader([])
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            for fmt in ["yaml", "json"]:
+                content = create_field_encrypted_configuration(self._key, CREDENTIAL_INFO, ["password", "port"], format=fmt)
+                self.assertNotIn("something", content)
+                if fmt == "yaml":
+                    self.assertIn("!encrypted", content)
+                else:
+                    self.assertIn("$enc", content)
+
+                config_file = os.path.join(tempdir, f"credentials.{fmt}")
+                with open(config_file, 'w') as cf:
+                    cf.write(content)
+
+                config_info = loader.load_configuration_from_file(config_file, keyphrase="BlahBlah!!")
+
+                admin_info = config_info["credentials"][0]
+                self.assertEqual(admin_info["username"], "adminuser")
+                self.assertFalse(dict.__getitem__(admin_info, "password").decrypted)
+
+                self.assertEqual(admin_info["password"], "something")
+                self.assertEqual(config_info["credentials"][1]["port"], 22)
+                self.assertEqual(config_info, CREDENTIAL_INFO)
+
+                copied = pickle.loads(pickle.dumps(config_info))
+                self.assertEqual(copied, CREDENTIAL_INFO)
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,36 @@
 
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
 
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+
+from mojo.errors.exceptions import ConfigurationError
+
+from mojo.config.configurationloader import ConfigurationLoader
+from mojo.config.diskcache import DiskCache
+from mojo.config.sourcemanifest import MANIFEST_FILENAME, generate_source_manifest
 from mojo.config.sources.httpsource import HttpSource
+from mojo.config.sources.httpmirrorsource import HttpMirrorSource
+
+
+class QuietRequestHandler(SimpleHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.startswith("/slow/"):
+            time.sleep(2)
+        return super().do_GET()
+
+    def log_message(self, format, *args):
+        return
+
 
 class TestCouchDBConfigEncryption(unittest.TestCase):
 
@@ -22,7 +51,213 @@ class TestCouchDBConfigEncryption(unittest.TestCase):
 
         return
 
+    def test_http_sources_share_session(self):
+
+        source_a = HttpSource.parse("https://somehost.com/someleaf/")
+        source_b = HttpSource.parse("https://somehost.com/otherleaf/")
+        source_c = HttpSource.parse("https://otherhost.com/someleaf/")
+
+        assert source_a.session is source_b.session, "Sources for the same host should share a session."
+        assert source_a.session is not source_c.session, "Sources for different hosts should not share a session."
+
+        source_d = HttpSource.parse("https://somehost.com/someleaf/", pool_size=3)
+        assert source_d.session is not source_a.session, "Sources with a different pool size should not share a session."
+        assert source_d.session.get_adapter("https://somehost.com/")._pool_maxsize == 3, "The session should have the pool size requested."
+
+        return
+
+
+class TestHttpSourceLoad(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+
+        with open(os.path.join(self._tempdir.name, "runtime.json"), 'w') as cf:
+            cf.write('{"origin": "http"}')
+
+        handler = functools.partial(QuietRequestHandler, directory=self._tempdir.name)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server_thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._server_thread.start()
+
+        host, port = self._server.server_address
+        self._baseurl = f"http://{host}:{port}/"
+        return
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._tempdir.cleanup()
+        return
+
+    def test_http_load_configuration(self):
+
+        source = HttpSource.parse(self._baseurl)
+
+        _, config_info = source.try_load_configuration("runtime")
+        assert config_info == {"origin": "http"}, f"Unexpected config_info={config_info}"
+
+        _, config_info = source.try_load_configuration("missing")
+        assert config_info is None, "A missing configuration should not have been found."
+
+        return
+
+    def test_http_manifest_is_revalidated(self):
+
+        manifest_file = os.path.join(self._tempdir.name, MANIFEST_FILENAME)
+        with open(manifest_file, 'w') as mf:
+            json.dump({"configurations": {}}, mf)
+
+        source = HttpSource.parse(self._baseurl, use_manifest=True, manifest_ttl=0)
+
+        # An index.json that is not a source manifest is ignored
+        assert source.get_manifest() is None, "An index.json that is not a source manifest should not have been trusted."
+        _, config_info = source.try_load_configuration("runtime")
+        assert config_info == {"origin": "http"}, f"Unexpected config_info={config_info}"
+
+        with open(manifest_file, 'w') as mf:
+            json.dump(generate_source_manifest(self._tempdir.name), mf)
+
+        # The manifest has expired, so the new manifest is picked up
+        manifest = source.get_manifest()
+        assert manifest is not None and "runtime" in manifest["configurations"], "The new manifest should have been requested."
+
+        # Names that are not listed in the manifest are still probed for
+        with open(os.path.join(self._tempdir.name, "added.json"), 'w') as cf:
+            cf.write('{"origin": "added"}')
+        _, config_info = source.try_load_configuration("added")
+        assert config_info == {"origin": "added"}, f"Unexpected config_info={config_info}"
+
+        return
+
+    def test_http_manifest_connection_error(self):
+
+        source = HttpSource.parse(self._baseurl, use_manifest=True, manifest_ttl=0)
+
+        session_get = source._session.get
+
+        def failing_get(url, *args, **kwargs):
+            if url.endswith(f"/{MANIFEST_FILENAME}"):
+                raise requests.ConnectionError(f"Connection refused url={url}")
+            return session_get(url, *args, **kwargs)
+
+        with mock.patch.object(source._session, "get", failing_get):
+            assert source.get_manifest() is None, "A manifest that could not be requested should be treated as missing."
+
+            _, config_info = source.try_load_configuration("runtime")
+            assert config_info == {"origin": "http"}, f"Unexpected config_info={config_info}"
+
+        return
+
+    def test_http_read_timeout_falls_back(self):
+
+        source = HttpSource.parse(f"{self._baseurl}slow/", connect_timeout=1, read_timeout=0.2)
+
+        _, config_info = source.try_load_configuration("runtime")
+        assert config_info is None, "A source that times out should be treated as not having the configuration."
+
+        return
+
+    def test_http_read_timeout_is_reported(self):
+
+        loader = ConfigurationLoader([f"{self._baseurl}slow/#connect_timeout=1&read_timeout=0.2"])
+
+        with self.assertRaises(ConfigurationError) as xcpt:
+            loader.load_configuration_by_name("runtime")
+
+        assert "Timed out" in str(xcpt.exception), f"The error should report the timeout, error={xcpt.exception}"
+
+        return
+
+    def test_http_mirror_hedged_request(self):
+
+        source = HttpMirrorSource.parse(f"{self._baseurl}slow/|{self._baseurl}", hedge_delay=0.1)
+        assert len(source.mirrors) == 2, "The mirror group should have two mirrors."
+
+        started = time.monotonic()
+        _, config_info = source.try_load_configuration("runtime")
+        elapsed = time.monotonic() - started
+
+        assert config_info == {"origin": "http"}, f"Unexpected config_info={config_info}"
+        assert elapsed < 1.5, f"The hedged request to the fast mirror should have answered first, elapsed={elapsed}"
+
+        return
+
+    def test_http_mirror_uses_first_successful_answer(self):
+
+        # The first mirror answers quickly but does not have the configuration, the second one does
+        source = HttpMirrorSource.parse(f"{self._baseurl}missing/|{self._baseurl}", hedge_delay=5)
+
+        _, config_info = source.try_load_configuration("runtime")
+        assert config_info == {"origin": "http"}, f"Unexpected config_info={config_info}"
+
+        # A mirror that fails only causes the next mirror to be asked
+        source = HttpMirrorSource.parse(f"http://127.0.0.1:1/|{self._baseurl}", hedge_delay=5)
+
+        _, config_info = source.try_load_configuration("runtime")
+        assert config_info == {"origin": "http"}, f"Unexpected config_info={config_info}"
+
+        _, config_info = source.try_load_configuration("missing")
+        assert config_info is None, "A configuration that no mirror has should not have been found."
+
+        # The group only fails once every mirror has failed
+        source = HttpMirrorSource.parse("http://127.0.0.1:1/|http://127.0.0.1:1/other/", hedge_delay=5)
+        with self.assertRaises(requests.RequestException):
+            source.try_load_configuration("runtime")
+
+        return
+
+    def test_http_mirror_group_requires_http_members(self):
+
+        assert HttpMirrorSource.is_mirror_group(f"{self._baseurl}|https://otherhost.com/")
+        assert not HttpMirrorSource.is_mirror_group(f"{self._baseurl}|/home/user/configs")
+        assert not HttpMirrorSource.is_mirror_group("/home/user/a|b")
+        assert HttpMirrorSource.parse(f"{self._baseurl}|/home/user/configs") is None
+
+        return
+
+    def test_http_load_not_modified_from_cache(self):
+
+        cache = DiskCache(os.path.join(self._tempdir.name, "cache"), 1024 * 1024)
+
+        source = HttpSource.parse(self._baseurl, cache=cache)
+
+        _, config_info = source.try_load_configuration("runtime")
+        assert config_info == {"origin": "http"}, f"Unexpected config_info={config_info}"
+
+        checkurl = f"{self._baseurl}runtime.json"
+        cache_entry = cache.get(checkurl)
+        assert cache_entry is not None, "The response should have been cached."
+
+        # Mark the cached content so we can tell the '304 Not Modified' path served it
+        cache_entry["config_info"] = {"origin": "cache"}
+        cache.put(checkurl, cache_entry)
+
+        _, config_info = source.try_load_configuration("runtime")
+        assert config_info == {"origin": "cache"}, f"Unexpected config_info={config_info}"
+
+        source.purge_cache()
+        assert cache.get(checkurl) is None, "The cache should have been purged."
+
+        return
+
+    def test_http_load_with_unusable_cache(self):
+
+        # A cache directory that cannot be created should be treated as a cache miss
+        blocker = os.path.join(self._tempdir.name, "blocker")
+        with open(blocker, 'w') as bf:
+            bf.write("not a directory")
+
+        cache = DiskCache(os.path.join(blocker, "cache"), 1024 * 1024)
+
+        source = HttpSource.parse(self._baseurl, cache=cache)
+
+        for _ in range(2):
+            _, config_info = source.try_load_configuration("runtime")
+            assert config_info == {"origin": "http"}, f"Unexpected config_info={config_info}"
+
+        return
 
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,67 @@
+
+
+
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+# A generous budget for the cumulative import time of the configuration maps so the test only fails when a heavy
+# dependency is imported eagerly again, not when the test machine is busy
+IMPORT_TIME_BUDGET_US = 500000
+
+HEAVY_MODULES = ["yaml", "requests", "cryptography", "ctypes", "pymongo", "couchdb", "asyncio"]
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(sys.path)
+    proc = subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, check=True)
+    return proc
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_configuration_maps_import_time(self):
+
+        proc = run_python("-X", "importtime", "-c", "import mojo.config.configurationmaps")
+
+        cumulative = None
+        for line in proc.stderr.splitlines():
+            mobj = re.match(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*mojo\.config\.configurationmaps$", line)
+            if mobj is not None:
+                cumulative = int(mobj.group(1))
+
+        self.assertIsNotNone(cumulative, msg="The import time of 'mojo.config.configurationmaps' was not reported.")
+        self.assertLess(cumulative, IMPORT_TIME_BUDGET_US)
+
+        return
+
+    def test_heavy_dependencies_are_not_imported(self):
+
+        script = "\n".join([
+            "import sys",
+            "import mojo.config.configurationmaps",
+            "from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS",
+            "from mojo.config.configurationvariables import MOJO_CONFIG_VARIABLES",
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))",
+            "print(MOJO_CONFIG_DEFAULTS._settings_loaded)",
+            "print(repr((MOJO_CONFIG_VARIABLES.MJR_CONFIG_REQUIRE_CREDENTIALS, MOJO_CONFIG_VARIABLES.MJR_CONFIG_REQUIRE_LANDSCAPE, "
+            "MOJO_CONFIG_VARIABLES.MJR_CONFIG_REQUIRE_RUNTIME, MOJO_CONFIG_VARIABLES.MJR_CONFIG_REQUIRE_TOPOLOGY, "
+            "MOJO_CONFIG_VARIABLES.MJR_CONFIG_STORAGE_URI)))"
+        ])
+
+        proc = run_python("-c", script)
+        imported, settings_loaded, variable_defaults = proc.stdout.splitlines()
+
+        self.assertEqual(imported, "", msg=f"Heavy modules imported by 'mojo.config.configurationmaps': {imported}")
+        self.assertEqual(settings_loaded, "False", msg="The startup configuration should not be read at import time.")
+        self.assertEqual(variable_defaults, "(False, False, False, False, '')",
+                         msg="The configuration variables should have their defaults before they are resolved.")
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+
+
+import threading
+import time
+import unittest
+
+from mojo.collections.mergemap import MergeMap
+from mojo.errors.exceptions import ConfigurationError
+
+from mojo.config.lazymaps import LazyConfigurationMap
+
+
+class TestLazyConfigurationMap(unittest.TestCase):
+
+    def test_resolves_once_on_first_access(self):
+
+        target = MergeMap()
+        calls = []
+
+        def resolver():
+            calls.append(threading.get_ident())
+            time.sleep(0.05)
+            # The resolver fills in the map through the proxy
+            proxy.maps.insert(0, {"name": "runtime"})
+            return
+
+        proxy = LazyConfigurationMap(target, resolver, "runtime")
+        self.assertFalse(proxy.resolved)
+        self.assertEqual(len(calls), 0)
+
+        results = []
+        def reader():
+            results.append(proxy["name"])
+            return
+
+        threads = [threading.Thread(target=reader) for _ in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+
+        self.assertEqual(len(calls), 1, msg="The category should only be resolved once.")
+        self.assertEqual(results, ["runtime"] * 8)
+        self.assertTrue(proxy.resolved)
+        self.assertIsInstance(proxy, MergeMap)
+
+        return
+
+    def test_errors_surface_on_first_access(self):
+
+        attempts = []
+
+        def resolver():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConfigurationError("Unable to find the topology configuration.")
+            return
+
+        proxy = LazyConfigurationMap(MergeMap({"name": "topology"}), resolver, "topology")
+
+        with self.assertRaises(ConfigurationError) as cm:
+            "name" in proxy
+        self.assertEqual(str(cm.exception), "Unable to find the topology configuration.")
+        self.assertFalse(proxy.resolved)
+
+        self.assertIn("name", proxy)
+        self.assertTrue(proxy.resolved)
+        self.assertEqual(len(attempts), 2)
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+
+import os
+import tempfile
+import unittest
+
+import yaml
+
+from mojo.config.configurationformat import ConfigurationFormat
+from mojo.config.configurationsettings import MOJO_CONFIG_DEFAULTS
+from mojo.config.configurationvariables import MOJO_CONFIG_VARIABLES
+from mojo.config.diskcache import DiskCache
+from mojo.config.parsedcache import (
+    get_cached_decryption,
+    get_file_identity,
+    get_parsed_configuration_cache,
+    load_configuration_file,
+    put_cached_decryption
+)
+
+
+class TestParsedCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self._cache = DiskCache(os.path.join(self._tempdir.name, "cache"), 1024 * 1024)
+        self._config_file = os.path.join(self._tempdir.name, "alpha.yaml")
+        self._write_config({"origin": "first"})
+        return
+
+    def tearDown(self):
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_PARSED_CACHE_PLAINTEXT = False
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_PARSED_CACHE = False
+        self._tempdir.cleanup()
+        return
+
+    def _write_config(self, config_info: dict, mtime_ns: int = None):
+        with open(self._config_file, 'w') as cf:
+            yaml.safe_dump(config_info, cf)
+        if mtime_ns is not None:
+            os.utime(self._config_file, ns=(mtime_ns, mtime_ns))
+        return
+
+    def test_cached_parse(self):
+
+        config_info = load_configuration_file(self._config_file, ConfigurationFormat.YAML, cache=self._cache)
+        assert config_info == {"origin": "first"}
+
+        identity = get_file_identity(self._config_file)
+        cached = self._cache.get(f"{identity}|yaml")
+        assert cached is not None and cached[1] == {"origin": "first"}, "The parsed result should have been cached."
+
+        # Plant a different result for the same file identity to prove the cache is used
+        self._cache.put(f"{identity}|yaml", [cached[0], {"origin": "cached"}])
+        config_info = load_configuration_file(self._config_file, ConfigurationFormat.YAML, cache=self._cache)
+        assert config_info == {"origin": "cached"}, "The unchanged file should have been loaded from the cache."
+
+        # Changing the file changes its identity
+        self._write_config({"origin": "second"}, mtime_ns=os.stat(self._config_file).st_mtime_ns + 1000000)
+        config_info = load_configuration_file(self._config_file, ConfigurationFormat.YAML, cache=self._cache)
+        assert config_info == {"origin": "second"}, "The changed file should have been parsed again."
+
+        return
+
+    def test_shared_cache_requires_opt_in(self):
+
+        config_directory = MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY
+        try:
+            MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY = self._tempdir.name
+            assert get_parsed_configuration_cache() is None, "The shared cache should only be used when it is enabled."
+
+            MOJO_CONFIG_DEFAULTS.MJR_CONFIG_USE_PARSED_CACHE = True
+            assert get_parsed_configuration_cache() is not None, "The shared cache should have been enabled."
+        finally:
+            MOJO_CONFIG_VARIABLES.MJR_CONFIG_DIRECTORY = config_directory
+
+        return
+
+    def test_credentials_are_not_cached(self):
+
+        credentials_file = os.path.join(self._tempdir.name, "credentials.yaml")
+        with open(credentials_file, 'w') as cf:
+            yaml.safe_dump({"password": "secret"}, cf)
+
+        config_info = load_configuration_file(credentials_file, ConfigurationFormat.YAML, cache=self._cache)
+        assert config_info == {"password": "secret"}
+
+        identity = get_file_identity(credentials_file)
+        assert self._cache.get(f"{identity}|yaml") is None, "The credentials should not have been cached."
+
+        return
+
+    def test_unusable_cache_falls_back_to_parsing(self):
+
+        # A cache directory that cannot be created makes every cache operation fail
+        blocker = os.path.join(self._tempdir.name, "blocker")
+        with open(blocker, 'w') as bf:
+            bf.write("not a directory")
+
+        cache = DiskCache(os.path.join(blocker, "cache"), 1024 * 1024)
+
+        for _ in range(2):
+            config_info = load_configuration_file(self._config_file, ConfigurationFormat.YAML, cache=cache)
+            assert config_info == {"origin": "first"}, f"Unexpected config_info={config_info}"
+
+        return
+
+    def test_decryption_cache_requires_opt_in(self):
+
+        put_cached_decryption(self._config_file, "key", {"secret": "value"}, cache=self._cache)
+        assert get_cached_decryption(self._config_file, "key", cache=self._cache) is None, \
+            "Plaintext should not have been cached without being allowed."
+
+        MOJO_CONFIG_DEFAULTS.MJR_CONFIG_PARSED_CACHE_PLAINTEXT = True
+
+        put_cached_decryption(self._config_file, "key", {"secret": "value"}, cache=self._cache)
+        assert get_cached_decryption(self._config_file, "key", cache=self._cache) == {"secret": "value"}
+        assert get_cached_decryption(self._config_file, "other", cache=self._cache) is None, \
+            "A different key should not have found the decrypted content."
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+
+import copy
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+import yaml
+
+from mojo.config.configurationloader import ConfigurationLoader
+from mojo.config.frozen import FrozenDict, FrozenList, freeze
+from mojo.config.resultcache import CONFIGURATION_RESULT_CACHE, ConfigurationResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        CONFIGURATION_RESULT_CACHE.invalidate()
+        CONFIGURATION_RESULT_CACHE.reset_stats()
+        return
+
+    def tearDown(self):
+        CONFIGURATION_RESULT_CACHE.invalidate()
+        self._tempdir.cleanup()
+        return
+
+    def _write_config(self, name: str, content: dict):
+        with open(os.path.join(self._tempdir.name, f"{name}.yaml"), 'w') as cf:
+            yaml.safe_dump(content, cf)
+        return
+
+    def test_freeze(self):
+
+        frozen = freeze({"items": [1, {"a": 1}], "name": "alpha"})
+
+        assert isinstance(frozen, FrozenDict) and isinstance(frozen["items"], FrozenList)
+        assert frozen == {"items": [1, {"a": 1}], "name": "alpha"}
+
+        with self.assertRaises(TypeError):
+            frozen["name"] = "beta"
+        with self.assertRaises(TypeError):
+            frozen["items"].append(2)
+        with self.assertRaises(TypeError):
+            frozen["items"][1]["a"] = 2
+
+        modifiable = frozen.copy()
+        modifiable["name"] = "beta"
+
+        assert pickle.loads(pickle.dumps(frozen)) == frozen
+        assert copy.deepcopy(frozen) == frozen
+        assert yaml.safe_load(yaml.safe_dump(frozen)) == frozen
+
+        return
+
+    def test_lru_ttl_and_invalidate(self):
+
+        cache = ConfigurationResultCache(1024 * 1024)
+
+        cache.put("src", "alpha", None, {"a": 1}, ttl=60)
+        cache.put("src", "beta", None, {"b": 1}, ttl=0.01)
+        cache.put("other", "alpha", None, {"a": 2}, ttl=60)
+
+        assert cache.get("src", "alpha") == (None, {"a": 1})
+
+        time.sleep(0.02)
+        assert cache.get("src", "beta") == (None, None), "The expired entry should not have been returned."
+
+        cache.invalidate(config_name="alpha", source_uri="src")
+        assert cache.get("src", "alpha") == (None, None)
+        assert cache.get("other", "alpha") == (None, {"a": 2})
+
+        cache.invalidate(source_uri="other")
+        assert cache.stats["entries"] == 0
+
+        stats = cache.stats
+        assert stats["hits"] == 2 and stats["misses"] == 2, f"Unexpected stats={stats}"
+
+        small = ConfigurationResultCache(2000)
+        small.put("src", "alpha", None, {"value": "a" * 500}, ttl=60)
+        small.put("src", "beta", None, {"value": "b" * 500}, ttl=60)
+        small.put("src", "gamma", None, {"value": "c" * 500}, ttl=60)
+        assert small.get("src", "alpha") == (None, None), "The least recently used entry should have been evicted."
+        assert small.stats["evictions"] > 0
+
+        return
+
+    def test_loader_uses_cache(self):
+
+        self._write_config("alpha", {"origin": "first"})
+
+        source_uri = f"dir://{self._tempdir.name}#ttl=60"
+
+        _, config_info = ConfigurationLoader([source_uri]).load_configuration_by_name("alpha")
+        assert isinstance(config_info, FrozenDict), "The cached result should have been read-only."
+
+        self._write_config("alpha", {"origin": "second"})
+
+        _, config_info = ConfigurationLoader([source_uri]).load_configuration_by_name("alpha")
+        assert config_info["origin"] == "first", "The second loader should have used the cached result."
+        assert CONFIGURATION_RESULT_CACHE.stats["hits"] == 1
+
+        CONFIGURATION_RESULT_CACHE.invalidate(config_name="alpha")
+
+        config_list = ConfigurationLoader([source_uri]).load_configurations_by_names(["alpha"])
+        assert config_list[0][1]["origin"] == "second", "The invalidated name should have been loaded again."
+
+        _, config_info = ConfigurationLoader([self._tempdir.name]).load_configuration_by_name("alpha")
+        assert not isinstance(config_info, FrozenDict), "Without a time to live the cache should not have been used."
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+
+
+
+import threading
+import unittest
+
+from mojo.collections.wellknown import ContextSingleton
+
+from mojo.config import configurationmaps
+from mojo.config.configurationvariables import CONFIGURATION_MAPS
+from mojo.config.snapshots import get_configuration_snapshot
+
+
+class TestConfigurationSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self._config_map = CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP
+        self._saved_layers = list(self._config_map.maps)
+        self._saved_tables = configurationmaps._get_category_tables("runtime")
+        return
+
+    def tearDown(self):
+        self._config_map.maps = self._saved_layers
+        configurationmaps._set_category_tables("runtime", *self._saved_tables)
+        return
+
+    def test_pinned_snapshot_is_not_changed_by_a_reload(self):
+
+        ctx = ContextSingleton()
+
+        config_uri = "snapshot/runtime"
+        config_layers = [(config_uri, {"snapshot_test_key": "original"})]
+
+        configurationmaps._apply_runtime_configuration(ctx, config_layers, [])
+
+        pinned = get_configuration_snapshot()
+        self.assertEqual(pinned.get_map("runtime")["snapshot_test_key"], "original")
+
+        replaced = configurationmaps.replace_configuration_layer(config_uri, {"snapshot_test_key": "changed"})
+        self.assertTrue(replaced)
+
+        current = get_configuration_snapshot()
+        self.assertEqual(current.version, pinned.version + 1)
+        self.assertEqual(current.get_map("runtime")["snapshot_test_key"], "changed")
+        self.assertEqual(self._config_map["snapshot_test_key"], "changed")
+
+        self.assertEqual(pinned.get_map("runtime")["snapshot_test_key"], "original")
+        self.assertEqual(pinned.get_category("runtime").config_table[config_uri], {"snapshot_test_key": "original"})
+
+        with self.assertRaises(TypeError):
+            pinned.get_map("runtime")["snapshot_test_key"] = "modified"
+
+        return
+
+    def test_writes_through_the_live_map_do_not_change_a_snapshot(self):
+
+        ctx = ContextSingleton()
+
+        config_uri = "snapshot/runtime"
+        config_layers = [(config_uri, {"snapshot_test_key": "original", "nested": {"a": 1}})]
+
+        configurationmaps._apply_runtime_configuration(ctx, config_layers, [])
+
+        pinned = get_configuration_snapshot()
+
+        CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP["snapshot_test_key"] = "written"
+        CONFIGURATION_MAPS.RUNTIME_CONFIGURATION_MAP["nested"]["a"] = 2
+
+        self.assertEqual(pinned.get_map("runtime")["snapshot_test_key"], "original")
+        self.assertEqual(pinned.get_map("runtime")["nested"]["a"], 1)
+        self.assertEqual(pinned.get_category("runtime").config_table[config_uri]["nested"], {"a": 1})
+
+        with self.assertRaises(TypeError):
+            pinned.get_map("runtime")["nested"]["a"] = 99
+
+        with self.assertRaises(TypeError):
+            pinned.get_category("runtime").config_table[config_uri]["nested"]["a"] = 99
+
+        self.assertEqual(pinned.get_map("runtime")["nested"]["a"], 1)
+
+        return
+
+    def test_readers_see_complete_versions(self):
+
+        ctx = ContextSingleton()
+
+        finished = threading.Event()
+        inconsistent = []
+
+        def reader():
+            while not finished.is_set():
+                runtime_map = get_configuration_snapshot().get_map("runtime")
+                if "snapshot_a" in runtime_map and runtime_map["snapshot_a"] != runtime_map["snapshot_b"]:
+                    inconsistent.append((runtime_map["snapshot_a"], runtime_map["snapshot_b"]))
+            return
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for th in readers:
+            th.start()
+
+        try:
+            for generation in range(200):
+                config_layers = [
+                    ("snapshot/a", {"snapshot_a": generation}),
+                    ("snapshot/b", {"snapshot_b": generation})
+                ]
+                configurationmaps._apply_runtime_configuration(ctx, config_layers, [])
+                self._config_map.maps = self._saved_layers
+        finally:
+            finished.set()
+            for th in readers:
+                th.join()
+
+        self.assertEqual(inconsistent, [], msg="A reader saw a partially published configuration.")
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+
+import json
+import os
+import tempfile
+import unittest
+
+from mojo.config.sourcemanifest import (
+    MANIFEST_FILENAME,
+    generate_source_manifest,
+    is_source_manifest,
+    lookup_manifest_entry,
+    write_source_manifests
+)
+
+from mojo.config.sources.directorysource import DirectorySource
+
+
+class TestSourceManifest(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+
+        self._config_dir = os.path.join(self._tempdir.name, "runtimes")
+        os.makedirs(self._config_dir)
+
+        with open(os.path.join(self._config_dir, "default-runtime.yaml"), 'w') as cf:
+            cf.write("origin: yaml\n")
+        with open(os.path.join(self._config_dir, "default-runtime.json"), 'w') as cf:
+            cf.write('{"origin": "json"}')
+        with open(os.path.join(self._config_dir, "other-runtime.json"), 'w') as cf:
+            cf.write('{"origin": "json"}')
+        return
+
+    def tearDown(self):
+        self._tempdir.cleanup()
+        return
+
+    def test_generate_manifest(self):
+
+        manifest = generate_source_manifest(self._config_dir)
+
+        entry = lookup_manifest_entry(manifest, "default-runtime")
+        assert entry["file"] == "default-runtime.yaml", "The yaml file should be preferred over the json file."
+        assert entry["format"] == "yaml", f"Unexpected format={entry['format']}"
+        assert entry["size"] == len("origin: yaml\n"), f"Unexpected size={entry['size']}"
+
+        entry = lookup_manifest_entry(manifest, "other-runtime")
+        assert entry["file"] == "other-runtime.json", f"Unexpected file={entry['file']}"
+
+        assert lookup_manifest_entry(manifest, "missing") is None, "A missing configuration should not have an entry."
+
+        return
+
+    def test_directory_source_uses_manifest(self):
+
+        manifest_files = write_source_manifests(self._tempdir.name)
+        assert manifest_files == [os.path.join(self._config_dir, MANIFEST_FILENAME)], f"Unexpected manifest files={manifest_files}"
+
+        # Point the manifest entry at the json file so we can tell the manifest was used
+        with open(manifest_files[0], 'r') as mf:
+            manifest = json.load(mf)
+        manifest["configurations"]["default-runtime"]["file"] = "default-runtime.json"
+        manifest["configurations"]["default-runtime"]["format"] = "json"
+        with open(manifest_files[0], 'w') as mf:
+            json.dump(manifest, mf)
+
+        source = DirectorySource.parse(self._config_dir, use_manifest=True)
+
+        _, config_info = source.try_load_configuration("default-runtime", None)
+        assert config_info == {"origin": "json"}, f"Unexpected config_info={config_info}"
+
+        _, config_info = source.try_load_configuration("missing", None)
+        assert config_info is None, "A missing configuration should not have been found."
+
+        # A file that was added after the manifest was written is still found
+        with open(os.path.join(self._config_dir, "new-runtime.yaml"), 'w') as cf:
+            cf.write("origin: new\n")
+
+        _, config_info = source.try_load_configuration("new-runtime", None)
+        assert config_info == {"origin": "new"}, "A name that is not in the manifest should have been probed for."
+
+        return
+
+    def test_directory_source_ignores_foreign_index(self):
+
+        source = DirectorySource.parse(self._config_dir, use_manifest=True)
+        manifest_file = os.path.join(self._config_dir, MANIFEST_FILENAME)
+
+        for content in ['{"configurations": {}}', '["not", "a", "manifest"]', '{ not json']:
+            with open(manifest_file, 'w') as mf:
+                mf.write(content)
+            mtime_ns = os.stat(manifest_file).st_mtime_ns + len(content)
+            os.utime(manifest_file, ns=(mtime_ns, mtime_ns))
+
+            assert source.get_manifest() is None, f"An index.json that is not a source manifest was trusted, content={content}"
+
+            _, config_info = source.try_load_configuration("other-runtime", None)
+            assert config_info == {"origin": "json"}, f"Unexpected config_info={config_info}"
+
+        return
+
+    def test_manifest_entries_are_validated(self):
+
+        manifest = generate_source_manifest(self._config_dir)
+        assert is_source_manifest(manifest), "A generated manifest should be a source manifest."
+
+        manifest["configurations"]["default-runtime"]["file"] = "../default-runtime.yaml"
+        manifest["configurations"]["other-runtime"]["format"] = "toml"
+
+        assert lookup_manifest_entry(manifest, "default-runtime") is None, "An entry outside the directory should have been rejected."
+        assert lookup_manifest_entry(manifest, "other-runtime") is None, "An entry with an unknown format should have been rejected."
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()